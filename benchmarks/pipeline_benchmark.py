@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+"""
+导出流水线和相似度分析基准测试
+在合成仓库上分别测量文件收集、行数预估、读取解码、文档生成、保存、完整流水线和相似度分析，
+记录耗时、吞吐量和峰值内存，结果写入可比较的JSON文件。
+
+每个阶段在独立子进程中运行，峰值内存只反映该阶段；所有输入由固定随机种子生成，
+分析缓存和结果库均关闭，同一台机器上的多次运行可以直接比较。
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCHMARK_DIR), "src")
+sys.path.insert(0, SRC_DIR)
+
+from synthetic_repo import PRESETS, EXTENSIONS, generate_repo
+
+# 结果格式版本，字段变化时递增
+RESULT_VERSION = 1
+
+STAGES = ['collect', 'dry_run', 'read', 'build', 'save', 'pipeline', 'similarity_exact', 'similarity_structural']
+
+# 相似度分析默认使用的文档数和每个文档包含的文件数
+# difflib的字符级比较随文档长度平方增长，文档过大时单个阶段会耗时数分钟
+SIMILARITY_DOCUMENTS = 4
+SIMILARITY_FILES_PER_DOCUMENT = 8
+
+def prepare_similarity_documents(repo, work_dir, seed, documents=SIMILARITY_DOCUMENTS,
+                                 files_per_document=SIMILARITY_FILES_PER_DOCUMENT):
+    """从合成仓库中抽取文件生成若干Word文档，部分行随机改写，模拟相互抄袭程度不同的项目"""
+    from file_processor import FileProcessor
+    from export_pipeline import ExportPipeline
+
+    processor = FileProcessor()
+    files, _ = processor.collect_files([repo], EXTENSIONS)
+    files = sorted(files)
+    rng = random.Random(seed)
+    paths = []
+    for index in range(documents):
+        chosen = rng.sample(files, min(files_per_document, len(files)))
+        styled_lines = []
+        for file_path in chosen:
+            lines, _ = processor.process_file(file_path, [repo])
+            # 每个文档改写不同比例的代码行
+            mutation = index / documents
+            styled_lines.extend((text + f" // v{index}", style) if style == 'code' and rng.random() < mutation
+                                else (text, style) for text, style in lines)
+        doc = ExportPipeline().document_generator.create_document(
+            styled_lines, "微软雅黑", 10, f"项目{index}", "V1.0", "微软雅黑", "微软雅黑")
+        path = os.path.join(work_dir, f"doc{index}.docx")
+        doc.save(path)
+        paths.append(path)
+    return paths
+
+def run_stage(stage, repo, work_dir):
+    """在当前进程中运行一个阶段，返回测量结果（由子进程调用）"""
+    from export_pipeline import ExportPipeline
+    from file_processor import FileProcessor
+    from stage_profiler import current_rss_bytes, peak_rss_bytes, reset_peak_rss
+
+    processor = FileProcessor()
+    pipeline = ExportPipeline(processor)
+    files = lines = pairs = None
+    # 准备输入，不计入阶段耗时
+    if stage in ('read', 'build', 'save'):
+        file_paths, _ = processor.collect_files([repo], EXTENSIONS)
+        if stage != 'read':
+            styled_lines, _ = processor.process_files(file_paths, [repo])
+        if stage == 'save':
+            doc = pipeline.document_generator.create_document(
+                styled_lines, "微软雅黑", 10, "基准测试", "V1.0", "微软雅黑", "微软雅黑")
+    if stage.startswith('similarity'):
+        from similarity_analyzer import SimilarityAnalyzer
+        documents = sorted(os.path.join(work_dir, name) for name in os.listdir(work_dir)
+                           if name.startswith("doc") and name.endswith(".docx"))
+        analyzer = SimilarityAnalyzer(use_cache=False, use_store=False)
+
+    # 能重置峰值时（Linux），阶段结束时的峰值不包含准备输入时的内存
+    baseline_rss = current_rss_bytes() if reset_peak_rss() else peak_rss_bytes()
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    if stage == 'collect':
+        file_paths, _ = processor.collect_files([repo], EXTENSIONS)
+        files = len(file_paths)
+    elif stage == 'dry_run':
+        result = pipeline.dry_run([repo], EXTENSIONS)
+        files, lines = result['file_count'], result['total_code_lines']
+    elif stage == 'read':
+        styled_lines, lines_by_ext = processor.process_files(file_paths, [repo])
+        files, lines = len(file_paths), sum(lines_by_ext.values())
+    elif stage == 'build':
+        pipeline.document_generator.create_document(
+            styled_lines, "微软雅黑", 10, "基准测试", "V1.0", "微软雅黑", "微软雅黑")
+        files, lines = len(file_paths), len(styled_lines)
+    elif stage == 'save':
+        doc.save(os.path.join(work_dir, "save.docx"))
+        files, lines = len(file_paths), len(styled_lines)
+    elif stage == 'pipeline':
+        result = pipeline.build([repo], EXTENSIONS, app_name="基准测试", version="V1.0")
+        pipeline.save(result, os.path.join(work_dir, "pipeline.docx"))
+        files, lines = result['file_count'], result['line_count']
+    elif stage.startswith('similarity'):
+        mode = stage.split('_', 1)[1]
+        analyzer.analyze_similarity(documents, mode=mode)
+        files, pairs = len(documents), analyzer.last_run_stats['pair_count']
+    else:
+        raise ValueError(f"未知的阶段: {stage}")
+    seconds = time.perf_counter() - start
+    peak_rss = peak_rss_bytes()
+    if stage == 'pipeline':
+        # 流水线内部的StageProfiler在各阶段开始时重置峰值，取各阶段峰值中的最大值
+        peak_rss = max([peak_rss or 0] + [record['peak_rss_bytes'] or 0
+                                          for record in result['profile']['stages'].values()])
+    return {
+        'seconds': seconds,
+        'cpu_seconds': time.process_time() - cpu_start,
+        'files': files,
+        'lines': lines,
+        'pairs': pairs,
+        'peak_rss_bytes': peak_rss,
+        'baseline_rss_bytes': baseline_rss,
+    }
+
+def measure_stage(stage, repo, work_dir, repeat):
+    """在独立子进程中重复运行阶段，返回中位数、最小值和吞吐量"""
+    runs = []
+    for _ in range(repeat):
+        cmd = [sys.executable, os.path.abspath(__file__), "--run-stage", stage, "--repo", repo, "--work-dir", work_dir]
+        completed = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='replace')
+        if completed.returncode != 0:
+            last_line = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "未知错误"
+            raise RuntimeError(f"阶段 {stage} 运行失败: {last_line}")
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    seconds = [run['seconds'] for run in runs]
+    median = statistics.median(seconds)
+    result = {
+        'median_seconds': round(median, 4),
+        'min_seconds': round(min(seconds), 4),
+        'cpu_seconds': round(statistics.median(run['cpu_seconds'] for run in runs), 4),
+        'files': runs[0]['files'],
+        'lines': runs[0]['lines'],
+        'pairs': runs[0]['pairs'],
+        'peak_rss_mb': round(max(run['peak_rss_bytes'] or 0 for run in runs) / 1024 / 1024, 1),
+        'stage_rss_mb': round(max((run['peak_rss_bytes'] or 0) - (run['baseline_rss_bytes'] or 0)
+                                  for run in runs) / 1024 / 1024, 1),
+    }
+    if median > 0:
+        if result['files'] is not None:
+            result['files_per_second'] = round(result['files'] / median, 1)
+        if result['lines'] is not None:
+            result['lines_per_second'] = round(result['lines'] / median, 1)
+        if result['pairs'] is not None:
+            result['pairs_per_second'] = round(result['pairs'] / median, 2)
+    return result
+
+def environment_info():
+    """记录运行环境和依赖版本，比较结果时用于确认条件一致"""
+    info = {'python': platform.python_version(), 'platform': platform.platform(),
+            'processor': platform.processor(), 'cpu_count': os.cpu_count(), 'packages': {}}
+    for package in ('docx', 'chardet', 'numpy', 'jieba', 'sklearn'):
+        try:
+            module = __import__(package)
+            info['packages'][package] = getattr(module, '__version__', 'unknown')
+        except ImportError:
+            info['packages'][package] = None
+    return info
+
+def compare_results(previous, current):
+    """与上一次的结果比较，返回各阶段的耗时变化"""
+    lines = []
+    if previous.get('repo', {}).get('params') != current['repo']['params']:
+        lines.append("⚠ 两次运行的合成仓库参数不同，结果不可直接比较")
+    for stage, data in current['stages'].items():
+        old = previous.get('stages', {}).get(stage)
+        if not old or not old.get('median_seconds'):
+            continue
+        ratio = data['median_seconds'] / old['median_seconds']
+        mark = "↑变慢" if ratio > 1.1 else ("↓变快" if ratio < 0.9 else "")
+        lines.append(f"  {stage:<24} {old['median_seconds']:>9.3f}s -> {data['median_seconds']:>9.3f}s "
+                     f"({ratio:.2f}x) {mark}")
+    return lines
+
+def print_report(results):
+    repo = results['repo']
+    print(f"合成仓库: {repo['files']} 个文件, {repo['lines']} 行, {repo['bytes'] / 1024 / 1024:.1f} MB, "
+          f"GBK {repo['gbk_files']} 个, 压缩文件 {repo['minified_files']} 个, 忽略 {repo['ignored_files']} 个")
+    print(f"{'阶段':<24}{'中位耗时':>10}{'文件/秒':>12}{'行/秒':>12}{'文件对/秒':>10}{'峰值内存':>12}")
+    for stage, data in results['stages'].items():
+        print(f"{stage:<24}{data['median_seconds']:>9.3f}s{data.get('files_per_second', 0):>12.1f}"
+              f"{data.get('lines_per_second', 0):>12.0f}{data.get('pairs_per_second', 0):>10.2f}"
+              f"{data['peak_rss_mb']:>10.1f}MB")
+
+def main():
+    parser = argparse.ArgumentParser(description="在合成仓库上测量导出流水线和相似度分析的性能")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small", help="合成仓库规模")
+    parser.add_argument("--files", type=int, help="文件数，覆盖预设")
+    parser.add_argument("--line-length", type=int, default=80, help="代码行的目标长度")
+    parser.add_argument("--gbk-ratio", type=float, default=0.2, help="GBK编码文件的比例")
+    parser.add_argument("--minified-ratio", type=float, default=0.02, help="压缩单行文件的比例")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--similarity-documents", type=int, default=SIMILARITY_DOCUMENTS,
+                        help="相似度分析的文档数")
+    parser.add_argument("--similarity-files", type=int, default=SIMILARITY_FILES_PER_DOCUMENT,
+                        help="相似度分析中每个文档包含的文件数")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES, help="要测量的阶段")
+    parser.add_argument("--repeat", type=int, default=3, help="每个阶段重复次数，取中位数")
+    parser.add_argument("--json", dest="json_path", help="将结果写入JSON文件")
+    parser.add_argument("--compare", help="与之前保存的JSON结果比较")
+    parser.add_argument("--keep", help="在指定目录生成合成仓库并保留，默认使用临时目录")
+    # 内部参数：在子进程中运行单个阶段
+    parser.add_argument("--run-stage", help=argparse.SUPPRESS)
+    parser.add_argument("--repo", help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        print(json.dumps(run_stage(args.run_stage, args.repo, args.work_dir)))
+        return
+
+    params = dict(PRESETS[args.preset])
+    if args.files:
+        params['files'] = args.files
+
+    with tempfile.TemporaryDirectory(prefix="scg_bench_") as temp_dir:
+        base_dir = args.keep or temp_dir
+        repo = os.path.join(base_dir, "repo")
+        work_dir = os.path.join(base_dir, "work")
+        os.makedirs(work_dir, exist_ok=True)
+        repo_summary = generate_repo(repo, line_length=args.line_length, gbk_ratio=args.gbk_ratio,
+                                     minified_ratio=args.minified_ratio, seed=args.seed, **params)
+        if any(stage.startswith('similarity') for stage in args.stages):
+            prepare_similarity_documents(repo, work_dir, args.seed, args.similarity_documents, args.similarity_files)
+        repo_summary['params'].update(similarity_documents=args.similarity_documents,
+                                      similarity_files=args.similarity_files)
+
+        results = {'result_version': RESULT_VERSION, 'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                   'environment': environment_info(), 'repo': repo_summary, 'repeat': args.repeat, 'stages': {}}
+        for stage in args.stages:
+            print(f"正在测量 {stage}...", file=sys.stderr)
+            results['stages'][stage] = measure_stage(stage, repo, work_dir, max(1, args.repeat))
+
+    print_report(results)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        print("\n与之前结果比较:")
+        print("\n".join(compare_results(previous, results)))
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ 结果已写入 {args.json_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+本机任务服务压力测试
+在合成仓库上启动任务服务（或连接已运行的服务），由多个客户端线程同时提交导出任务并轮询进度，
+统计提交延迟、排队时间、任务耗时、吞吐量和文件内容缓存命中情况。只使用标准库。
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARK_DIR), "src"))
+
+from synthetic_repo import EXTENSIONS, generate_repo
+
+def request(base_url, method, path, data=None):
+    body = json.dumps(data).encode('utf-8') if data is not None else None
+    req = urllib.request.Request(base_url + path, body, method=method,
+                                 headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=30) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+def run_client(base_url, repos, jobs, poll_interval, client):
+    """依次提交jobs个导出任务并等待完成，返回每个任务的计时"""
+    timings = []
+    for index in range(jobs):
+        repo = repos[(client + index) % len(repos)]
+        start = time.perf_counter()
+        job = request(base_url, 'POST', '/jobs', {
+            'paths': [repo], 'extensions': EXTENSIONS, 'app_name': f"客户端{client}", 'version': f"V{index}"})
+        submitted = time.perf_counter()
+        while job['status'] in ('queued', 'running'):
+            time.sleep(poll_interval)
+            job = request(base_url, 'GET', f"/jobs/{job['id']}")
+        finished = time.perf_counter()
+        timings.append({
+            'status': job['status'],
+            'submit_seconds': submitted - start,
+            'queue_seconds': (job['started_at'] or job['finished_at']) - job['created_at'],
+            'run_seconds': job['finished_at'] - (job['started_at'] or job['finished_at']),
+            'total_seconds': finished - start,
+            'error': job['error'],
+        })
+    return timings
+
+def summarize(values):
+    if not values:
+        return None
+    values = sorted(values)
+    return {'median': round(statistics.median(values), 3),
+            'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+            'max': round(values[-1], 3)}
+
+def main():
+    parser = argparse.ArgumentParser(description="对本机任务服务进行并发压力测试")
+    parser.add_argument("--url", help="已运行服务的地址，如 http://127.0.0.1:8765，默认在本进程中启动服务")
+    parser.add_argument("--clients", type=int, default=8, help="同时提交任务的客户端数")
+    parser.add_argument("--jobs", type=int, default=4, help="每个客户端提交的任务数")
+    parser.add_argument("--workers", type=int, help="服务的工作线程数（仅在本进程中启动服务时有效）")
+    parser.add_argument("--repos", type=int, default=2, help="合成仓库数，任务轮流使用")
+    parser.add_argument("--files", type=int, default=60, help="每个合成仓库的文件数")
+    parser.add_argument("--poll-interval", type=float, default=0.2, help="轮询任务状态的间隔（秒）")
+    parser.add_argument("--json", dest="json_path", help="将结果写入JSON文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="job_service_") as work_dir:
+        repos = []
+        for index in range(args.repos):
+            repo = os.path.join(work_dir, f"repo{index}")
+            generate_repo(repo, files=args.files, seed=42 + index)
+            repos.append(repo)
+
+        server = service = None
+        base_url = args.url
+        if not base_url:
+            from job_server import JobService, create_server
+
+            service = JobService(os.path.join(work_dir, "jobs"), max_workers=args.workers,
+                                 max_finished_jobs=args.clients * args.jobs)
+            server = create_server(service, port=0)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        print(f"{args.clients} 个客户端各提交 {args.jobs} 个任务 -> {base_url}", file=sys.stderr)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as executor:
+            futures = [executor.submit(run_client, base_url, repos, args.jobs, args.poll_interval, client)
+                       for client in range(args.clients)]
+            timings = [timing for future in futures for timing in future.result()]
+        seconds = time.perf_counter() - start
+        status = request(base_url, 'GET', '/status')
+
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            service.shutdown()
+
+    succeeded = [timing for timing in timings if timing['status'] == 'succeeded']
+    results = {
+        'clients': args.clients,
+        'jobs': len(timings),
+        'succeeded': len(succeeded),
+        'errors': sorted({timing['error'] for timing in timings if timing['error']}),
+        'workers': status['workers'],
+        'seconds': round(seconds, 3),
+        'jobs_per_second': round(len(succeeded) / seconds, 3) if seconds else None,
+        'submit_seconds': summarize([timing['submit_seconds'] for timing in timings]),
+        'queue_seconds': summarize([timing['queue_seconds'] for timing in timings]),
+        'run_seconds': summarize([timing['run_seconds'] for timing in succeeded]),
+        'total_seconds': summarize([timing['total_seconds'] for timing in timings]),
+        'cache': status['cache'],
+    }
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
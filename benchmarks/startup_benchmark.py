@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+启动耗时基准测试
+使用 python -X importtime 统计导入各模块的耗时，按顶层模块汇总，
+用于确认界面启动路径上没有加载重量级的分析依赖
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# 默认测量的入口模块：界面启动路径和按需加载的分析模块
+DEFAULT_TARGETS = ["main", "cli", "similarity_analyzer", "document_generator", "file_processor"]
+
+def measure_import(module_name):
+    """在独立进程中导入模块，返回(总耗时秒数, 按顶层包汇总的导入耗时微秒)"""
+    cmd = [sys.executable, "-X", "importtime", "-c", f"import {module_name}"]
+    start = time.perf_counter()
+    result = subprocess.run(cmd, cwd=SRC_DIR, capture_output=True, text=True, encoding='utf-8', errors='replace')
+    elapsed = time.perf_counter() - start
+
+    if result.returncode != 0:
+        last_line = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "未知错误"
+        raise RuntimeError(f"导入 {module_name} 失败: {last_line}")
+
+    # 输出格式: "import time: self [us] | cumulative | imported package"
+    # 按包名第一段汇总各模块自身耗时，避免嵌套导入重复计算
+    by_package = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        package = parts[2].strip().split(".")[0]
+        by_package[package] = by_package.get(package, 0) + int(parts[0].strip())
+
+    return elapsed, by_package
+
+def run_benchmark(targets, repeat, top_n):
+    results = {}
+    for target in targets:
+        runs = []
+        for _ in range(repeat):
+            try:
+                runs.append(measure_import(target))
+            except RuntimeError as e:
+                print(f"✗ {e}")
+                break
+        if not runs:
+            continue
+
+        # 取最快的一次，减少系统抖动的影响
+        elapsed, modules = min(runs, key=lambda r: r[0])
+        ranked = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:top_n]
+        results[target] = {
+            'process_seconds': round(elapsed, 4),
+            'import_seconds': round(sum(modules.values()) / 1e6, 4),
+            'top_modules': [{'module': name, 'import_ms': round(us / 1000, 2)} for name, us in ranked]
+        }
+    return results
+
+def print_report(results):
+    for target, data in results.items():
+        print("\n" + "=" * 60)
+        print(f"import {target}: 导入耗时 {data['import_seconds'] * 1000:.1f} ms, "
+              f"进程总耗时 {data['process_seconds'] * 1000:.1f} ms")
+        print("=" * 60)
+        for item in data['top_modules']:
+            print(f"  {item['import_ms']:>10.2f} ms  {item['module']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="统计各入口模块的导入耗时")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_TARGETS, help="要测量的模块名")
+    parser.add_argument("--repeat", type=int, default=3, help="每个模块重复测量次数")
+    parser.add_argument("--top", type=int, default=15, help="显示耗时最多的前N个顶层包")
+    parser.add_argument("--json", dest="json_path", help="将结果写入JSON文件")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.modules, max(1, args.repeat), args.top)
+    print_report(results)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ 结果已写入 {args.json_path}")
+
+if __name__ == "__main__":
+    main()
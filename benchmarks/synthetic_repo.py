@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+"""
+合成源代码仓库生成器
+按固定随机种子生成可重复的源代码目录树，用于基准测试：
+可配置文件数、每个文件的行数和行长、UTF-8/GBK编码比例、嵌套的.gitignore和压缩（单行超长）文件
+"""
+import argparse
+import json
+import os
+import random
+
+# 预设规模
+PRESETS = {
+    'small': {'files': 200, 'min_lines': 20, 'max_lines': 150},
+    'medium': {'files': 2000, 'min_lines': 20, 'max_lines': 200},
+    'large': {'files': 10000, 'min_lines': 20, 'max_lines': 300},
+}
+
+EXTENSIONS = ['java', 'js', 'ts']
+
+IDENTIFIERS = ['user', 'order', 'item', 'config', 'handler', 'service', 'result', 'value', 'cache', 'request']
+COMMENTS = ['获取用户信息', '初始化配置', '处理请求参数', '校验输入数据', '更新缓存', '返回查询结果', '记录操作日志']
+
+LINE_TEMPLATES = {
+    'java': [
+        'public {a}Result {b}({a}Request {c}) throws ServiceException {{',
+        '    {a}Entity {b} = {c}Repository.findById({c}.getId()).orElse(null);  // {comment}',
+        '    if ({b} == null || {b}.getStatus() != {n}) {{ return {a}Result.fail("{comment}"); }}',
+        '    List<{a}Dto> {b}List = {c}Mapper.selectByCondition({b}, {n}, {m});',
+        '    log.info("{comment}: {{}}", {b}.getId());',
+        '}}',
+    ],
+    'js': [
+        'export function {b}({c}, options = {{}}) {{  // {comment}',
+        '  const {a} = await api.get(`/{b}/${{{c}.id}}`, {{ params: {{ page: {n}, size: {m} }} }});',
+        '  if (!{a} || {a}.code !== {n}) {{ throw new Error("{comment}"); }}',
+        '  return {a}.data.map(({c}) => ({{ ...{c}, {b}: {c}.{b} * {n} }}));',
+        '}}',
+    ],
+    'ts': [
+        'export interface {a}Props {{ {b}: string; {c}?: number; }}  // {comment}',
+        'const {b}: Record<string, {a}Props> = {{ {c}: {{ {b}: "{comment}", {c}: {n} }} }};',
+        'export async function {b}({c}: {a}Props): Promise<void> {{',
+        '  this.{b}Store.update({c}.{b}, {{ count: {n}, limit: {m} }});',
+        '}}',
+    ],
+}
+
+def random_line(rng, ext, line_length):
+    """按模板生成一行代码，行长不足line_length时追加注释补足"""
+    line = rng.choice(LINE_TEMPLATES[ext]).format(
+        a=rng.choice(IDENTIFIERS).capitalize(), b=rng.choice(IDENTIFIERS) + str(rng.randint(0, 99)),
+        c=rng.choice(IDENTIFIERS), n=rng.randint(0, 1000), m=rng.randint(0, 100), comment=rng.choice(COMMENTS))
+    if len(line) < line_length:
+        line += " // " + rng.choice(COMMENTS) * ((line_length - len(line)) // 12 + 1)
+    return line[:max(line_length, 20)]
+
+def random_file_lines(rng, ext, min_lines, max_lines, line_length):
+    return [random_line(rng, ext, line_length) for _ in range(rng.randint(min_lines, max_lines))]
+
+def generate_repo(root, files=200, min_lines=20, max_lines=150, line_length=80, gbk_ratio=0.2,
+                  minified_ratio=0.02, minified_length=20000, ignored_ratio=0.05, depth=3, seed=42):
+    """在root下生成合成仓库，返回描述仓库内容的清单
+
+    - gbk_ratio: 以GBK编码保存的文件比例，其余为UTF-8
+    - minified_ratio: 压缩成一行（长度约minified_length）的.min.js文件比例
+    - ignored_ratio: 写入generated/目录、被根目录.gitignore忽略的文件比例；
+      部分子目录另有自己的.gitignore（*.tmp、build/），并带有被这些规则忽略的构建产物和临时文件，
+      同样计入ignored_files。导出时只读取根目录的.gitignore，因此根目录也忽略build/
+    """
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, ".gitignore"), 'w', encoding='utf-8') as f:
+        f.write("# 生成的文件\ngenerated/\nbuild/\n*.log\n")
+
+    summary = {'files': 0, 'ignored_files': 0, 'gbk_files': 0, 'minified_files': 0, 'lines': 0, 'bytes': 0,
+               'nested_gitignores': 0, 'lines_by_ext': {}}
+    for index in range(files):
+        # 按层级生成目录：module3/sub1/part0/...
+        parts = [f"module{rng.randint(0, max(1, files // 50))}"]
+        for level in range(rng.randint(0, depth)):
+            parts.append(f"{['sub', 'part', 'pkg'][level % 3]}{rng.randint(0, 4)}")
+        directory = os.path.join(root, *parts)
+
+        ignored = rng.random() < ignored_ratio
+        if ignored:
+            directory = os.path.join(root, "generated", *parts[1:])
+        os.makedirs(directory, exist_ok=True)
+
+        # 部分目录带有自己的.gitignore
+        nested_gitignore = os.path.join(directory, ".gitignore")
+        if not ignored and not os.path.exists(nested_gitignore) and rng.random() < 0.1:
+            with open(nested_gitignore, 'w', encoding='utf-8') as f:
+                f.write("*.tmp\nbuild/\n")
+            summary['nested_gitignores'] += 1
+            # 被该.gitignore忽略的构建产物和编辑器临时文件
+            ext = rng.choice(EXTENSIONS)
+            lines = random_file_lines(rng, ext, min_lines, max_lines, line_length)
+            os.makedirs(os.path.join(directory, "build"), exist_ok=True)
+            for ignored_path in (os.path.join(directory, "build", f"Generated{index}.{ext}"),
+                                 os.path.join(directory, f"Generated{index}.{ext}.tmp")):
+                with open(ignored_path, 'w', encoding='utf-8') as f:
+                    f.write("\n".join(lines) + "\n")
+                summary['ignored_files'] += 1
+
+        minified = rng.random() < minified_ratio
+        if minified:
+            ext = 'js'
+            filename = f"bundle{index}.min.js"
+            body = ";".join(random_line(rng, ext, 0) for _ in range(minified_length // 60))
+            lines = [body[:minified_length]]
+        else:
+            ext = rng.choice(EXTENSIONS)
+            filename = f"{rng.choice(IDENTIFIERS).capitalize()}{index}.{ext}"
+            lines = random_file_lines(rng, ext, min_lines, max_lines, line_length)
+
+        encoding = 'gbk' if rng.random() < gbk_ratio else 'utf-8'
+        data = ("\n".join(lines) + "\n").encode(encoding)
+        with open(os.path.join(directory, filename), 'wb') as f:
+            f.write(data)
+
+        if ignored:
+            summary['ignored_files'] += 1
+            continue
+        summary['files'] += 1
+        summary['lines'] += len(lines)
+        summary['bytes'] += len(data)
+        summary['gbk_files'] += encoding == 'gbk'
+        summary['minified_files'] += minified
+        summary['lines_by_ext'][ext] = summary['lines_by_ext'].get(ext, 0) + len(lines)
+
+    summary['params'] = {'files': files, 'min_lines': min_lines, 'max_lines': max_lines,
+                         'line_length': line_length, 'gbk_ratio': gbk_ratio, 'minified_ratio': minified_ratio,
+                         'minified_length': minified_length, 'ignored_ratio': ignored_ratio, 'depth': depth,
+                         'seed': seed}
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="生成用于基准测试的合成源代码仓库")
+    parser.add_argument("root", help="输出目录")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small", help="预设规模")
+    parser.add_argument("--files", type=int, help="文件数，覆盖预设")
+    parser.add_argument("--line-length", type=int, default=80, help="代码行的目标长度")
+    parser.add_argument("--gbk-ratio", type=float, default=0.2, help="GBK编码文件的比例")
+    parser.add_argument("--minified-ratio", type=float, default=0.02, help="压缩单行文件的比例")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    params = dict(PRESETS[args.preset])
+    if args.files:
+        params['files'] = args.files
+    summary = generate_repo(args.root, line_length=args.line_length, gbk_ratio=args.gbk_ratio,
+                            minified_ratio=args.minified_ratio, seed=args.seed, **params)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -58,7 +58,7 @@ build_exe_options = {
     "excludes": [
         "matplotlib", "PyQt5", "PySide2", "wx", "pandas", 
         "scipy", "notebook", "jupyter", "IPython", "tornado", 
-        "zmq", "sqlite3", "test", "unittest", "pydoc"
+        "zmq", "test", "unittest", "pydoc"
     ],
     "include_files": [
         ("assets", "assets")
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# 用户缓存目录下的应用目录名，与打包后的程序名一致
+APP_NAME = "SoftwareCopyrightGenerator"
+
+def user_cache_dir(*parts):
+    """返回当前用户的缓存目录（Windows为%LOCALAPPDATA%，其他系统为~/.cache）下的路径
+
+    打包后的程序目录可能只读或为多个用户共享，各类缓存和结果库都保存在这里。
+    """
+    if os.name == 'nt':
+        base_dir = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), 'AppData', 'Local')
+    else:
+        base_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base_dir, APP_NAME, *parts)
+
+class AnalysisCache:
+    """相似度分析的磁盘缓存，按文件内容哈希保存清理后的文本行、行哈希和指纹
+
+    各条目的大小和访问顺序保存在内存索引中，首次写入时扫描一次缓存目录，
+    之后写入只在超出数量或大小限制时删除最久未访问的条目。
+    其他进程同时写入的条目在下次创建AnalysisCache时计入索引。
+    """
+
+    # 缓存条目格式版本，格式变化时旧条目自动失效
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_dir=None, max_entries=500, max_size_mb=256):
+        self.cache_dir = cache_dir or user_cache_dir("analysis")
+        self.max_entries = max_entries
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        # 写入失败的次数（如缓存目录只读），写入失败不影响分析
+        self.write_errors = 0
+        self._lock = threading.Lock()
+        # 键 -> 条目大小，按最近访问顺序排列；首次写入时加载
+        self._index = None
+        self._total_size = 0
+
+    def file_hash(self, file_path):
+        """计算文件内容的SHA1哈希值，作为缓存键"""
+        sha1 = hashlib.sha1()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha1.update(chunk)
+        return sha1.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """读取缓存条目，不存在或已失效时返回None"""
+        entry_path = self._entry_path(key)
+        entry = None
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if entry.get('version') != self.CACHE_VERSION:
+                entry = None
+            else:
+                # 更新访问时间，用于LRU淘汰
+                os.utime(entry_path, None)
+        except (OSError, ValueError):
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                if self._index is not None and key in self._index:
+                    self._index.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        """写入缓存条目，超出限制时按淘汰策略清理旧条目；写入失败时只计入write_errors"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entry = dict(entry, version=self.CACHE_VERSION)
+            entry_path = self._entry_path(key)
+            # 先写临时文件再替换，避免并发读取到不完整的条目
+            tmp_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, entry_path)
+        except OSError:
+            with self._lock:
+                self.write_errors += 1
+            return
+
+        with self._lock:
+            self._load_index()
+            self._total_size += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._evict()
+
+    def _load_index(self):
+        """扫描缓存目录建立内存索引，按修改（访问）时间排序，需持有锁"""
+        if self._index is not None:
+            return
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            names = []
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                # 扫描期间被其他进程删除的条目
+                continue
+            entries.append((stat.st_mtime, name[:-len('.json')], stat.st_size))
+        entries.sort()
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._total_size = sum(self._index.values())
+
+    def _evict(self):
+        """按最近访问顺序淘汰条目，直到数量和总大小都在限制之内，需持有锁"""
+        while self._index and (len(self._index) > self.max_entries or self._total_size > self.max_size_bytes):
+            key, size = self._index.popitem(last=False)
+            self._total_size -= size
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+
+    def evict(self):
+        """按最近访问时间淘汰条目，直到数量和总大小都在限制之内"""
+        with self._lock:
+            self._load_index()
+            self._evict()
+
+    def clear(self):
+        """清空缓存目录"""
+        with self._lock:
+            self._index = None
+            if not os.path.isdir(self.cache_dir):
+                return
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.json'):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                    except OSError:
+                        pass
+
+    def reset_stats(self):
+        """重置命中统计"""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.write_errors = 0
+
+    def get_stats(self):
+        """获取命中统计"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'write_errors': self.write_errors}
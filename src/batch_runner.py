@@ -0,0 +1,226 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config_manager import ConfigManager
+from content_cache import FileContentCache
+from export_pipeline import ExportPipeline, ExportCancelled
+from file_processor import FileProcessor
+
+# 任务清单中每个任务可设置的参数及默认值
+JOB_DEFAULTS = {
+    'paths': [],
+    'mode': '默认模式',
+    'extensions': None,
+    'gitignore': None,
+    'root_dir': None,
+    'app_name': '',
+    'version': '',
+    'font': '微软雅黑',
+    'app_name_font': '微软雅黑',
+    'version_font': '微软雅黑',
+    'lines_per_page': 50,
+    'toc': False,
+    'line_numbers': False,
+    'output': None,
+    'profile_json': False,
+}
+
+class BatchRunner:
+    """按任务清单批量生成多个项目、多个版本的源代码文档
+
+    任务清单为JSON文件：
+        {"output_dir": "输出目录", "defaults": {公共参数}, "jobs": [{"paths": [...], "app_name": ..., "version": ...}, ...]}
+    清单中的相对路径相对于清单文件所在目录。任务在线程池中运行，所有任务共享同一个
+    FileContentCache，多个项目共用的库文件只读取、检测编码和解码一次。
+    单个任务失败不影响其他任务，失败原因记录在汇总中。
+    """
+
+    def __init__(self, max_workers=None, content_cache=None, config_manager=None):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.content_cache = content_cache or FileContentCache()
+        self.config_manager = config_manager or ConfigManager()
+        self._pipelines = []
+        self._lock = threading.Lock()
+        self._cancelled = False
+
+    def load_manifest(self, manifest_path, output_dir=None):
+        """读取并校验任务清单，返回(输出目录, 任务列表)"""
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if isinstance(manifest, list):
+            manifest = {'jobs': manifest}
+        base_dir = os.path.dirname(os.path.abspath(manifest_path))
+        output_dir = output_dir or self.resolve_path(manifest.get('output_dir'), base_dir) or os.getcwd()
+        defaults = dict(JOB_DEFAULTS, **manifest.get('defaults', {}))
+        jobs = [self.prepare_job(entry, defaults, base_dir, f"任务 {index + 1} ")
+                for index, entry in enumerate(manifest.get('jobs', []))]
+        if not jobs:
+            raise ValueError("任务清单中没有任务")
+
+        # 同名文档会相互覆盖，提前报错
+        names = [os.path.normcase(os.path.abspath(job['output'])) if job['output'] else (job['app_name'], job['version'])
+                 for job in jobs]
+        duplicates = {name for name in names if names.count(name) > 1}
+        if duplicates:
+            raise ValueError(f"多个任务的输出文档相同，请设置不同的软件名称、版本号或output: {duplicates}")
+        return output_dir, jobs
+
+    @staticmethod
+    def resolve_path(path, base_dir):
+        return path if path is None else os.path.join(base_dir, os.path.expanduser(path))
+
+    def prepare_job(self, entry, defaults=None, base_dir=None, label="任务"):
+        """合并默认参数并校验单个任务，相对路径相对于base_dir（默认为当前目录），返回任务字典"""
+        base_dir = base_dir or os.getcwd()
+        unknown = set(entry) - set(JOB_DEFAULTS)
+        if unknown:
+            raise ValueError(f"{label}包含未知参数: {', '.join(sorted(unknown))}")
+        job = dict(defaults or JOB_DEFAULTS, **entry)
+        if isinstance(job['paths'], str):
+            job['paths'] = [job['paths']]
+        if not job['paths']:
+            raise ValueError(f"{label}未指定项目路径")
+        job['paths'] = [self.resolve_path(path, base_dir) for path in job['paths']]
+        missing = [path for path in job['paths'] if not os.path.exists(path)]
+        if missing:
+            raise ValueError(f"{label}的项目路径不存在: {', '.join(missing)}")
+        for key in ('gitignore', 'root_dir', 'output'):
+            job[key] = self.resolve_path(job[key], base_dir)
+        job['extensions'] = self.resolve_extensions(job)
+        if not isinstance(job['lines_per_page'], int) or job['lines_per_page'] <= 0:
+            raise ValueError(f"{label}的每页行数必须大于0")
+        return job
+
+    def resolve_extensions(self, job):
+        """任务指定了extensions时直接使用，否则按文件类型模式查找"""
+        extensions = job['extensions']
+        if extensions:
+            if isinstance(extensions, str):
+                extensions = extensions.split(',')
+            return [ext.strip().lstrip('.') for ext in extensions if ext.strip()]
+        self.config_manager.load_config()
+        modes = self.config_manager.get_file_type_modes()
+        if job['mode'] not in modes:
+            raise ValueError(f"未知的文件类型模式: {job['mode']}")
+        return modes[job['mode']]
+
+    def cancel(self):
+        """取消所有未完成的任务"""
+        with self._lock:
+            self._cancelled = True
+            for pipeline in self._pipelines:
+                pipeline.cancel()
+
+    def run_job(self, job, output_dir, progress_callback=None, pipeline=None):
+        """运行单个任务，返回该任务的结果摘要
+
+        progress_callback与ExportPipeline.build相同；传入pipeline时使用该流水线，调用方可单独取消此任务。
+        """
+        summary = {'app_name': job['app_name'], 'version': job['version'], 'paths': job['paths']}
+        pipeline = pipeline or ExportPipeline(FileProcessor(self.content_cache))
+        with self._lock:
+            if self._cancelled:
+                summary['error'] = "已取消"
+                return summary
+            self._pipelines.append(pipeline)
+
+        start = time.perf_counter()
+        try:
+            result = pipeline.build(
+                job['paths'], job['extensions'], job['gitignore'], job['root_dir'], job['font'],
+                job['lines_per_page'], job['app_name'], job['version'], job['app_name_font'],
+                job['version_font'], job['toc'], job['line_numbers'], progress_callback
+            )
+            build_seconds = time.perf_counter() - start
+            save_path = job['output'] or os.path.join(output_dir, result['filename'])
+            os.makedirs(os.path.dirname(os.path.abspath(save_path)), exist_ok=True)
+            log_path = pipeline.save(result, save_path, progress_callback, job['profile_json'])
+        except ExportCancelled:
+            summary['error'] = "已取消"
+            return summary
+        except Exception as e:
+            summary['error'] = str(e)
+            return summary
+        finally:
+            with self._lock:
+                self._pipelines.remove(pipeline)
+
+        summary.update({
+            'output': os.path.abspath(save_path),
+            'log': os.path.abspath(log_path),
+            'profile_path': result.get('profile_path'),
+            'file_count': result['file_count'],
+            'total_code_lines': result['total_code_lines'],
+            'page_count': round(result['page_count'], 1),
+            'seconds': {'build': round(build_seconds, 3),
+                        'save': round(time.perf_counter() - start - build_seconds, 3)},
+            'stages': {name: round(record['wall_seconds'], 3) for name, record in result['profile']['stages'].items()}
+        })
+        return summary
+
+    def run(self, jobs, output_dir, progress_callback=None):
+        """在线程池中运行所有任务，返回汇总信息
+
+        progress_callback(已完成任务数, 任务总数, 任务摘要)在每个任务结束时调用。
+        """
+        self._cancelled = False
+        start = time.perf_counter()
+        os.makedirs(output_dir, exist_ok=True)
+        results = [None] * len(jobs)
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.run_job, job, output_dir): index for index, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                index = futures[future]
+                results[index] = future.result()
+                done += 1
+                if progress_callback:
+                    progress_callback(done, len(jobs), results[index])
+
+        succeeded = [result for result in results if 'error' not in result]
+        return {
+            'output_dir': os.path.abspath(output_dir),
+            'job_count': len(jobs),
+            'succeeded': len(succeeded),
+            'failed': len(jobs) - len(succeeded),
+            'total_files': sum(result['file_count'] for result in succeeded),
+            'total_code_lines': sum(result['total_code_lines'] for result in succeeded),
+            'total_pages': round(sum(result['page_count'] for result in succeeded), 1),
+            'seconds': round(time.perf_counter() - start, 3),
+            'workers': self.max_workers,
+            'cache': dict(self.content_cache.stats),
+            'jobs': results
+        }
+
+    @staticmethod
+    def format_summary(summary):
+        """将汇总信息格式化为文本"""
+        lines = [f"批量导出: 共 {summary['job_count']} 个任务，成功 {summary['succeeded']} 个，"
+                 f"失败 {summary['failed']} 个，耗时 {summary['seconds']:.1f} 秒",
+                 f"合计: {summary['total_files']} 个文件, {summary['total_code_lines']} 行代码, "
+                 f"约 {summary['total_pages']} 页"]
+        cache = summary['cache']
+        lines.append(f"文件内容缓存: 解码 {cache['misses']} 个文件, 按路径命中 {cache['path_hits']} 次, "
+                     f"按内容命中 {cache['content_hits']} 次")
+        lines.append("")
+        for job in summary['jobs']:
+            title = f"{job['app_name']} {job['version']}".strip() or ", ".join(job['paths'])
+            if 'error' in job:
+                lines.append(f"  ✗ {title}: {job['error']}")
+            else:
+                seconds = job['seconds']['build'] + job['seconds']['save']
+                lines.append(f"  ✓ {title}: {job['file_count']} 个文件, {job['total_code_lines']} 行, "
+                             f"约 {job['page_count']} 页, {seconds:.1f} 秒 -> {job['output']}")
+        return "\n".join(lines)
+
+    def write_summary(self, summary):
+        """在输出目录中写入JSON和文本格式的汇总，返回JSON汇总文件路径"""
+        summary_path = os.path.join(summary['output_dir'], "批量导出汇总.json")
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(summary['output_dir'], "批量导出汇总.txt"), 'w', encoding='utf-8') as f:
+            f.write(self.format_summary(summary) + "\n")
+        return summary_path
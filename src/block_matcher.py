@@ -0,0 +1,149 @@
+import numpy as np
+
+# 行块匹配规则变化时递增，使结果库中保存的旧结果失效
+BLOCK_MATCHER_VERSION = 2
+
+class CopiedBlockFinder:
+    """基于后缀数组查找两个文档之间连续相同的行块
+
+    将两个文档的行哈希序列用唯一分隔符拼接后构建后缀数组和LCP数组，
+    再计算文档2每个位置在文档1中的最长匹配（匹配统计量），
+    从中提取左极大的公共行块(start1, start2, length)。
+    行哈希等于ignore_hash的行（空行和被过滤的样板行）各自映射为唯一符号，不会出现在任何行块中。
+    """
+
+    def __init__(self, min_length=3, ignore_hash=None):
+        # 报告的行块最少包含的行数
+        self.min_length = min_length
+        self.ignore_hash = ignore_hash
+
+    def build_suffix_array(self, sequence):
+        """前缀倍增法构建后缀数组，每轮使用NumPy排序，O(n log^2 n)"""
+        n = len(sequence)
+        if n == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        rank = sequence.astype(np.int64)
+        suffix_array = np.argsort(rank, kind='stable')
+        k = 1
+        while k < n:
+            # 以(rank[i], rank[i+k])为键排序，越界部分记为-1
+            second = np.full(n, -1, dtype=np.int64)
+            second[:n - k] = rank[k:]
+            suffix_array = np.lexsort((second, rank))
+
+            first_sorted = rank[suffix_array]
+            second_sorted = second[suffix_array]
+            changed = np.empty(n, dtype=bool)
+            changed[0] = True
+            changed[1:] = (first_sorted[1:] != first_sorted[:-1]) | (second_sorted[1:] != second_sorted[:-1])
+
+            new_rank = np.empty(n, dtype=np.int64)
+            new_rank[suffix_array] = np.cumsum(changed) - 1
+            rank = new_rank
+            if rank[suffix_array[-1]] == n - 1:
+                break
+            k *= 2
+        return suffix_array
+
+    def build_lcp(self, sequence, suffix_array):
+        """Kasai算法计算LCP数组，lcp[r]为排名r与r-1的后缀的最长公共前缀，O(n)"""
+        n = len(sequence)
+        seq = sequence.tolist()
+        sa = suffix_array.tolist()
+        rank = [0] * n
+        for r, pos in enumerate(sa):
+            rank[pos] = r
+
+        lcp = [0] * n
+        h = 0
+        for i in range(n):
+            r = rank[i]
+            if r > 0:
+                j = sa[r - 1]
+                while i + h < n and j + h < n and seq[i + h] == seq[j + h]:
+                    h += 1
+                lcp[r] = h
+                if h > 0:
+                    h -= 1
+            else:
+                h = 0
+        return lcp
+
+    def _to_symbols(self, hashes1, hashes2):
+        """将两个文档的行哈希映射为紧凑的整数符号，中间插入唯一的分隔符后拼接
+
+        被忽略的行和分隔符一样使用互不相同的符号，行块在这些位置断开。
+        """
+        combined = np.concatenate((hashes1, hashes2))
+        _, symbols = np.unique(combined, return_inverse=True)
+        symbols = symbols.astype(np.int64).ravel()
+        separator = int(symbols.max()) + 1
+        if self.ignore_hash is not None:
+            ignored = np.flatnonzero(combined == self.ignore_hash)
+            symbols[ignored] = separator + 1 + np.arange(len(ignored))
+        n1 = len(hashes1)
+        return np.concatenate((symbols[:n1], [separator], symbols[n1:]))
+
+    def find_blocks(self, hashes1, hashes2, limit=None):
+        """查找文档间连续相同的行块，返回按长度降序排列的[(start1, start2, length)]"""
+        n1, n2 = len(hashes1), len(hashes2)
+        if n1 == 0 or n2 == 0:
+            return []
+
+        sequence = self._to_symbols(np.asarray(hashes1, dtype=np.uint64), np.asarray(hashes2, dtype=np.uint64))
+        suffix_array = self.build_suffix_array(sequence)
+        lcp = self.build_lcp(sequence, suffix_array)
+        sa = suffix_array.tolist()
+        n = len(sa)
+        offset2 = n1 + 1
+
+        # 匹配统计量：文档2每个位置在文档1中的最长匹配长度和起点
+        best_length = [0] * n2
+        best_start = [0] * n2
+
+        # 正向扫描：与排在前面的最近文档1后缀比较
+        current_length, current_start = 0, -1
+        for r in range(n):
+            pos = sa[r]
+            if r > 0:
+                current_length = min(current_length, lcp[r])
+            if pos < n1:
+                current_length, current_start = n1 - pos, pos
+            elif pos > n1 and current_start >= 0 and current_length > best_length[pos - offset2]:
+                best_length[pos - offset2] = current_length
+                best_start[pos - offset2] = current_start
+
+        # 反向扫描：与排在后面的最近文档1后缀比较
+        current_length, current_start = 0, -1
+        for r in range(n - 1, -1, -1):
+            pos = sa[r]
+            if pos < n1:
+                current_length, current_start = n1 - pos, pos
+            elif pos > n1 and current_start >= 0 and current_length > best_length[pos - offset2]:
+                best_length[pos - offset2] = current_length
+                best_start[pos - offset2] = current_start
+            current_length = min(current_length, lcp[r])
+
+        # 提取左极大的行块：前一位置的匹配不能向左延伸到这里
+        blocks = []
+        for j in range(n2):
+            length = best_length[j]
+            if length < self.min_length:
+                continue
+            if j > 0 and best_length[j - 1] == length + 1 and best_start[j - 1] + 1 == best_start[j]:
+                continue
+            blocks.append((best_start[j], j, length))
+
+        # 按长度降序选取，丢弃完全包含在已选行块中的结果
+        blocks.sort(key=lambda b: (-b[2], b[1], b[0]))
+        selected = []
+        for start1, start2, length in blocks:
+            contained = any(s2 <= start2 and start2 + length <= s2 + l
+                            and s1 <= start1 and start1 + length <= s1 + l
+                            for s1, s2, l in selected)
+            if not contained:
+                selected.append((start1, start2, length))
+                if limit is not None and len(selected) >= limit:
+                    break
+        return selected
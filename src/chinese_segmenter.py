@@ -0,0 +1,137 @@
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import jieba
+
+# 连续的中文字符
+CHINESE_RUN_PATTERN = re.compile(r'[\u4e00-\u9fff]+')
+
+# 分词规则变化时递增，使缓存条目和结果库中的旧结果失效
+SEGMENTER_VERSION = 1
+
+# 待分词的文本数达到该值时才值得启动进程池并行分词
+PARALLEL_MIN_LINES = 2000
+
+class ChineseSegmenter:
+    """结巴分词的封装：词典缓存、后台预热、重复行记忆化和多进程并行分词
+
+    结巴首次分词时需要从词典构建前缀词典，耗时较长。这里把生成的词典缓存文件
+    放在cache_dir中，之后启动时直接加载（cache_dir为None时使用结巴默认的临时目录）；
+    也可以在后台线程中提前加载。
+    代码中的中文注释大量重复（如“获取数据”“初始化”），分词结果按行记忆化。
+    """
+
+    def __init__(self, cache_dir=None, memo_size=50000):
+        self.cache_dir = cache_dir
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        self._warm_up_thread = None
+        self.initialized = False
+        # 统计信息：词典加载耗时、记忆化命中次数
+        self.stats = {'load_seconds': None, 'memo_hits': 0, 'memo_misses': 0}
+
+    def initialize(self):
+        """加载结巴词典，优先使用缓存目录中的预构建缓存文件"""
+        with self._init_lock:
+            if self.initialized:
+                return
+            start = time.perf_counter()
+            if self.cache_dir:
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    jieba.dt.tmp_dir = self.cache_dir
+                except OSError as e:
+                    print(f"无法创建分词缓存目录: {e}")
+            jieba.initialize()
+            self.stats['load_seconds'] = time.perf_counter() - start
+            self.initialized = True
+
+    def warm_up_async(self):
+        """在后台线程中加载词典，不阻塞调用方"""
+        if not self.initialized and self._warm_up_thread is None:
+            self._warm_up_thread = threading.Thread(target=self.initialize, daemon=True)
+            self._warm_up_thread.start()
+
+    def segment_text(self, text):
+        """对中文文本分词，返回去除空白的词列表，同一文本只分词一次"""
+        with self._memo_lock:
+            words = self._memo.get(text)
+            if words is not None:
+                self._memo.move_to_end(text)
+                self.stats['memo_hits'] += 1
+                return words
+            self.stats['memo_misses'] += 1
+
+        self.initialize()
+        words = [word for word in jieba.cut(text) if word.strip()]
+        self._remember(text, words)
+        return words
+
+    def _remember(self, text, words):
+        """写入记忆化缓存，超过容量时淘汰最久未使用的条目"""
+        with self._memo_lock:
+            self._memo[text] = words
+            self._memo.move_to_end(text)
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+
+    def chinese_text(self, line):
+        """提取一行中的中文部分，以空格分隔各段连续中文"""
+        return " ".join(CHINESE_RUN_PATTERN.findall(line))
+
+    def prime(self, texts, parallel=False, max_workers=None):
+        """预先对一批文本分词并写入记忆化缓存，文本较多时在进程池中并行分词"""
+        with self._memo_lock:
+            pending = list(OrderedDict.fromkeys(text for text in texts if text not in self._memo))
+        if not pending:
+            return
+        if parallel and len(pending) >= PARALLEL_MIN_LINES:
+            from parallel_analysis import default_worker_count
+            # 先在主进程中生成词典缓存文件，工作进程直接加载
+            self.initialize()
+            workers = max_workers or default_worker_count(len(pending) // 500 + 1)
+            chunks = [pending[i::workers] for i in range(workers)]
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_segment_worker,
+                                     initargs=(self.cache_dir,)) as executor:
+                for chunk, segmented in zip(chunks, executor.map(_segment_task, chunks)):
+                    for text, words in zip(chunk, segmented):
+                        self._remember(text, words)
+        else:
+            for text in pending:
+                self.segment_text(text)
+
+    def document_terms(self, lines):
+        """统计文档中所有中文内容（注释、字符串等）的词频"""
+        terms = Counter()
+        for line in lines:
+            text = self.chinese_text(line)
+            if text:
+                terms.update(self.segment_text(text))
+        return terms
+
+    @staticmethod
+    def terms_similarity(terms1, terms2):
+        """两个词频表的加权Jaccard相似度：Σmin / Σmax，返回百分比；两边都没有中文时返回None"""
+        if not terms1 and not terms2:
+            return None
+        shared = sum(min(count, terms2[word]) for word, count in terms1.items() if word in terms2)
+        total = sum(terms1.values()) + sum(terms2.values()) - shared
+        return shared / total * 100 if total else 0
+
+# 工作进程中的分词器
+_worker_segmenter = None
+
+def _init_segment_worker(cache_dir):
+    """工作进程初始化：从缓存文件加载词典"""
+    global _worker_segmenter
+    _worker_segmenter = ChineseSegmenter(cache_dir)
+    _worker_segmenter.initialize()
+
+def _segment_task(texts):
+    """在工作进程中对一批文本分词"""
+    return [_worker_segmenter.segment_text(text) for text in texts]
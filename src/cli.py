@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+"""
+命令行入口
+无需图形界面即可生成源代码文档或分析文件相似度，适用于构建服务器和批量处理。
+不导入tkinter、PIL和sv_ttk，相似度分析模块只在similarity子命令中才导入。
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from config_manager import ConfigManager
+from export_pipeline import ExportPipeline
+from progress_tracker import ProgressTracker, format_rates
+
+def resolve_extensions(args, config_manager):
+    """根据--extensions或--mode确定文件类型列表"""
+    if args.extensions:
+        return [ext.strip().lstrip('.') for ext in args.extensions.split(',') if ext.strip()]
+    config_manager.load_config()
+    modes = config_manager.get_file_type_modes()
+    if args.mode not in modes:
+        raise ValueError(f"未知的文件类型模式: {args.mode}，可用模式: {', '.join(modes)}")
+    return modes[args.mode]
+
+def resolve_output_path(output, filename):
+    """输出参数为.docx文件时直接使用，否则视为目录"""
+    if output and output.lower().endswith('.docx'):
+        return output
+    output_dir = output or os.getcwd()
+    os.makedirs(output_dir, exist_ok=True)
+    return os.path.join(output_dir, filename)
+
+def run_export(args):
+    """生成源代码文档，返回统计信息"""
+    extensions = resolve_extensions(args, ConfigManager())
+    if args.lines_per_page <= 0:
+        raise ValueError("每页行数必须大于0")
+
+    tracker = ProgressTracker(min_interval=1.0)
+
+    def report(stage, current, total, detail, lines=None):
+        if not args.verbose:
+            return
+        snapshot = tracker.update(stage, current, total, detail, lines)
+        if snapshot is not None:
+            count = f"{snapshot['current']}/{snapshot['total']}" if snapshot['total'] else snapshot['current']
+            print(f"{snapshot['label']} [{count}] {format_rates(snapshot)}", file=sys.stderr)
+
+    pipeline = ExportPipeline(trace_memory=args.trace_memory)
+    if args.dry_run:
+        result = pipeline.dry_run(args.paths, extensions, args.gitignore, args.root_dir, args.lines_per_page, report)
+        if not args.json:
+            print(pipeline.format_dry_run(result))
+        result['page_count'] = round(result['page_count'], 1)
+        result['seconds'] = round(result['seconds'], 3)
+        return result
+
+    start = time.perf_counter()
+    result = pipeline.build(
+        args.paths, extensions, args.gitignore, args.root_dir, args.font, args.lines_per_page,
+        args.app_name, args.version, args.app_name_font, args.version_font,
+        args.toc, args.line_numbers, report
+    )
+    build_seconds = time.perf_counter() - start
+
+    save_path = resolve_output_path(args.output, result['filename'])
+    start = time.perf_counter()
+    log_path = pipeline.save(result, save_path, report, args.profile_json)
+    save_seconds = time.perf_counter() - start
+
+    return {
+        'output': os.path.abspath(save_path),
+        'log': os.path.abspath(log_path),
+        'file_count': result['file_count'],
+        'ignored_file_count': len(result['ignored_files']),
+        'total_code_lines': result['total_code_lines'],
+        'document_lines': result['line_count'],
+        'page_count': round(result['page_count'], 1),
+        'lines_by_ext': result['lines_by_ext'],
+        'seconds': {'build': round(build_seconds, 3), 'save': round(save_seconds, 3)},
+        'profile': result['profile'],
+        'profile_path': result.get('profile_path')
+    }
+
+def run_watch(args):
+    """监视模式：源代码变化后重新生成文档，按Ctrl+C结束，返回最后一次导出的统计信息"""
+    from export_watcher import ExportWatcher
+
+    extensions = resolve_extensions(args, ConfigManager())
+    if args.lines_per_page <= 0:
+        raise ValueError("每页行数必须大于0")
+
+    def report(event, data):
+        if args.json:
+            # 每个事件输出一行JSON，便于其他程序逐行读取
+            print(json.dumps({'event': event, 'data': data}, ensure_ascii=False), flush=True)
+        elif event == 'export':
+            changes = data['changes']
+            print(f"[{time.strftime('%H:%M:%S')}] 文档已更新: {data['output']} "
+                  f"(新增 {changes['added']}, 修改 {changes['modified']}, 删除 {changes['removed']}, "
+                  f"重新读取 {data['reread_files']} 个文件, 共 {data['total_code_lines']} 行, "
+                  f"约 {data['page_count']} 页, {data['seconds']:.1f} 秒)", flush=True)
+        elif event == 'error':
+            print(f"[{time.strftime('%H:%M:%S')}] 错误: {data}", file=sys.stderr, flush=True)
+        elif args.verbose:
+            print(f"[{time.strftime('%H:%M:%S')}] 检测到变化: 新增 {len(data['added'])}, "
+                  f"修改 {len(data['modified'])}, 删除 {len(data['removed'])}", file=sys.stderr, flush=True)
+
+    build_options = {
+        'font_name': args.font, 'lines_per_page': args.lines_per_page, 'app_name': args.app_name,
+        'version': args.version, 'app_name_font': args.app_name_font, 'version_font': args.version_font,
+        'generate_toc': args.toc, 'show_line_numbers': args.line_numbers
+    }
+    watcher = ExportWatcher(args.paths, extensions, args.gitignore, args.root_dir, build_options,
+                            lambda filename: resolve_output_path(args.output, filename),
+                            args.interval, args.debounce, event_callback=report)
+    if not args.json:
+        print(f"正在监视 {', '.join(args.paths)}，按Ctrl+C结束", file=sys.stderr)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+    return {'export_count': watcher.export_count, 'last_export': watcher.last_export}
+
+def run_similarity(args):
+    """分析文件或项目目录的相似度，返回统计信息"""
+    from similarity_analyzer import SimilarityAnalyzer
+
+    directory_count = sum(1 for path in args.files if os.path.isdir(path))
+    if 0 < directory_count < len(args.files):
+        raise ValueError("不能混合比较项目目录和Word文档")
+    if directory_count and (args.analysis != 'exact' or args.parallel or args.output):
+        # 目录比较只有基于行索引的序列相似度一种方式
+        raise ValueError("比较项目目录时只支持序列相似度（--analysis exact），不支持 --parallel 和 -o")
+
+    analyzer = SimilarityAnalyzer(use_cache=not args.no_cache)
+    start = time.perf_counter()
+    if directory_count:
+        extensions = resolve_extensions(args, ConfigManager())
+        report = analyzer.get_directory_similarity_report(args.files, extensions, args.gitignore,
+                                                          args.top_k or 20, args.filter_boilerplate)
+    elif args.analysis == 'semantic':
+        report = analyzer.get_semantic_similarity_report(args.files, args.top_k or 20, parallel=args.parallel)
+    elif args.analysis == 'estimate':
+        report = analyzer.get_estimate_report(args.files, threshold=args.threshold, top_k=args.top_k)
+    else:
+        report = analyzer.get_similarity_report(
+            args.files, args.parallel, mode=args.analysis, filter_boilerplate=args.filter_boilerplate,
+            top_k=args.top_k, output_path=args.output)
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            f.write(report)
+    elif not args.json:
+        print(report)
+
+    return {
+        'file_count': len(args.files),
+        'report': os.path.abspath(args.report) if args.report else None,
+        'output': os.path.abspath(args.output) if args.output else None,
+        'stats': analyzer.last_run_stats,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+
+def run_batch(args):
+    """按任务清单批量生成文档，返回汇总信息"""
+    from batch_runner import BatchRunner
+
+    runner = BatchRunner(max_workers=args.workers)
+    output_dir, jobs = runner.load_manifest(args.manifest, args.output)
+
+    def report(done, total, job):
+        if not args.json:
+            title = f"{job['app_name']} {job['version']}".strip()
+            status = f"失败: {job['error']}" if 'error' in job else "完成"
+            print(f"[{done}/{total}] {title} {status}", file=sys.stderr)
+
+    summary = runner.run(jobs, output_dir, report)
+    summary['summary_file'] = runner.write_summary(summary)
+    return summary
+
+def run_serve(args):
+    """启动本机任务服务，按Ctrl+C结束，返回服务状态"""
+    from job_server import HOST, JobService, create_server
+
+    service = JobService(args.work_dir, max_workers=args.workers)
+    server = create_server(service, args.port, args.verbose)
+    if not args.json:
+        print(f"任务服务已启动: http://{HOST}:{server.server_address[1]}/ "
+              f"（{service.max_workers} 个工作线程，结果保存在 {service.work_dir}），按Ctrl+C结束", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return service.status()
+
+def add_file_type_arguments(parser):
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--extensions", help="文件类型，逗号分隔，如 java,js,ts")
+    group.add_argument("--mode", default="默认模式", help="文件类型模式名称（含自定义模式），默认为“默认模式”")
+    parser.add_argument("--gitignore", help=".gitignore文件路径，默认使用各项目目录下的.gitignore")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="软件著作权源代码文档生成器（命令行版）")
+    # 各子命令共用的参数
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--json", action="store_true", help="以JSON格式输出统计信息")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export = subparsers.add_parser("export", parents=[common], help="生成源代码Word文档")
+    export.add_argument("paths", nargs="+", help="项目目录或源代码文件")
+    add_file_type_arguments(export)
+    export.add_argument("--root-dir", help="主根目录，文件路径从该目录开始显示")
+    export.add_argument("--app-name", default="", help="软件名称")
+    export.add_argument("--version", default="", help="版本号")
+    export.add_argument("--font", default="微软雅黑", help="代码字体")
+    export.add_argument("--app-name-font", default="微软雅黑", help="页眉软件名称字体")
+    export.add_argument("--version-font", default="微软雅黑", help="页眉版本号字体")
+    export.add_argument("--lines-per-page", type=int, default=50, help="每页行数")
+    export.add_argument("--toc", action="store_true", help="生成目录")
+    export.add_argument("--line-numbers", action="store_true", help="显示行号")
+    export.add_argument("-o", "--output", help="输出的.docx文件或目录，默认为当前目录")
+    export.add_argument("--profile-json", action="store_true", help="在导出记录旁另外写入JSON格式的性能记录")
+    export.add_argument("--trace-memory", action="store_true", help="用tracemalloc记录Python对象的内存峰值（较慢）")
+    export.add_argument("--dry-run", action="store_true", help="只统计文件数、行数和预估页数，不生成文档")
+    export.add_argument("-v", "--verbose", action="store_true", help="输出各阶段的处理进度、吞吐量和剩余时间")
+    export.add_argument("--watch", action="store_true", help="监视模式：源代码变化后自动重新生成文档，按Ctrl+C结束")
+    export.add_argument("--interval", type=float, default=1.0, help="监视模式下检查文件变化的间隔（秒）")
+    export.add_argument("--debounce", type=float, default=2.0,
+                        help="监视模式下最后一次变化后等待的秒数，连续保存多个文件只重新生成一次")
+
+    similarity = subparsers.add_parser("similarity", parents=[common], help="分析Word文档或项目目录的相似度")
+    similarity.add_argument("files", nargs="+", help="Word文档或项目目录（至少两个）")
+    add_file_type_arguments(similarity)
+    similarity.add_argument("--analysis", choices=["exact", "structural", "semantic", "estimate"], default="exact",
+                            help="分析方式：序列相似度、结构相似度、TF-IDF语义相似度或抽样估计")
+    similarity.add_argument("--top-k", type=int, help="只显示最相似的前K个文件对")
+    similarity.add_argument("--threshold", type=float, default=30, help="抽样估计模式下需要精确确认的相似度阈值")
+    similarity.add_argument("--parallel", action="store_true", help="使用多进程并行分析")
+    similarity.add_argument("--filter-boilerplate", action="store_true", help="过滤高频样板代码行")
+    similarity.add_argument("--no-cache", action="store_true", help="不使用分析缓存和结果库")
+    similarity.add_argument("--report", help="将文本报告写入文件而不是输出到终端")
+    similarity.add_argument("-o", "--output", help="将所有文件对的结果导出为.txt/.csv/.jsonl文件")
+
+    batch = subparsers.add_parser("batch", parents=[common], help="按任务清单批量生成多个项目的文档")
+    batch.add_argument("manifest", help="JSON格式的任务清单")
+    batch.add_argument("-o", "--output", help="输出目录，默认使用清单中的output_dir")
+    batch.add_argument("-w", "--workers", type=int, help="同时运行的任务数")
+
+    serve = subparsers.add_parser("serve", parents=[common], help="启动本机HTTP任务服务，排队运行导出和相似度分析任务")
+    serve.add_argument("-p", "--port", type=int, default=8765, help="监听端口（只监听127.0.0.1），默认为8765")
+    serve.add_argument("-w", "--workers", type=int, help="同时运行的任务数")
+    serve.add_argument("--work-dir", default="任务服务", help="保存各任务结果文件的目录")
+    serve.add_argument("-v", "--verbose", action="store_true", help="输出每个HTTP请求")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "export" and args.watch:
+            if args.dry_run:
+                parser.error("--watch 不能与 --dry-run 同时使用")
+            stats = run_watch(args)
+        elif args.command == "export":
+            stats = run_export(args)
+        elif args.command == "batch":
+            stats = run_batch(args)
+        elif args.command == "serve":
+            stats = run_serve(args)
+        else:
+            if len(args.files) < 2:
+                parser.error("至少需要两个文件或目录")
+            stats = run_similarity(args)
+    except Exception as e:
+        if args.json:
+            print(json.dumps({'error': str(e)}, ensure_ascii=False))
+        else:
+            print(f"错误: {e}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False, indent=2, default=str))
+    elif args.command == "export" and args.watch:
+        print(f"监视已结束，共生成 {stats['export_count']} 次文档")
+    elif args.command == "export" and not args.dry_run:
+        print(f"文档已生成: {stats['output']}")
+        print(f"共处理 {stats['file_count']} 个文件, {stats['total_code_lines']} 行代码, 约 {stats['page_count']} 页")
+    elif args.command == "serve":
+        print(f"任务服务已停止，共处理 {sum(stats['jobs'].values())} 个任务")
+    elif args.command == "batch":
+        from batch_runner import BatchRunner
+        print(BatchRunner.format_summary(stats))
+    if args.command == "batch" and stats['failed']:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    # 打包后的程序在Windows上使用进程池需要此调用
+    multiprocessing.freeze_support()
+    sys.exit(main())
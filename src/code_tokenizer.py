@@ -0,0 +1,201 @@
+import re
+import time
+
+# 扩展名到语言的映射
+EXTENSION_LANGUAGES = {
+    'java': 'java',
+    'js': 'javascript', 'jsx': 'javascript', 'mjs': 'javascript', 'vue': 'javascript',
+    'ts': 'typescript', 'tsx': 'typescript',
+    'c': 'c', 'h': 'c',
+    'cpp': 'cpp', 'cc': 'cpp', 'cxx': 'cpp', 'hpp': 'cpp',
+    'cs': 'csharp',
+    'go': 'go',
+    'kt': 'kotlin',
+    'swift': 'swift',
+    'php': 'php',
+    'py': 'python',
+}
+
+# 各语言的关键字，关键字保留原样，其余标识符替换为占位符
+_C_KEYWORDS = ('if else for while do switch case default break continue return goto '
+               'struct union enum typedef const static extern void int char short long '
+               'float double signed unsigned sizeof volatile')
+LANGUAGE_KEYWORDS = {
+    'java': ('abstract assert boolean break byte case catch char class const continue default do '
+             'double else enum extends final finally float for if implements import instanceof int '
+             'interface long native new package private protected public return short static super '
+             'switch synchronized this throw throws transient try void volatile while var record '
+             'true false null'),
+    'javascript': ('async await break case catch class const continue debugger default delete do else '
+                   'export extends finally for from function if import in instanceof let new of return '
+                   'static super switch this throw try typeof var void while yield true false null '
+                   'undefined'),
+    'typescript': ('async await break case catch class const continue debugger default delete do else '
+                   'export extends finally for from function if import in instanceof let new of return '
+                   'static super switch this throw try typeof var void while yield true false null '
+                   'undefined abstract any as boolean declare enum implements interface keyof namespace '
+                   'never number private protected public readonly string type unknown'),
+    'c': _C_KEYWORDS,
+    'cpp': _C_KEYWORDS + (' bool catch class delete explicit friend inline namespace new nullptr '
+                          'operator private protected public template this throw try typename using '
+                          'virtual auto true false'),
+    'csharp': ('abstract as base bool break byte case catch char class const continue decimal default '
+               'delegate do double else enum event explicit extern false finally float for foreach if '
+               'implicit in int interface internal is lock long namespace new null object operator out '
+               'override params private protected public readonly ref return sealed short static string '
+               'struct switch this throw true try typeof uint ulong using var virtual void while async '
+               'await'),
+    'go': ('break case chan const continue default defer else fallthrough for func go goto if import '
+           'interface map package range return select struct switch type var true false nil'),
+    'kotlin': ('as break class continue do else false for fun if in interface is null object package '
+               'return super this throw true try typealias val var when while override private '
+               'protected public internal data sealed companion'),
+    'swift': ('class deinit enum extension func import init let protocol struct subscript typealias var '
+              'break case continue default do else fallthrough for guard if in repeat return switch '
+              'where while as catch false is nil self super throw throws true try private public '
+              'internal static override'),
+    'php': ('abstract and array as break case catch class clone const continue declare default do echo '
+            'else elseif extends final finally for foreach function global if implements instanceof '
+            'interface namespace new or private protected public return static switch throw trait try '
+            'use var while true false null'),
+    'python': ('False None True and as assert async await break class continue def del elif else except '
+               'finally for from global if import in is lambda nonlocal not or pass raise return try '
+               'while with yield self'),
+}
+
+# 各语言的注释和字符串语法
+_C_STYLE = {'line_comment': r'//', 'block_comment': (r'/\*', r'\*/'),
+            'strings': [r'"(?:\\.|[^"\\])*"', r"'(?:\\.|[^'\\])*'"]}
+LANGUAGE_SYNTAX = {
+    'java': _C_STYLE,
+    'javascript': dict(_C_STYLE, strings=_C_STYLE['strings'] + [r'`(?:\\.|[^`\\])*`']),
+    'typescript': dict(_C_STYLE, strings=_C_STYLE['strings'] + [r'`(?:\\.|[^`\\])*`']),
+    'c': _C_STYLE,
+    'cpp': _C_STYLE,
+    'csharp': dict(_C_STYLE, strings=[r'@"(?:""|[^"])*"'] + _C_STYLE['strings']),
+    'go': dict(_C_STYLE, strings=_C_STYLE['strings'] + [r'`[^`]*`']),
+    'kotlin': _C_STYLE,
+    'swift': _C_STYLE,
+    'php': dict(_C_STYLE, line_comment=r'(?://|#)'),
+    'python': {'line_comment': r'#', 'block_comment': None,
+               'strings': [r'[rbuRBU]{0,2}"(?:\\.|[^"\\])*"', r"[rbuRBU]{0,2}'(?:\\.|[^'\\])*'"]},
+}
+
+# 形如文件路径的行（DocumentGenerator输出的文件标题），用于切换当前语言
+PATH_LINE_PATTERN = re.compile(r'^[\w.\-/\\ ]+\.(\w+)$')
+
+# 规范化规则变化时递增，使缓存中的旧结果失效
+TOKENIZER_VERSION = 2
+
+# 规范化后的占位符
+IDENT_TOKEN = 'ID'
+STRING_TOKEN = 'STR'
+NUMBER_TOKEN = 'NUM'
+
+class LanguageRules:
+    """单个语言的预编译正则表"""
+
+    def __init__(self, language):
+        syntax = LANGUAGE_SYNTAX[language]
+        self.language = language
+        self.keywords = frozenset(LANGUAGE_KEYWORDS[language].split())
+
+        parts = []
+        if syntax['block_comment']:
+            start, end = syntax['block_comment']
+            parts.append(rf'(?P<block>{start}(?:.*?(?P<closed>{end})|.*$))')
+            self.block_end = re.compile(end)
+        else:
+            self.block_end = None
+        parts.append(rf'(?P<comment>{syntax["line_comment"]}.*$)')
+        parts.append('(?P<string>' + '|'.join(syntax['strings']) + ')')
+        parts.append(r'(?P<number>0[xX][0-9a-fA-F_]+|\d[\d_]*(?:\.\d+)?(?:[eE][+-]?\d+)?[a-zA-Z]*|\.\d+)')
+        parts.append(r'(?P<ident>[A-Za-z_$\u4e00-\u9fff][\w$]*)')
+        parts.append(r'(?P<op>\S)')
+        self.token_pattern = re.compile('|'.join(parts))
+
+class CodeTokenizer:
+    """将代码行规范化为占位符词元流，用于抵抗标识符重命名的相似度比较
+
+    标识符替换为ID，字符串替换为STR，数字替换为NUM，注释整体移除，
+    关键字和运算符保留原样。每种语言的正则表只编译一次。
+    """
+
+    # 所有实例共享的预编译正则表
+    _rules_cache = {}
+
+    def __init__(self, default_language='java'):
+        self.default_language = default_language
+        # 最近一次规范化的吞吐量统计
+        self.last_stats = {}
+
+    @classmethod
+    def get_rules(cls, language):
+        """获取语言的预编译规则，首次使用时编译"""
+        rules = cls._rules_cache.get(language)
+        if rules is None:
+            rules = LanguageRules(language)
+            cls._rules_cache[language] = rules
+        return rules
+
+    def language_for_extension(self, extension):
+        """根据扩展名确定语言，未知扩展名返回None"""
+        return EXTENSION_LANGUAGES.get(extension.lower().lstrip('.'))
+
+    def normalize_line(self, line, rules, state):
+        """规范化一行代码，state['in_block']记录是否处于跨行块注释中"""
+        pos = 0
+        if state.get('in_block'):
+            match = rules.block_end.search(line)
+            if not match:
+                return []
+            pos = match.end()
+            state['in_block'] = False
+
+        tokens = []
+        keywords = rules.keywords
+        for match in rules.token_pattern.finditer(line, pos):
+            kind = match.lastgroup
+            if kind == 'ident':
+                text = match.group()
+                tokens.append(text if text in keywords else IDENT_TOKEN)
+            elif kind == 'op':
+                tokens.append(match.group())
+            elif kind == 'string':
+                tokens.append(STRING_TOKEN)
+            elif kind == 'number':
+                tokens.append(NUMBER_TOKEN)
+            elif kind == 'block' and match.group('closed') is None:
+                # 外层分组的lastgroup总是'block'，只有closed未匹配时块注释才延续到下一行
+                state['in_block'] = True
+            # 行注释和已闭合的块注释直接丢弃
+        return tokens
+
+    def normalize_lines(self, lines, language=None):
+        """规范化文本行列表，返回与输入逐行对齐的规范化字符串
+
+        未指定语言时，遇到形如文件路径的行会根据扩展名自动切换语言，
+        路径行本身规范化为空行。
+        """
+        start = time.perf_counter()
+        rules = self.get_rules(language or self.default_language)
+        state = {}
+        normalized = []
+        for line in lines:
+            if language is None:
+                match = PATH_LINE_PATTERN.match(line.strip())
+                detected = self.language_for_extension(match.group(1)) if match else None
+                if detected:
+                    rules = self.get_rules(detected)
+                    state = {}
+                    normalized.append("")
+                    continue
+            normalized.append(" ".join(self.normalize_line(line, rules, state)))
+
+        elapsed = time.perf_counter() - start
+        self.last_stats = {
+            'lines': len(lines),
+            'seconds': elapsed,
+            'lines_per_second': len(lines) / elapsed if elapsed > 0 else 0
+        }
+        return normalized
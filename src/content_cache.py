@@ -0,0 +1,108 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+class FileContentCache:
+    """源代码文件内容的内存缓存，可在多个导出任务之间共享
+
+    文件按(路径, 修改时间, 大小)映射到内容哈希，按内容哈希保存检测出的编码和解码后的行，
+    同一文件在多个任务中只读取一次，不同项目中内容相同的文件（如共用的库）只检测编码和解码一次。
+    超过容量上限时淘汰最久未使用的内容，同时删除指向该内容的路径映射；
+    每个路径只保留最新版本的映射，长时间运行（服务、监视模式）时映射不会随文件修改次数增长。
+    """
+
+    def __init__(self, max_size_mb=256):
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self._stat_hashes = {}
+        # 路径 -> 最新的(路径, 修改时间, 大小)；内容哈希 -> 指向它的(路径, 修改时间, 大小)集合
+        self._path_keys = {}
+        self._hash_keys = {}
+        self._contents = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        # 统计信息：按路径命中、按内容命中、实际解码的文件数和字节数
+        self.stats = {'path_hits': 0, 'content_hits': 0, 'misses': 0, 'decoded_bytes': 0}
+
+    @staticmethod
+    def _stat_key(file_path):
+        stat = os.stat(file_path)
+        return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+    def _set_stat_hash(self, stat_key, content_hash):
+        """记录路径映射，替换同一路径的旧版本，需持有锁"""
+        old_key = self._path_keys.get(stat_key[0])
+        if old_key is not None and old_key != stat_key:
+            self._drop_stat_key(old_key)
+        self._path_keys[stat_key[0]] = stat_key
+        self._stat_hashes[stat_key] = content_hash
+        self._hash_keys.setdefault(content_hash, set()).add(stat_key)
+
+    def _drop_stat_key(self, stat_key):
+        """删除一个路径映射，返回其内容哈希，需持有锁"""
+        content_hash = self._stat_hashes.pop(stat_key, None)
+        if self._path_keys.get(stat_key[0]) == stat_key:
+            del self._path_keys[stat_key[0]]
+        keys = self._hash_keys.get(content_hash)
+        if keys is not None:
+            keys.discard(stat_key)
+            if not keys:
+                del self._hash_keys[content_hash]
+        return content_hash
+
+    def _lookup(self, content_hash):
+        entry = self._contents.get(content_hash)
+        if entry is None:
+            return None
+        self._contents.move_to_end(content_hash)
+        encoding, lines, _ = entry
+        return encoding, lines
+
+    def get_lines(self, file_path, decode):
+        """返回(编码, 行列表)，未缓存时读取文件并调用decode(原始字节)得到(编码, 行列表)"""
+        stat_key = self._stat_key(file_path)
+        with self._lock:
+            content_hash = self._stat_hashes.get(stat_key)
+            entry = self._lookup(content_hash) if content_hash else None
+            if entry is not None:
+                self.stats['path_hits'] += 1
+                return entry
+
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        content_hash = hashlib.sha1(raw).hexdigest()
+        with self._lock:
+            self._set_stat_hash(stat_key, content_hash)
+            entry = self._lookup(content_hash)
+            if entry is not None:
+                self.stats['content_hits'] += 1
+                return entry
+
+        # 解码失败时异常直接抛给调用方，不缓存
+        encoding, lines = decode(raw)
+        with self._lock:
+            self.stats['misses'] += 1
+            self.stats['decoded_bytes'] += len(raw)
+            if content_hash not in self._contents:
+                # 以原始字节数近似估算内存占用
+                self._contents[content_hash] = (encoding, lines, len(raw))
+                self._size += len(raw)
+                while self._size > self.max_size_bytes and len(self._contents) > 1:
+                    evicted_hash, (_, _, size) = self._contents.popitem(last=False)
+                    self._size -= size
+                    for key in list(self._hash_keys.get(evicted_hash, ())):
+                        self._drop_stat_key(key)
+        return encoding, lines
+
+    def discard(self, file_path):
+        """丢弃某个路径的缓存（文件已修改或删除），不再被其他路径引用的内容一并释放"""
+        path = os.path.abspath(file_path)
+        with self._lock:
+            stat_key = self._path_keys.get(path)
+            if stat_key is None:
+                return
+            content_hash = self._drop_stat_key(stat_key)
+            if content_hash not in self._hash_keys:
+                entry = self._contents.pop(content_hash, None)
+                if entry is not None:
+                    self._size -= entry[2]
@@ -0,0 +1,259 @@
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+from analysis_cache import user_cache_dir
+
+class CorpusIndex:
+    """基于SQLite的持久化参考语料索引，用于将新文档与历史归档文档比较
+
+    每个归档文档的行哈希和winnowing指纹以倒排表形式保存，
+    查询时只读取新文档中出现的哈希对应的倒排项，
+    开销与新文档的大小成正比，而不随归档规模线性增长。
+    文档频率过高的哈希（样板行）在查询时跳过。
+    """
+
+    # 数据库结构版本
+    SCHEMA_VERSION = 1
+
+    # SQLite的整数为有符号64位，行哈希按位重新解释后存储
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+        "CREATE TABLE IF NOT EXISTS documents ("
+        " doc_id INTEGER PRIMARY KEY, content_hash TEXT UNIQUE NOT NULL, name TEXT, path TEXT,"
+        " line_count INTEGER NOT NULL, fingerprint_count INTEGER NOT NULL, added_at REAL NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS line_postings ("
+        " line_hash INTEGER NOT NULL, doc_id INTEGER NOT NULL, count INTEGER NOT NULL,"
+        " PRIMARY KEY (line_hash, doc_id)) WITHOUT ROWID",
+        "CREATE TABLE IF NOT EXISTS line_df (line_hash INTEGER PRIMARY KEY, df INTEGER NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS fingerprint_postings ("
+        " fp_hash INTEGER NOT NULL, doc_id INTEGER NOT NULL, start_line INTEGER NOT NULL,"
+        " end_line INTEGER NOT NULL, PRIMARY KEY (fp_hash, doc_id, start_line)) WITHOUT ROWID",
+        "CREATE TABLE IF NOT EXISTS fingerprint_df (fp_hash INTEGER PRIMARY KEY, df INTEGER NOT NULL)",
+    )
+
+    def __init__(self, path=None, max_df_ratio=0.2, min_documents=10):
+        self.path = path or user_cache_dir("corpus.sqlite3")
+        # 文档频率超过 max_df_ratio × 文档总数 的哈希在查询时跳过
+        self.max_df_ratio = max_df_ratio
+        # 归档文档数少于该值时不跳过任何哈希
+        self.min_documents = min_documents
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+    def _init_schema(self):
+        """创建数据表，结构版本不符时重建索引"""
+        with self._lock, self.conn:
+            self.conn.execute(self._SCHEMA[0])
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if row is not None and row[0] != str(self.SCHEMA_VERSION):
+                for table in ('documents', 'line_postings', 'line_df', 'fingerprint_postings', 'fingerprint_df'):
+                    self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+            for statement in self._SCHEMA[1:]:
+                self.conn.execute(statement)
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                              (str(self.SCHEMA_VERSION),))
+
+    def close(self):
+        """关闭数据库连接"""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def _to_signed(hashes):
+        """将uint64哈希数组按位转换为SQLite可存储的有符号整数列表"""
+        return np.asarray(hashes, dtype=np.uint64).view(np.int64).tolist()
+
+    @staticmethod
+    def _count_hashes(hashes, ignore_hash=None):
+        """统计每种行哈希的出现次数，返回(有符号哈希列表, 次数列表)"""
+        unique, counts = np.unique(np.asarray(hashes, dtype=np.uint64), return_counts=True)
+        if ignore_hash is not None:
+            keep = unique != ignore_hash
+            unique, counts = unique[keep], counts[keep]
+        return CorpusIndex._to_signed(unique), counts.tolist()
+
+    def document_count(self):
+        """返回归档文档数"""
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def list_documents(self):
+        """列出归档文档，按加入时间排序"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT doc_id, content_hash, name, path, line_count, added_at FROM documents ORDER BY doc_id"
+            ).fetchall()
+        return [{'doc_id': row[0], 'content_hash': row[1], 'name': row[2], 'path': row[3],
+                 'line_count': row[4], 'added_at': row[5]} for row in rows]
+
+    def contains(self, content_hash):
+        """判断内容哈希对应的文档是否已归档"""
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM documents WHERE content_hash = ?",
+                                     (content_hash,)).fetchone() is not None
+
+    def add_document(self, content_hash, name, path, line_hashes, fingerprints=(), ignore_hash=None):
+        """将文档加入归档索引，内容相同的文档只保存一次，返回(文档ID, 是否新加入)
+
+        fingerprints为[(哈希, 起始行, 结束行)]，ignore_hash指定不建立索引的行哈希（如空行）。
+        """
+        unique, counts = self._count_hashes(line_hashes, ignore_hash)
+        fp_rows = {}
+        for fp_hash, start_line, end_line in fingerprints:
+            fp_rows.setdefault((int(fp_hash), int(start_line)), int(end_line))
+        fp_hashes = sorted({fp_hash for fp_hash, _ in fp_rows})
+
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT doc_id FROM documents WHERE content_hash = ?",
+                                    (content_hash,)).fetchone()
+            if row is not None:
+                return row[0], False
+
+            cursor = self.conn.execute(
+                "INSERT INTO documents (content_hash, name, path, line_count, fingerprint_count, added_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (content_hash, name, path, len(line_hashes), len(fp_rows), time.time()))
+            doc_id = cursor.lastrowid
+
+            self.conn.executemany("INSERT INTO line_postings (line_hash, doc_id, count) VALUES (?, ?, ?)",
+                                  ((h, doc_id, c) for h, c in zip(unique, counts)))
+            self.conn.executemany("INSERT INTO line_df (line_hash, df) VALUES (?, 1)"
+                                  " ON CONFLICT(line_hash) DO UPDATE SET df = df + 1",
+                                  ((h,) for h in unique))
+            self.conn.executemany("INSERT INTO fingerprint_postings (fp_hash, doc_id, start_line, end_line)"
+                                  " VALUES (?, ?, ?, ?)",
+                                  ((h, doc_id, start, end) for (h, start), end in fp_rows.items()))
+            self.conn.executemany("INSERT INTO fingerprint_df (fp_hash, df) VALUES (?, 1)"
+                                  " ON CONFLICT(fp_hash) DO UPDATE SET df = df + 1",
+                                  ((h,) for h in fp_hashes))
+        return doc_id, True
+
+    def remove_document(self, content_hash):
+        """从归档索引中移除文档，返回是否存在该文档"""
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT doc_id FROM documents WHERE content_hash = ?",
+                                    (content_hash,)).fetchone()
+            if row is None:
+                return False
+            doc_id = row[0]
+            self.conn.execute("UPDATE line_df SET df = df - 1 WHERE line_hash IN"
+                              " (SELECT line_hash FROM line_postings WHERE doc_id = ?)", (doc_id,))
+            self.conn.execute("UPDATE fingerprint_df SET df = df - 1 WHERE fp_hash IN"
+                              " (SELECT DISTINCT fp_hash FROM fingerprint_postings WHERE doc_id = ?)", (doc_id,))
+            self.conn.execute("DELETE FROM line_df WHERE df <= 0")
+            self.conn.execute("DELETE FROM fingerprint_df WHERE df <= 0")
+            self.conn.execute("DELETE FROM line_postings WHERE doc_id = ?", (doc_id,))
+            self.conn.execute("DELETE FROM fingerprint_postings WHERE doc_id = ?", (doc_id,))
+            self.conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+        return True
+
+    def _df_limit(self, doc_count):
+        """返回查询时允许的最大文档频率"""
+        if doc_count < self.min_documents:
+            return doc_count
+        return max(1, int(self.max_df_ratio * doc_count))
+
+    def query(self, line_hashes, fingerprints=(), top_k=10, exclude_hash=None, ignore_hash=None):
+        """查询与给定文档最相似的归档文档
+
+        相同行数按多重集计数（两边出现次数取较小值），与逐对比较的结果一致；
+        同时统计共享的winnowing指纹数。候选文档为两种计数各自的前top_k名，
+        按(相同行数, 共享指纹数)降序返回前top_k个结果。
+        """
+        unique, counts = self._count_hashes(line_hashes, ignore_hash)
+        fp_hashes = sorted({int(fp[0]) for fp in fingerprints})
+        line_count = len(line_hashes)
+
+        with self._lock:
+            conn = self.conn
+            doc_count = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            if doc_count == 0:
+                return []
+            df_limit = self._df_limit(doc_count)
+
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS query_lines (line_hash INTEGER PRIMARY KEY, count INTEGER)")
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS query_fingerprints (fp_hash INTEGER PRIMARY KEY)")
+            try:
+                conn.executemany("INSERT INTO query_lines (line_hash, count) VALUES (?, ?)", zip(unique, counts))
+                conn.executemany("INSERT INTO query_fingerprints (fp_hash) VALUES (?)", ((h,) for h in fp_hashes))
+
+                # 只访问查询文档中出现且文档频率不超过阈值的哈希对应的倒排项
+                line_scores = dict(conn.execute(
+                    "SELECT p.doc_id, SUM(MIN(p.count, q.count)) AS shared"
+                    " FROM query_lines q"
+                    " JOIN line_df d ON d.line_hash = q.line_hash AND d.df <= ?"
+                    " JOIN line_postings p ON p.line_hash = q.line_hash"
+                    " GROUP BY p.doc_id", (df_limit,)).fetchall())
+                fp_scores = dict(conn.execute(
+                    "SELECT f.doc_id, COUNT(DISTINCT f.fp_hash) AS shared"
+                    " FROM query_fingerprints q"
+                    " JOIN fingerprint_df d ON d.fp_hash = q.fp_hash AND d.df <= ?"
+                    " JOIN fingerprint_postings f ON f.fp_hash = q.fp_hash"
+                    " GROUP BY f.doc_id", (df_limit,)).fetchall())
+            finally:
+                conn.execute("DELETE FROM query_lines")
+                conn.execute("DELETE FROM query_fingerprints")
+
+            # 在截取前top_k名之前排除查询文档本身，已归档的文档不会占用候选名额
+            if exclude_hash is not None:
+                for (doc_id,) in conn.execute("SELECT doc_id FROM documents WHERE content_hash = ?", (exclude_hash,)):
+                    line_scores.pop(doc_id, None)
+                    fp_scores.pop(doc_id, None)
+
+            candidates = set(sorted(line_scores, key=lambda d: (-line_scores[d], d))[:top_k])
+            candidates.update(sorted(fp_scores, key=lambda d: (-fp_scores[d], d))[:top_k])
+            if not candidates:
+                return []
+
+            placeholders = ",".join("?" * len(candidates))
+            rows = conn.execute(
+                f"SELECT doc_id, content_hash, name, path, line_count, fingerprint_count"
+                f" FROM documents WHERE doc_id IN ({placeholders})", sorted(candidates)).fetchall()
+
+        results = []
+        for doc_id, content_hash, name, path, doc_lines, doc_fingerprints in rows:
+            identical = line_scores.get(doc_id, 0)
+            max_lines = max(line_count, doc_lines)
+            results.append({
+                'doc_id': doc_id,
+                'content_hash': content_hash,
+                'name': name,
+                'path': path,
+                'identical_lines': identical,
+                'total_lines': doc_lines,
+                'max_total_lines': max_lines,
+                'sequence_similarity': identical / max_lines * 100 if max_lines else 0,
+                'shared_fingerprints': fp_scores.get(doc_id, 0),
+                'fingerprint_count': doc_fingerprints
+            })
+        results.sort(key=lambda r: (-r['identical_lines'], -r['shared_fingerprints'], r['doc_id']))
+        return results[:top_k]
+
+    def get_fragments(self, doc_id, fingerprints):
+        """返回查询文档与指定归档文档共享的指纹位置[(哈希, 归档起始行, 归档结束行)]"""
+        fp_hashes = sorted({int(fp[0]) for fp in fingerprints})
+        matches = []
+        with self._lock:
+            # 分批查询，避免超过SQLite的参数个数上限
+            for start in range(0, len(fp_hashes), 500):
+                batch = fp_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                matches.extend(self.conn.execute(
+                    f"SELECT fp_hash, start_line, end_line FROM fingerprint_postings"
+                    f" WHERE doc_id = ? AND fp_hash IN ({placeholders})", [doc_id] + batch).fetchall())
+        return matches
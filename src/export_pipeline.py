@@ -0,0 +1,398 @@
+import os
+import gc
+import heapq
+import queue
+import time
+import pathlib
+import threading
+import datetime as dt
+
+from file_processor import FileProcessor
+from document_generator import DocumentGenerator
+from stage_profiler import StageProfiler
+
+# 流水线各阶段之间队列的容量：待读取的文件数、已读取待渲染的文件数
+DISCOVERY_QUEUE_SIZE = 256
+DECODED_QUEUE_SIZE = 32
+
+# 队列结束标记
+_END = object()
+
+class ExportCancelled(Exception):
+    """导出任务被用户取消"""
+
+class _StageFailed:
+    """工作线程中发生的异常，经队列传给下游阶段后重新抛出"""
+
+    def __init__(self, error):
+        self.error = error
+
+class ExportPipeline:
+    """源代码导出流水线：收集文件、读取内容、生成Word文档、保存文档和导出记录
+
+    与界面无关，可以在工作线程中运行；进度通过回调报告，
+    调用cancel()后在下一个文件边界处停止并释放已读取的内容。
+
+    pipelined为True时，收集文件、读取解码和生成文档三个阶段通过有界队列连接并同时运行：
+    发现第一个文件后即开始读取，读取完第一个文件后即开始渲染；队列已满时上游阶段等待，
+    内存中只保留尚未渲染的少量文件内容，不再保留全部文件的行列表。
+
+    每次导出用StageProfiler记录各阶段的耗时、CPU时间、内存峰值和读取最慢的文件，
+    写入导出记录；trace_memory为True时另外跟踪Python对象的内存峰值。
+    """
+
+    def __init__(self, file_processor=None, document_generator=None, pipelined=True, trace_memory=False):
+        self.file_processor = file_processor or FileProcessor()
+        self.document_generator = document_generator or DocumentGenerator()
+        self.pipelined = pipelined
+        self.trace_memory = trace_memory
+        self._cancel_event = threading.Event()
+
+    @staticmethod
+    def compute_font_size(lines_per_page):
+        """根据每页行数计算适当的字体大小（简单算法，可能需要调整）"""
+        line_height_cm = 26.7 / lines_per_page
+        font_size = int(line_height_cm * 28)
+        return max(8, min(12, font_size))
+
+    def cancel(self):
+        """请求取消，在下一个文件边界处生效；取消状态保持到调用reset()为止"""
+        self._cancel_event.set()
+
+    def reset(self):
+        """清除取消状态，重复使用同一流水线时在开始新的导出前调用"""
+        self._cancel_event.clear()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        """已请求取消时抛出ExportCancelled"""
+        if self._cancel_event.is_set():
+            raise ExportCancelled()
+
+    def build(self, paths, extensions, gitignore_path=None, root_dir=None, font_name="微软雅黑",
+              lines_per_page=50, app_name="", version="", app_name_font="微软雅黑", version_font="微软雅黑",
+              generate_toc=False, show_line_numbers=False, progress_callback=None):
+        """收集并读取源代码文件，生成Word文档（不保存）
+
+        progress_callback(阶段, 当前, 总数, 说明, 行数)，阶段为'collect'、'read'或'build'，
+        行数为该阶段已处理的累计行数，未知时为None。
+        返回包含文档对象和统计信息的字典；取消时（包括开始前已调用cancel()）抛出ExportCancelled。
+        """
+        report = progress_callback or (lambda stage, current, total, detail, lines=None: None)
+        profiler = StageProfiler(self.trace_memory)
+        if self.pipelined:
+            return self._build_pipelined(
+                paths, extensions, gitignore_path, root_dir, font_name, lines_per_page, app_name, version,
+                app_name_font, version_font, generate_toc, show_line_numbers, report, profiler)
+
+        try:
+            # --- Stage 1: File Discovery & .gitignore Filtering ---
+            report('collect', 0, 0, "正在收集文件...")
+            with profiler.stage('collect'):
+                files_to_process, ignored_files = self.file_processor.collect_files(
+                    paths, extensions, gitignore_path or None
+                )
+            self.check_cancelled()
+
+            # --- Stage 2: Collect all lines from all files ---
+            all_styled_lines = []
+            lines_by_ext = {}
+            with profiler.stage('read'):
+                for current, file_path in enumerate(files_to_process, 1):
+                    # 每个文件开始处理前检查是否已取消
+                    self.check_cancelled()
+                    report('read', current, len(files_to_process), file_path.name)
+                    styled_lines, line_count = self.file_processor.process_file(
+                        file_path, paths, root_dir or None, profiler)
+                    lines_by_ext[file_path.suffix] = lines_by_ext.get(file_path.suffix, 0) + line_count
+                    all_styled_lines.extend(styled_lines)
+
+            # --- Stage 3: Generate the document from the prepared line list ---
+            report('build', 0, len(files_to_process), "正在生成文档...")
+            font_size = self.compute_font_size(lines_per_page)
+            with profiler.stage('build'):
+                doc = self.document_generator.create_document(
+                    self._track_render(all_styled_lines, lambda: len(files_to_process), report),
+                    font_name, font_size, app_name, version,
+                    app_name_font, version_font, generate_toc, show_line_numbers
+                )
+            self.check_cancelled()
+        except ExportCancelled:
+            # 释放已读取的文件内容和未完成的文档
+            profiler.stop()
+            gc.collect()
+            raise
+
+        return self._build_result(doc, len(files_to_process), ignored_files, lines_by_ext, len(all_styled_lines),
+                                  lines_per_page, paths, root_dir, app_name, version, profiler)
+
+    def _build_result(self, doc, file_count, ignored_files, lines_by_ext, line_count, lines_per_page,
+                      paths, root_dir, app_name, version, profiler):
+        # 计算真实的总代码行数
+        total_code_lines = sum(lines_by_ext.values())
+        return {
+            'doc': doc,
+            'profiler': profiler,
+            'file_count': file_count,
+            'ignored_files': ignored_files,
+            'lines_by_ext': lines_by_ext,
+            'total_code_lines': total_code_lines,
+            'line_count': line_count,
+            'page_count': line_count / lines_per_page,
+            'filename': f"{app_name}_{version}_源代码_{total_code_lines}行.docx",
+            'paths': list(paths),
+            'root_dir': root_dir,
+            'app_name': app_name,
+            'version': version
+        }
+
+    def _track_render(self, styled_lines, total_files, report):
+        """逐行转交给文档生成器，每开始渲染一个文件报告一次渲染进度"""
+        files = lines = 0
+        for item in styled_lines:
+            if item[1] == 'path':
+                files += 1
+                report('build', files, total_files(), item[0], lines)
+            else:
+                lines += 1
+            yield item
+
+    def dry_run(self, paths, extensions, gitignore_path=None, root_dir=None, lines_per_page=50,
+                progress_callback=None, top_n=10):
+        """快速预估：只收集文件并在原始字节上统计行数，不检测编码、不生成和保存文档
+
+        返回文件数、各类型行数、被忽略的文件、预估页数和行数最多的前top_n个文件。
+        """
+        report = progress_callback or (lambda stage, current, total, detail, lines=None: None)
+        start = time.perf_counter()
+        ignored_files = []
+        lines_by_ext = {}
+        file_lines = []
+        unreadable_files = []
+
+        report('collect', 0, 0, "正在统计行数...")
+        for current, file_path in enumerate(
+                self.file_processor.iter_files(paths, extensions, gitignore_path or None, ignored_files), 1):
+            self.check_cancelled()
+            display_path = self.file_processor.display_path(file_path, paths, root_dir or None)
+            try:
+                line_count = self.file_processor.count_file_lines(file_path)
+            except OSError:
+                unreadable_files.append(display_path)
+                line_count = 0
+            lines_by_ext[file_path.suffix] = lines_by_ext.get(file_path.suffix, 0) + line_count
+            file_lines.append((line_count, display_path))
+            report('read', current, None, file_path.name, sum(lines_by_ext.values()))
+
+        total_code_lines = sum(lines_by_ext.values())
+        # 文档中每个文件另占一行路径，无法读取的文件占一行错误信息
+        line_count = total_code_lines + len(file_lines) + len(unreadable_files)
+        return {
+            'file_count': len(file_lines),
+            'ignored_files': ignored_files,
+            'unreadable_files': unreadable_files,
+            'lines_by_ext': lines_by_ext,
+            'total_code_lines': total_code_lines,
+            'line_count': line_count,
+            'page_count': line_count / lines_per_page,
+            'largest_files': [(path, count) for count, path in heapq.nlargest(top_n, file_lines)],
+            'seconds': time.perf_counter() - start
+        }
+
+    @staticmethod
+    def format_dry_run(result):
+        """将预估结果格式化为文本"""
+        lines = [f"预估共 {result['file_count']} 个文件, {result['total_code_lines']} 行代码, "
+                 f"约 {result['page_count']:.1f} 页（统计耗时 {result['seconds']:.1f} 秒）"]
+        lines.append("\n代码行数统计:")
+        for ext, count in sorted(result['lines_by_ext'].items(), key=lambda item: -item[1]):
+            lines.append(f"  - {ext} 文件: {count} 行")
+        if result['largest_files']:
+            lines.append("\n行数最多的文件:")
+            for path, count in result['largest_files']:
+                lines.append(f"  - {path}: {count} 行")
+        if result['ignored_files']:
+            lines.append(f"\n根据 .gitignore 忽略了 {len(result['ignored_files'])} 个文件:")
+            for path in result['ignored_files'][:10]:
+                lines.append(f"  - {path}")
+            if len(result['ignored_files']) > 10:
+                lines.append(f"  ...等共 {len(result['ignored_files'])} 个文件")
+        if result['unreadable_files']:
+            lines.append(f"\n无法读取 {len(result['unreadable_files'])} 个文件")
+        return "\n".join(lines)
+
+    def _put(self, target, item, stop):
+        """向有界队列放入数据，队列满时等待；下游已停止时返回False"""
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _build_pipelined(self, paths, extensions, gitignore_path, root_dir, font_name, lines_per_page,
+                         app_name, version, app_name_font, version_font, generate_toc, show_line_numbers, report,
+                         profiler):
+        """三个阶段同时运行：发现线程 -> 读取线程 -> 当前线程渲染文档"""
+        discovered = queue.Queue(DISCOVERY_QUEUE_SIZE)
+        decoded = queue.Queue(DECODED_QUEUE_SIZE)
+        # 任一阶段结束（完成、失败或取消）后通知上游停止
+        stop = threading.Event()
+        ignored_files = []
+        lines_by_ext = {}
+        # 已发现的文件数，发现阶段结束前作为进度总数的估计
+        state = {'discovered': 0, 'line_count': 0}
+
+        def discover():
+            try:
+                with profiler.stage('collect'):
+                    for file_path in self.file_processor.iter_files(paths, extensions, gitignore_path or None,
+                                                                    ignored_files):
+                        if self.cancelled or not self._put(discovered, file_path, stop):
+                            return
+                        state['discovered'] += 1
+                        report('collect', state['discovered'], None, file_path.name)
+                self._put(discovered, _END, stop)
+            except Exception as e:
+                self._put(discovered, _StageFailed(e), stop)
+
+        def decode():
+            try:
+                with profiler.stage('read'):
+                    decode_files()
+            except Exception as e:
+                self._put(decoded, _StageFailed(e), stop)
+
+        def decode_files():
+            current = decoded_lines = 0
+            while True:
+                try:
+                    file_path = discovered.get(timeout=0.1)
+                except queue.Empty:
+                    # 发现阶段被取消时不会发送结束标记
+                    if stop.is_set() or self.cancelled:
+                        return
+                    continue
+                if file_path is _END or isinstance(file_path, _StageFailed):
+                    self._put(decoded, file_path, stop)
+                    return
+                if self.cancelled:
+                    return
+                current += 1
+                styled_lines, line_count = self.file_processor.process_file(
+                    file_path, paths, root_dir or None, profiler)
+                lines_by_ext[file_path.suffix] = lines_by_ext.get(file_path.suffix, 0) + line_count
+                decoded_lines += line_count
+                report('read', current, state['discovered'], file_path.name, decoded_lines)
+                if not self._put(decoded, styled_lines, stop):
+                    return
+
+        def rendered_lines():
+            # 渲染阶段按文件取出已读取的行，取消后停止产出
+            while True:
+                try:
+                    item = decoded.get(timeout=0.1)
+                except queue.Empty:
+                    self.check_cancelled()
+                    continue
+                if item is _END:
+                    return
+                if isinstance(item, _StageFailed):
+                    raise item.error
+                self.check_cancelled()
+                state['line_count'] += len(item)
+                yield from item
+
+        report('collect', 0, 0, "正在收集文件...")
+        workers = [threading.Thread(target=discover, daemon=True), threading.Thread(target=decode, daemon=True)]
+        for worker in workers:
+            worker.start()
+        try:
+            font_size = self.compute_font_size(lines_per_page)
+            with profiler.stage('build'):
+                doc = self.document_generator.create_document(
+                    self._track_render(rendered_lines(), lambda: state['discovered'], report),
+                    font_name, font_size, app_name, version,
+                    app_name_font, version_font, generate_toc, show_line_numbers
+                )
+            self.check_cancelled()
+        except ExportCancelled:
+            # 释放已读取的文件内容和未完成的文档
+            profiler.stop()
+            gc.collect()
+            raise
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join()
+
+        return self._build_result(doc, state['discovered'], ignored_files, lines_by_ext, state['line_count'],
+                                  lines_per_page, paths, root_dir, app_name, version, profiler)
+
+    def save(self, result, save_path, progress_callback=None, profile_json=False):
+        """保存文档并在同目录下写入导出记录，返回导出记录文件路径
+
+        profile_json为True时另外写入JSON格式的性能记录，路径保存在result['profile_path']中。
+        """
+        report = progress_callback or (lambda stage, current, total, detail, lines=None: None)
+        profiler = result['profiler']
+        # 序列化和压缩在python-docx内部一次完成，无法细分进度
+        report('save', 0, None, os.path.basename(save_path))
+        with profiler.stage('save'):
+            result['doc'].save(save_path)
+        # 保存后不再需要文档对象
+        result['doc'] = None
+        profiler.stop()
+
+        result['profile'] = profiler.summary(
+            pipelined=self.pipelined, file_count=result['file_count'],
+            total_code_lines=result['total_code_lines'], line_count=result['line_count'])
+        log_path = self.write_log(result, save_path)
+        if profile_json:
+            json_path = os.path.join(os.path.dirname(save_path),
+                                     f"{result['app_name']}_{result['version']}_性能记录.json")
+            result['profile_path'] = profiler.write_json(result['profile'], json_path)
+        report('save', 1, 1, os.path.basename(save_path))
+        return log_path
+
+    def write_log(self, result, save_path):
+        """写入导出记录文件"""
+        log_filename = f"{result['app_name']}_{result['version']}_导出记录.txt"
+        log_path = os.path.join(os.path.dirname(save_path), log_filename)
+
+        with open(log_path, 'w', encoding='utf-8') as log_file:
+            log_file.write(f"文档名称: {os.path.basename(save_path)}\n")
+            log_file.write(f"生成时间: {dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+            log_file.write("处理的路径:\n")
+
+            # 获取根目录
+            root_dir = result['root_dir']
+            root_path = pathlib.Path(root_dir) if root_dir else None
+
+            for path in result['paths']:
+                path_obj = pathlib.Path(path)
+                if root_path and path_obj.is_relative_to(root_path):
+                    rel_path = path_obj.relative_to(root_path)
+                    log_file.write(f"  - {rel_path} (相对路径)\n")
+                else:
+                    log_file.write(f"  - {path}\n")
+
+            log_file.write(f"\n总文件数: {result['file_count']}\n")
+            log_file.write(f"总代码行数: {result['total_code_lines']}\n")
+            log_file.write(f"总页数: {result['page_count']:.1f}\n")
+
+            # 写入文件类型统计
+            log_file.write("\n文件类型统计:\n")
+            for ext, count in result['lines_by_ext'].items():
+                log_file.write(f"  - {ext}: {count} 行\n")
+
+            # 写入各阶段的性能统计
+            if result.get('profile'):
+                log_file.write("\n性能统计:\n")
+                for line in StageProfiler.format_summary(result['profile']):
+                    log_file.write(f"{line}\n")
+        return log_path
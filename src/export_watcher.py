@@ -0,0 +1,147 @@
+import os
+import pathlib
+import threading
+import time
+
+from content_cache import FileContentCache
+from export_pipeline import ExportPipeline, ExportCancelled
+from file_processor import FileProcessor
+
+class ExportWatcher:
+    """监视模式：定时轮询项目路径，源代码变化后在后台重新生成文档
+
+    已读取文件的行保存在FileContentCache中，重新生成时未变化的文件直接按(路径, 修改时间, 大小)
+    命中缓存，只有新增和修改的文件需要重新读取和检测编码。连续保存多个文件时，
+    等待debounce秒内没有新的变化后才重新生成一次。
+
+    build_options为ExportPipeline.build的文档参数（font_name、lines_per_page、app_name等），
+    output_path(文件名)返回保存路径。event_callback(事件, 数据)在监视线程中调用，事件为：
+    'change'（检测到变化，数据为变化摘要）、'export'（已重新生成，数据为导出摘要）、'error'（数据为错误信息）。
+    """
+
+    def __init__(self, paths, extensions, gitignore_path=None, root_dir=None, build_options=None,
+                 output_path=None, interval=1.0, debounce=2.0, content_cache=None, event_callback=None):
+        self.paths = list(paths)
+        self.extensions = extensions
+        self.gitignore_path = gitignore_path
+        self.root_dir = root_dir
+        self.build_options = build_options or {}
+        self.output_path = output_path or (lambda filename: os.path.join(os.getcwd(), filename))
+        self.interval = interval
+        self.debounce = debounce
+        self.content_cache = content_cache or FileContentCache()
+        self.file_processor = FileProcessor(self.content_cache)
+        self.pipeline = ExportPipeline(self.file_processor)
+        self.event_callback = event_callback or (lambda event, data: None)
+        self.export_count = 0
+        self.last_export = None
+        self._stop_event = threading.Event()
+        self._saved_path = None
+
+    def scan(self):
+        """返回{路径: (修改时间, 大小)}，包含所有待导出的文件和决定忽略规则的.gitignore文件"""
+        gitignores = [self.gitignore_path] if self.gitignore_path else \
+            [os.path.join(path, '.gitignore') for path in self.paths if os.path.isdir(path)]
+        files = [pathlib.Path(path) for path in gitignores if os.path.isfile(path)]
+        files.extend(self.file_processor.iter_files(self.paths, self.extensions, self.gitignore_path or None))
+        snapshot = {}
+        for file_path in files:
+            try:
+                stat = file_path.stat()
+            except OSError:
+                # 扫描期间被删除的文件，下一次轮询时按删除处理
+                continue
+            snapshot[str(file_path)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    @staticmethod
+    def diff(old, new):
+        """比较两次扫描结果，返回{'added': [...], 'modified': [...], 'removed': [...]}"""
+        return {
+            'added': sorted(path for path in new if path not in old),
+            'modified': sorted(path for path in new if path in old and new[path] != old[path]),
+            'removed': sorted(path for path in old if path not in new),
+        }
+
+    def stop(self):
+        """停止监视，正在进行的导出在下一个文件边界处取消"""
+        self._stop_event.set()
+        self.pipeline.cancel()
+
+    def start(self):
+        """在后台线程中开始监视，返回该线程"""
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
+
+    def run(self):
+        """先生成一次文档，然后轮询直到调用stop()"""
+        self._stop_event.clear()
+        self.pipeline.reset()
+        built = self.scan()
+        if not self.regenerate(self.diff({}, built)):
+            # 首次生成失败时视为尚未生成，下一次轮询后重试
+            built = {}
+        seen = built
+        last_change = time.monotonic()
+
+        while not self._stop_event.wait(self.interval):
+            try:
+                current = self.scan()
+            except OSError as e:
+                self.event_callback('error', f"扫描项目路径失败: {e}")
+                continue
+            now = time.monotonic()
+            if current != seen:
+                seen = current
+                last_change = now
+                self.event_callback('change', self.diff(built, current))
+            if current == built or now - last_change < self.debounce:
+                continue
+            if self.regenerate(self.diff(built, current)):
+                built = current
+            else:
+                # 失败（如文档正被Word打开）时等待下一个debounce周期后重试
+                last_change = now
+
+    def regenerate(self, changes):
+        """按变化重新生成并保存文档，成功时返回True"""
+        if self._stop_event.is_set():
+            return False
+        for path in changes['modified'] + changes['removed']:
+            self.content_cache.discard(path)
+        stats = self.content_cache.stats
+        reads = stats['misses'] + stats['content_hits']
+        start = time.perf_counter()
+        try:
+            result = self.pipeline.build(self.paths, self.extensions, self.gitignore_path, self.root_dir,
+                                         **self.build_options)
+            save_path = self.output_path(result['filename'])
+            self.pipeline.save(result, save_path)
+        except ExportCancelled:
+            return False
+        except Exception as e:
+            self.event_callback('error', f"重新生成文档失败: {e}")
+            return False
+
+        # 文件名包含代码行数，行数变化后删除本次监视之前生成的旧文档
+        if self._saved_path and os.path.abspath(self._saved_path) != os.path.abspath(save_path):
+            try:
+                os.remove(self._saved_path)
+            except OSError:
+                pass
+        self._saved_path = save_path
+
+        self.export_count += 1
+        self.last_export = {
+            'output': os.path.abspath(save_path),
+            'file_count': result['file_count'],
+            'total_code_lines': result['total_code_lines'],
+            'page_count': round(result['page_count'], 1),
+            'reread_files': stats['misses'] + stats['content_hits'] - reads,
+            'changes': {kind: len(paths) for kind, paths in changes.items()},
+            'seconds': round(time.perf_counter() - start, 3),
+            'export_count': self.export_count
+        }
+        self.event_callback('export', self.last_export)
+        return True
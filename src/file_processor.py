@@ -1,11 +1,13 @@
 import os
+import time
 import pathlib
 import chardet
 import pathspec
 
 class FileProcessor:
-    def __init__(self):
-        pass
+    def __init__(self, content_cache=None):
+        # 可选的FileContentCache，多个导出任务共享时同一文件只读取和解码一次
+        self.content_cache = content_cache
     
     def detect_encoding(self, file_path):
         """检测文件编码"""
@@ -22,11 +24,53 @@ class FileProcessor:
         lines = content.splitlines()
         # 只保留非空行
         return [line for line in lines if line.strip()]
+
+    def decode_lines(self, raw, profiler=None):
+        """检测字节内容的编码并解码，处理方式与read_file_lines相同，返回(编码, 行列表)"""
+        start = time.perf_counter()
+        encoding = chardet.detect(raw)['encoding'] or 'utf-8'
+        if profiler is not None:
+            profiler.add_time('detect_encoding', time.perf_counter() - start)
+        # 与文本模式读取一致：统一换行符
+        content = raw.decode(encoding).replace('\r\n', '\n').replace('\r', '\n')
+        content = content.replace('\v', '\n')
+        return encoding, [line for line in content.splitlines() if line.strip()]
+
+    @staticmethod
+    def count_file_lines(file_path):
+        """不检测编码，直接在原始字节上统计非空行数，用于快速预估"""
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        # UTF-16文件的换行符不是单字节，先按BOM解码
+        if raw.startswith((b'\xff\xfe', b'\xfe\xff')):
+            lines = raw.decode('utf-16', errors='replace').replace('\v', '\n').splitlines()
+        else:
+            lines = raw.replace(b'\v', b'\n').splitlines()
+        return sum(1 for line in lines if line.strip())
+
+    def load_file_lines(self, file_path, profiler=None):
+        """读取文件的非空行，设置了内容缓存时优先从缓存读取
+
+        传入StageProfiler时累计编码检测的耗时。
+        """
+        if self.content_cache is not None:
+            return self.content_cache.get_lines(file_path, lambda raw: self.decode_lines(raw, profiler))[1]
+        start = time.perf_counter()
+        encoding = self.detect_encoding(file_path)
+        if profiler is not None:
+            profiler.add_time('detect_encoding', time.perf_counter() - start)
+        return self.read_file_lines(file_path, encoding)
     
     def collect_files(self, paths, extensions, gitignore_path=None):
         """收集所有匹配的文件，支持目录和单个文件"""
-        all_files = []
         ignored_files = []
+        all_files = list(self.iter_files(paths, extensions, gitignore_path, ignored_files))
+        return all_files, ignored_files
+    
+    def iter_files(self, paths, extensions, gitignore_path=None, ignored_files=None):
+        """逐个产出匹配的文件，顺序与collect_files相同；被.gitignore忽略的相对路径追加到ignored_files"""
+        if ignored_files is None:
+            ignored_files = []
         
         # 获取 .gitignore 规则
         spec = None
@@ -45,33 +89,29 @@ class FileProcessor:
                 with open(base_path / '.gitignore', 'r', encoding='utf-8') as f:
                     current_spec = pathspec.PathSpec.from_lines('gitwildmatch', f)
             
-            # 如果是文件，直接添加
+            # 如果是文件，直接产出
             if base_path.is_file():
-                all_files.append(base_path)
+                yield base_path
                 continue
                 
-            # 如果是目录，收集当前路径下的所有匹配文件
-            current_files = []
+            # 如果是目录，逐个产出当前路径下的匹配文件
             for extension in extensions:
                 extension = extension.strip('.')
-                current_files.extend(base_path.rglob(f"*.{extension}"))
-            
-            # 应用gitignore过滤
-            if current_spec:
-                for f in current_files:
+                for f in base_path.rglob(f"*.{extension}"):
+                    # 应用gitignore过滤
+                    if not current_spec:
+                        yield f
+                        continue
                     try:
                         relative_path = f.relative_to(base_path)
-                        if not current_spec.match_file(str(relative_path)):
-                            all_files.append(f)
-                        else:
-                            ignored_files.append(str(relative_path))
                     except ValueError:
-                        # 如果无法计算相对路径，直接添加
-                        all_files.append(f)
-            else:
-                all_files.extend(current_files)
-        
-        return all_files, ignored_files
+                        # 如果无法计算相对路径，直接产出
+                        yield f
+                        continue
+                    if not current_spec.match_file(str(relative_path)):
+                        yield f
+                    else:
+                        ignored_files.append(str(relative_path))
     
     def process_files(self, files_to_process, paths, root_dir=None, progress_callback=None):
         """处理文件列表，返回样式化的行列表和统计信息"""
@@ -82,60 +122,54 @@ class FileProcessor:
             if progress_callback:
                 progress_callback(i + 1, file_path.name)
             
-            ext = file_path.suffix
-            if ext not in lines_by_ext:
-                lines_by_ext[ext] = 0
-            
-            # 处理文件路径显示逻辑
-            if root_dir:
-                # 如果设置了主根目录，尝试从主根目录开始计算相对路径
-                root_path = pathlib.Path(root_dir)
-                try:
-                    # 尝试计算相对于主根目录的路径
-                    relative_path = str(file_path.relative_to(root_path))
-                except ValueError:
-                    # 如果文件不在主根目录下，则使用原始逻辑
-                    project_base = None
-                    for path in paths:
-                        try:
-                            file_path.relative_to(pathlib.Path(path))
-                            project_base = pathlib.Path(path)
-                            break
-                        except ValueError:
-                            continue
-                    
-                    if project_base:
-                        # 如果文件在项目路径下，计算相对路径并加上主根目录前缀
-                        file_relative = file_path.relative_to(project_base)
-                        relative_path = os.path.join(root_path.name, file_relative)
-                    else:
-                        # 如果文件不在任何项目路径下，直接使用文件名
-                        relative_path = str(file_path)
-            else:
-                # 原始逻辑：找到文件所属的项目路径
-                project_base = None
-                for path in paths:
-                    try:
-                        file_path.relative_to(pathlib.Path(path))
-                        project_base = pathlib.Path(path)
-                        break
-                    except ValueError:
-                        continue
-                
-                if project_base:
-                    relative_path = str(file_path.relative_to(project_base))
-                else:
-                    relative_path = str(file_path)
-                
-            all_styled_lines.append((relative_path, 'path'))
-            
+            styled_lines, line_count = self.process_file(file_path, paths, root_dir)
+            lines_by_ext[file_path.suffix] = lines_by_ext.get(file_path.suffix, 0) + line_count
+            all_styled_lines.extend(styled_lines)
+        
+        return all_styled_lines, lines_by_ext
+    
+    def display_path(self, file_path, paths, root_dir=None):
+        """计算文件在文档中显示的路径"""
+        # 处理文件路径显示逻辑
+        if root_dir:
+            # 如果设置了主根目录，尝试从主根目录开始计算相对路径
+            root_path = pathlib.Path(root_dir)
             try:
-                encoding = self.detect_encoding(file_path)
-                lines = self.read_file_lines(file_path, encoding)
-                lines_by_ext[ext] += len(lines)
-                for line in lines:
-                    all_styled_lines.append((line, 'code'))
-            except Exception as e:
-                all_styled_lines.append((f"无法读取文件: {relative_path} ({e})", 'error'))
+                # 尝试计算相对于主根目录的路径
+                return str(file_path.relative_to(root_path))
+            except ValueError:
+                pass
         
-        return all_styled_lines, lines_by_ext 
\ No newline at end of file
+        # 找到文件所属的项目路径
+        project_base = None
+        for path in paths:
+            try:
+                file_path.relative_to(pathlib.Path(path))
+                project_base = pathlib.Path(path)
+                break
+            except ValueError:
+                continue
+        
+        if not project_base:
+            # 如果文件不在任何项目路径下，直接使用完整路径
+            return str(file_path)
+        file_relative = file_path.relative_to(project_base)
+        if root_dir:
+            # 文件不在主根目录下但在项目路径下，计算相对路径并加上主根目录前缀
+            return os.path.join(pathlib.Path(root_dir).name, file_relative)
+        return str(file_relative)
+    
+    def process_file(self, file_path, paths, root_dir=None, profiler=None):
+        """处理单个文件，返回(样式化的行列表, 代码行数)；传入StageProfiler时记录读取耗时"""
+        relative_path = self.display_path(file_path, paths, root_dir)
+        styled_lines = [(relative_path, 'path')]
+        start = time.perf_counter()
+        try:
+            lines = self.load_file_lines(file_path, profiler)
+        except Exception as e:
+            styled_lines.append((f"无法读取文件: {relative_path} ({e})", 'error'))
+            lines = []
+        if profiler is not None:
+            profiler.record_file(relative_path, time.perf_counter() - start, len(lines))
+        styled_lines.extend((line, 'code') for line in lines)
+        return styled_lines, len(lines)
@@ -0,0 +1,395 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlsplit
+
+from batch_runner import BatchRunner
+from content_cache import FileContentCache
+from export_pipeline import ExportPipeline
+from file_processor import FileProcessor
+from progress_tracker import ProgressTracker
+
+# 服务只监听本机地址
+HOST = '127.0.0.1'
+LOCAL_HOSTS = ('127.0.0.1', 'localhost')
+
+# 相似度任务可设置的参数及默认值
+SIMILARITY_DEFAULTS = {
+    'files': [],
+    'analysis': 'exact',
+    'top_k': None,
+    'threshold': 30,
+    'filter_boilerplate': False,
+    'extensions': None,
+    'mode': '默认模式',
+    'gitignore': None,
+}
+
+# 请求体大小上限（字节）
+MAX_REQUEST_BYTES = 1024 * 1024
+
+class JobService:
+    """本机导出和相似度分析任务服务：任务排队后在线程池中运行，结果文件保存在work_dir下各任务的目录中
+
+    所有导出任务共享同一个FileContentCache，同一文件在多个任务之间只读取和解码一次；
+    相似度任务共用同一个SimilarityAnalyzer，分词器、行频索引和分析缓存在任务之间保持加载状态。
+    SimilarityAnalyzer保存单次分析的状态，相似度任务在单独的单线程执行器中依次运行，
+    不占用导出任务的工作线程，排队的相似度任务再多，导出任务也可以同时运行。
+    已结束的任务超过max_finished_jobs个时，删除最早的任务记录及其结果文件。
+    """
+
+    def __init__(self, work_dir, max_workers=None, max_finished_jobs=200, content_cache=None):
+        self.work_dir = os.path.abspath(work_dir)
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_finished_jobs = max_finished_jobs
+        self.runner = BatchRunner(self.max_workers, content_cache or FileContentCache())
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self.similarity_executor = ThreadPoolExecutor(max_workers=1)
+        self.started_at = time.time()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._analyzer = None
+
+    def submit(self, spec):
+        """校验任务参数并加入队列，返回任务信息；参数无效时抛出ValueError"""
+        if not isinstance(spec, dict):
+            raise ValueError("任务参数必须是JSON对象")
+        spec = dict(spec)
+        job_type = spec.pop('type', 'export')
+        if job_type == 'export':
+            if spec.get('output'):
+                raise ValueError("服务模式下文档保存在任务目录中，不支持output参数")
+            params = self.runner.prepare_job(spec)
+        elif job_type == 'similarity':
+            params = self.prepare_similarity(spec)
+        else:
+            raise ValueError(f"未知的任务类型: {job_type}")
+
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            'id': job_id,
+            'type': job_type,
+            'status': 'queued',
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'progress': None,
+            'result': None,
+            'error': None,
+            'files': [],
+            'cancel_requested': False,
+            'params': params,
+            'pipeline': ExportPipeline(FileProcessor(self.runner.content_cache)) if job_type == 'export' else None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            executor = self.similarity_executor if job_type == 'similarity' else self.executor
+            job['future'] = executor.submit(self._run, job)
+        return self.describe(job_id)
+
+    def prepare_similarity(self, spec):
+        """合并默认参数并校验相似度任务"""
+        unknown = set(spec) - set(SIMILARITY_DEFAULTS)
+        if unknown:
+            raise ValueError(f"相似度任务包含未知参数: {', '.join(sorted(unknown))}")
+        params = dict(SIMILARITY_DEFAULTS, **spec)
+        files = [os.path.abspath(os.path.expanduser(path)) for path in params['files']]
+        if len(files) < 2:
+            raise ValueError("相似度任务至少需要两个文件或目录")
+        missing = [path for path in files if not os.path.exists(path)]
+        if missing:
+            raise ValueError(f"文件不存在: {', '.join(missing)}")
+        if params['analysis'] not in ('exact', 'structural', 'semantic', 'estimate'):
+            raise ValueError(f"未知的分析方式: {params['analysis']}")
+        params['files'] = files
+        directory_count = sum(1 for path in files if os.path.isdir(path))
+        if 0 < directory_count < len(files):
+            raise ValueError("不能混合比较项目目录和Word文档")
+        if directory_count and params['analysis'] != 'exact':
+            raise ValueError("比较项目目录时只支持序列相似度（analysis为exact）")
+        if directory_count:
+            params['extensions'] = self.runner.resolve_extensions(params)
+        return params
+
+    def _run(self, job):
+        job_dir = os.path.join(self.work_dir, job['id'])
+        os.makedirs(job_dir, exist_ok=True)
+        with self._lock:
+            if job['status'] != 'queued':
+                return
+            if job['cancel_requested']:
+                job['status'] = 'cancelled'
+                job['finished_at'] = time.time()
+                return
+            job['status'] = 'running'
+            job['started_at'] = time.time()
+
+        tracker = ProgressTracker(min_interval=0.5)
+
+        def report(stage, current, total, detail, lines=None):
+            # 保存阶段只报告开始和结束两次，不限流，结束后的进度停留在保存完成
+            snapshot = tracker.update(stage, current, total, detail, lines, force=stage == 'save')
+            if snapshot is not None:
+                with self._lock:
+                    job['progress'] = snapshot
+
+        try:
+            if job['type'] == 'export':
+                result = self.runner.run_job(job['params'], job_dir, report, job['pipeline'])
+                error = result.pop('error', None)
+            else:
+                result, error = self.run_similarity(job['params'], job_dir), None
+        except Exception as e:
+            result, error = None, str(e)
+
+        with self._lock:
+            job['pipeline'] = None
+            job['finished_at'] = time.time()
+            job['result'] = result
+            job['error'] = error
+            if error == "已取消":
+                job['status'] = 'cancelled'
+            else:
+                job['status'] = 'failed' if error else 'succeeded'
+            job['files'] = sorted(name for name in os.listdir(job_dir)
+                                  if os.path.isfile(os.path.join(job_dir, name)))
+        self._prune()
+
+    def run_similarity(self, params, job_dir):
+        """运行相似度分析，报告写入任务目录，返回统计信息"""
+        from similarity_analyzer import SimilarityAnalyzer
+
+        report_path = os.path.join(job_dir, "相似度报告.txt")
+        start = time.perf_counter()
+        # 只在相似度执行器的线程中调用，分析器不会被同时使用
+        if self._analyzer is None:
+            self._analyzer = SimilarityAnalyzer()
+        analyzer = self._analyzer
+        files = params['files']
+        top_k = params['top_k']
+        if all(os.path.isdir(path) for path in files):
+            report = analyzer.get_directory_similarity_report(files, params['extensions'], params['gitignore'],
+                                                              top_k or 20, params['filter_boilerplate'])
+        elif params['analysis'] == 'semantic':
+            report = analyzer.get_semantic_similarity_report(files, top_k or 20)
+        elif params['analysis'] == 'estimate':
+            report = analyzer.get_estimate_report(files, threshold=params['threshold'], top_k=top_k)
+        else:
+            report = analyzer.get_similarity_report(
+                files, mode=params['analysis'], filter_boilerplate=params['filter_boilerplate'], top_k=top_k,
+                output_path=os.path.join(job_dir, "相似度结果.csv"))
+        stats = analyzer.last_run_stats
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(report)
+        return {'report': report_path, 'stats': stats, 'seconds': round(time.perf_counter() - start, 3)}
+
+    def cancel(self, job_id):
+        """取消排队中或正在导出的任务；返回False表示任务已结束或无法取消"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                raise KeyError(job_id)
+            if job['status'] == 'queued':
+                job['cancel_requested'] = True
+                if job['future'].cancel():
+                    job['status'] = 'cancelled'
+                    job['finished_at'] = time.time()
+                return True
+            if job['status'] == 'running' and job['pipeline'] is not None:
+                # 导出在下一个文件边界处停止；相似度分析开始后无法中断。
+                # 流水线的取消状态不会被build()清除，导出尚未开始时同样生效
+                job['cancel_requested'] = True
+                job['pipeline'].cancel()
+                return True
+            return False
+
+    def describe(self, job_id):
+        """返回可序列化为JSON的任务信息"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                raise KeyError(job_id)
+            info = {key: job[key] for key in ('id', 'type', 'status', 'created_at', 'started_at', 'finished_at',
+                                              'progress', 'result', 'error')}
+            info['files'] = [{'name': name, 'url': f"/jobs/{job_id}/files/{quote(name)}"} for name in job['files']]
+            if job['status'] == 'queued':
+                info['queue_position'] = sum(1 for other in self._jobs.values()
+                                             if other['status'] == 'queued' and other['created_at'] <= job['created_at'])
+            return info
+
+    def list_jobs(self):
+        with self._lock:
+            job_ids = list(self._jobs)
+        return [self.describe(job_id) for job_id in job_ids]
+
+    def file_path(self, job_id, name):
+        """返回任务结果文件的路径，只允许访问任务目录中列出的文件"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or name not in job['files']:
+                raise KeyError(name)
+        return os.path.join(self.work_dir, job_id, name)
+
+    def status(self):
+        """返回服务状态：各状态的任务数、工作线程数和文件内容缓存统计"""
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+        return {
+            'work_dir': self.work_dir,
+            'workers': self.max_workers,
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'jobs': counts,
+            'cache': dict(self.runner.content_cache.stats),
+        }
+
+    def _prune(self):
+        """删除超出数量上限的最早结束的任务及其结果文件"""
+        with self._lock:
+            finished = sorted((job for job in self._jobs.values() if job['finished_at'] is not None),
+                              key=lambda job: job['finished_at'])
+            stale = finished[:max(0, len(finished) - self.max_finished_jobs)]
+            for job in stale:
+                del self._jobs[job['id']]
+        for job in stale:
+            shutil.rmtree(os.path.join(self.work_dir, job['id']), ignore_errors=True)
+
+    def shutdown(self):
+        """取消所有未完成的任务并等待工作线程结束"""
+        with self._lock:
+            job_ids = [job['id'] for job in self._jobs.values() if job['status'] in ('queued', 'running')]
+        for job_id in job_ids:
+            self.cancel(job_id)
+        self.executor.shutdown(wait=True)
+        self.similarity_executor.shutdown(wait=True)
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """任务服务的HTTP接口
+
+        POST   /jobs                      提交任务，请求体为JSON，type为export（默认）或similarity
+        GET    /jobs                      列出所有任务
+        GET    /jobs/<id>                 查询任务状态、进度和结果
+        DELETE /jobs/<id>                 取消任务
+        GET    /jobs/<id>/files/<文件名>  下载结果文件
+        GET    /status                    服务状态
+    """
+
+    server_version = "SoftwareCopyrightJobService/1.0"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_json(status, {'error': message})
+
+    def route(self):
+        """校验请求来源后返回路径分段
+
+        Host头只接受本机地址，防止DNS重绑定；浏览器跨站发出的请求带有Origin头，
+        来源不是本机页面时拒绝。
+        """
+        host = (self.headers.get('Host') or '').rsplit(':', 1)[0]
+        if host not in LOCAL_HOSTS:
+            self.send_error_json(403, "只接受来自本机的请求")
+            return None
+        origin = self.headers.get('Origin')
+        if origin is not None and urlsplit(origin).hostname not in LOCAL_HOSTS:
+            self.send_error_json(403, "不接受来自其他网页的请求")
+            return None
+        return [unquote(part) for part in urlsplit(self.path).path.strip('/').split('/') if part]
+
+    def do_GET(self):
+        parts = self.route()
+        if parts is None:
+            return
+        try:
+            if parts == ['status']:
+                self.send_json(200, self.service.status())
+            elif parts == ['jobs']:
+                self.send_json(200, self.service.list_jobs())
+            elif len(parts) == 2 and parts[0] == 'jobs':
+                self.send_json(200, self.service.describe(parts[1]))
+            elif len(parts) == 4 and parts[0] == 'jobs' and parts[2] == 'files':
+                self.send_file(self.service.file_path(parts[1], parts[3]))
+            else:
+                self.send_error_json(404, "未知的接口")
+        except KeyError:
+            self.send_error_json(404, "任务或文件不存在")
+
+    def do_POST(self):
+        parts = self.route()
+        if parts is None:
+            return
+        if parts != ['jobs']:
+            self.send_error_json(404, "未知的接口")
+            return
+        # 网页无需预检即可跨站提交text/plain等“简单请求”，只接受application/json
+        content_type = (self.headers.get('Content-Type') or '').split(';', 1)[0].strip().lower()
+        if content_type != 'application/json':
+            self.send_error_json(415, "请求体必须是Content-Type为application/json的JSON")
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_REQUEST_BYTES:
+            self.send_error_json(413, "请求体过大")
+            return
+        try:
+            spec = json.loads(self.rfile.read(length).decode('utf-8') or '{}')
+        except (ValueError, UnicodeDecodeError) as e:
+            self.send_error_json(400, f"请求体不是有效的JSON: {e}")
+            return
+        try:
+            self.send_json(202, self.service.submit(spec))
+        except ValueError as e:
+            self.send_error_json(400, str(e))
+
+    def do_DELETE(self):
+        parts = self.route()
+        if parts is None:
+            return
+        if len(parts) != 2 or parts[0] != 'jobs':
+            self.send_error_json(404, "未知的接口")
+            return
+        try:
+            if self.service.cancel(parts[1]):
+                self.send_json(202, self.service.describe(parts[1]))
+            else:
+                self.send_error_json(409, "任务已结束或无法取消")
+        except KeyError:
+            self.send_error_json(404, "任务不存在")
+
+    def send_file(self, path):
+        size = os.path.getsize(path)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(size))
+        self.send_header('Content-Disposition', f"attachment; filename*=UTF-8''{quote(os.path.basename(path))}")
+        self.end_headers()
+        with open(path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile)
+
+def create_server(service, port=8765, verbose=False):
+    """创建只监听本机地址的HTTP服务，port为0时自动选择空闲端口"""
+    server = ThreadingHTTPServer((HOST, port), JobRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
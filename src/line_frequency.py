@@ -0,0 +1,148 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+class LineFrequencyIndex:
+    """语料级的行文档频率表，用于识别样板代码行并计算IDF权重
+
+    像 `}`、`import React from 'react';`、`return null;` 这样几乎出现在每个文档中的行，
+    文档频率超过阈值后被视为停用行，不参与相同行匹配；其余行按IDF加权计分。
+
+    语料中的文档按文档键（Word文档的路径，或项目名加源文件的相对路径）计数，而不是按内容哈希：
+    同一文档的新版本替换旧版本的计数，反复分析同一项目的后续版本不会让该项目自身的代码行
+    变成“样板行”。语料最多保留max_documents个文档，超出时淘汰最早加入的文档并扣除其计数。
+    频率表保存到path，在多次分析之间持续累积，内容未变化时不重新写入；path为None时只保存在内存中。
+    """
+
+    # 文件格式版本
+    FORMAT_VERSION = 2
+
+    def __init__(self, path=None, max_df_ratio=0.5, min_documents=5, max_documents=1000):
+        self.path = path
+        # 文档频率超过 max_df_ratio × 文档总数 的行视为停用行
+        self.max_df_ratio = max_df_ratio
+        # 语料文档数少于该值时不判定停用行，避免小样本误判
+        self.min_documents = min_documents
+        # 语料保留的文档数上限
+        self.max_documents = max_documents
+        self.df = {}
+        # 文档键 -> (内容哈希, 去重后的行哈希数组)，按加入顺序排列
+        self.documents = OrderedDict()
+        self._lock = threading.Lock()
+        self._lookup = None
+        self._dirty = False
+
+    @property
+    def doc_count(self):
+        return len(self.documents)
+
+    @classmethod
+    def load(cls, path=None, **kwargs):
+        """从磁盘加载频率表，文件不存在或格式不符时返回空表"""
+        index = cls(path, **kwargs)
+        if path is None:
+            return index
+        try:
+            with np.load(index.path, allow_pickle=False) as data:
+                if int(data['version']) != cls.FORMAT_VERSION:
+                    return index
+                hashes = np.split(data['hashes'], data['offsets'][1:-1])
+                for key, content_hash, doc_hashes in zip(data['keys'].tolist(), data['content_hashes'].tolist(),
+                                                         hashes):
+                    index._add(key, content_hash, doc_hashes)
+            index._dirty = False
+        except (OSError, ValueError, KeyError):
+            pass
+        return index
+
+    def save(self):
+        """保存频率表到磁盘，自上次保存以来没有变化时跳过"""
+        with self._lock:
+            if not self._dirty or self.path is None:
+                return
+            items = list(self.documents.items())
+            lengths = [len(doc_hashes) for _, (_, doc_hashes) in items]
+            data = {
+                'version': np.array(self.FORMAT_VERSION),
+                'keys': np.array([key for key, _ in items], dtype=str),
+                'content_hashes': np.array([content_hash for _, (content_hash, _) in items], dtype=str),
+                'offsets': np.concatenate(([0], np.cumsum(lengths, dtype=np.int64))),
+                'hashes': (np.concatenate([doc_hashes for _, (_, doc_hashes) in items]) if items
+                           else np.zeros(0, dtype=np.uint64)),
+            }
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp_path, **data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"保存行频率表失败: {e}")
+
+    def _add(self, doc_key, content_hash, unique):
+        for line_hash in unique.tolist():
+            self.df[line_hash] = self.df.get(line_hash, 0) + 1
+        self.documents[doc_key] = (content_hash, unique)
+
+    def _remove(self, doc_key):
+        _, unique = self.documents.pop(doc_key)
+        for line_hash in unique.tolist():
+            count = self.df[line_hash] - 1
+            if count:
+                self.df[line_hash] = count
+            else:
+                del self.df[line_hash]
+
+    def add_document(self, doc_key, hashes, ignore_hash=None, content_hash=""):
+        """将一个文档的行计入频率表
+
+        同一文档键内容未变化时只更新其加入顺序；内容变化时先扣除旧版本的计数。
+        """
+        with self._lock:
+            existing = self.documents.get(doc_key)
+            if existing is not None and content_hash and existing[0] == content_hash:
+                self.documents.move_to_end(doc_key)
+                return
+            unique = np.unique(np.asarray(hashes, dtype=np.uint64))
+            if ignore_hash is not None:
+                unique = unique[unique != ignore_hash]
+            if existing is not None:
+                self._remove(doc_key)
+            self._add(doc_key, content_hash, unique)
+            while len(self.documents) > self.max_documents:
+                self._remove(next(iter(self.documents)))
+            self._lookup = None
+            self._dirty = True
+
+    def _build_lookup(self):
+        """构建排序后的哈希数组及对应的文档频率，用于向量化查询"""
+        with self._lock:
+            if self._lookup is None:
+                keys = np.fromiter(self.df.keys(), dtype=np.uint64, count=len(self.df))
+                counts = np.fromiter(self.df.values(), dtype=np.int64, count=len(self.df))
+                order = np.argsort(keys)
+                self._lookup = (keys[order], counts[order])
+            return self._lookup
+
+    def document_frequencies(self, hashes):
+        """查询一组行哈希的文档频率，未出现过的行记为0"""
+        keys, counts = self._build_lookup()
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if len(keys) == 0:
+            return np.zeros(len(hashes), dtype=np.int64)
+        positions = np.minimum(np.searchsorted(keys, hashes), len(keys) - 1)
+        found = keys[positions] == hashes
+        return np.where(found, counts[positions], 0)
+
+    def stop_hashes(self):
+        """返回停用行的哈希数组（已排序）"""
+        if self.doc_count < self.min_documents:
+            return np.zeros(0, dtype=np.uint64)
+        keys, counts = self._build_lookup()
+        return keys[counts > self.max_df_ratio * self.doc_count]
+
+    def idf_weights(self, hashes):
+        """计算一组行哈希的平滑IDF权重：log((1 + N) / (1 + df)) + 1"""
+        df = self.document_frequencies(hashes)
+        return np.log((1 + self.doc_count) / (1 + df)) + 1
@@ -1,8 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
-import pathlib
-import datetime as dt
+import multiprocessing
+import queue
+import threading
 from PIL import Image, ImageTk, ImageDraw  # 用于美化界面图标
 import sv_ttk  # 用于现代化Tkinter主题
 
@@ -10,7 +11,9 @@ import sv_ttk  # 用于现代化Tkinter主题
 from config_manager import ConfigManager
 from file_processor import FileProcessor
 from document_generator import DocumentGenerator
-from similarity_analyzer import SimilarityAnalyzer
+from export_pipeline import ExportPipeline, ExportCancelled
+from progress_tracker import ProgressTracker
+# similarity_analyzer依赖jieba、numpy、sklearn等较重的库，在首次使用时才导入
 from ui_components import FontSelector, CustomModeDialog, ProgressWindow, SimilarityAnalysisFrame
 
 class CodeToWordApp:
@@ -35,7 +38,7 @@ class CodeToWordApp:
         except Exception as e:
             print(f"主题加载失败，使用默认主题: {e}")
         
-    def __init__(self, root):
+    def __init__(self, root, prewarm_analyzer=True):
         self.root = root
         self.root.title("软件著作权源代码文档生成器")
         self.root.geometry("900x950") # 增大窗口宽度以适应新设计
@@ -76,7 +79,10 @@ class CodeToWordApp:
         self.config_manager = ConfigManager()
         self.file_processor = FileProcessor()
         self.document_generator = DocumentGenerator()
-        self.similarity_analyzer = SimilarityAnalyzer()
+        self.similarity_analyzer = None
+        self._analyzer_lock = threading.Lock()
+        # 正在进行的导出任务
+        self.export_pipeline = None
         
         # 延迟加载用户自定义模式以提高启动速度
         self.root.after_idle(self.config_manager.load_config)
@@ -108,10 +114,37 @@ class CodeToWordApp:
         # 在文件相似度分析标签页中创建内容
         self.create_similarity_tab()
         
+        # 首次切换到相似度分析标签页时加载分析模块
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        
+        # 窗口显示后在后台线程中预热分析模块
+        if prewarm_analyzer:
+            self.root.after(1500, self.prewarm_similarity_analyzer)
+        
         # 使窗口可调整大小
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
     
+    def get_similarity_analyzer(self):
+        """获取相似度分析器，首次调用时才导入分析模块"""
+        with self._analyzer_lock:
+            if self.similarity_analyzer is None:
+                from similarity_analyzer import SimilarityAnalyzer
+                self.similarity_analyzer = SimilarityAnalyzer()
+                # 结巴词典在后台加载，首次分析中文注释时无需等待
+                self.similarity_analyzer.segmenter.warm_up_async()
+            return self.similarity_analyzer
+    
+    def prewarm_similarity_analyzer(self):
+        """在后台线程中加载分析模块，不阻塞界面"""
+        if self.similarity_analyzer is None:
+            threading.Thread(target=self.get_similarity_analyzer, daemon=True).start()
+    
+    def on_tab_changed(self, event=None):
+        """切换到相似度分析标签页时开始加载分析模块"""
+        if self.notebook.select() == str(self.similarity_tab):
+            self.prewarm_similarity_analyzer()
+    
     def create_code_export_tab(self):
         """创建源代码导出标签页内容"""
         # 创建Canvas和滚动条
@@ -349,7 +382,16 @@ class CodeToWordApp:
             command=self.generate_document,
             style='Generate.TButton'
         )
-        generate_btn.pack(padx=10)
+        generate_btn.pack(side=tk.LEFT, padx=10)
+        
+        # 预估按钮：只统计行数和页数，便于调整每页行数和文件类型
+        estimate_btn = ttk.Button(
+            button_frame,
+            text="预估页数",
+            command=self.estimate_document,
+            style='Add.TButton'
+        )
+        estimate_btn.pack(side=tk.LEFT, padx=10)
         
         # 底部信息栏
         footer_frame = ttk.Frame(main_frame)
@@ -394,7 +436,9 @@ class CodeToWordApp:
         subtitle_label.pack(pady=5)
         
         # 创建相似度分析框架
-        similarity_frame = SimilarityAnalysisFrame(self.similarity_tab, self.similarity_analyzer)
+        similarity_frame = SimilarityAnalysisFrame(
+            self.similarity_tab, self.get_similarity_analyzer, self.get_selected_extensions
+        )
         similarity_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
     
     def add_path_row(self):
@@ -553,23 +597,26 @@ class CodeToWordApp:
         save_callback = CustomModeDialog.show_dialog(self.root, self.config_manager, update_mode_selector)
         save_callback.extensions = extensions
     
-    def generate_document(self):
+    def get_selected_extensions(self):
+        """获取当前选择的文件类型列表"""
+        mode = self.file_mode_var.get()
+        if mode == "其他模式":
+            return [ext.strip() for ext in self.extension_var.get().split(',') if ext.strip()]
+        return self.config_manager.get_file_type_modes().get(mode, [])
+    
+    def get_export_options(self):
+        """读取并校验界面上的导出参数，无效时提示并返回None"""
         # 收集所有项目路径
         paths = [var.get() for var in self.path_vars if var.get()]
         if not paths:
             messagebox.showerror("错误", "请至少选择一个项目路径")
-            return
+            return None
             
         # 获取文件类型
-        mode = self.file_mode_var.get()
-        if mode == "其他模式":
-            extensions = [ext.strip() for ext in self.extension_var.get().split(',')]
-        else:
-            extensions = self.config_manager.get_file_type_modes().get(mode, [])
-            
+        extensions = self.get_selected_extensions()
         if not extensions:
             messagebox.showerror("错误", "请选择或输入文件类型")
-            return
+            return None
         
         font_name = self.font_var.get()
         if not font_name:
@@ -590,130 +637,195 @@ class CodeToWordApp:
                 raise ValueError("每页行数必须大于0")
         except ValueError:
             messagebox.showerror("错误", "请输入有效的每页行数")
-            return
+            return None
             
-        # 根据每页行数计算适当的字体大小（简单算法，可能需要调整）
-        line_height_cm = 26.7 / lines_per_page
-        font_size = int(line_height_cm * 28)
-        font_size = max(8, min(12, font_size))
+        if self.export_pipeline is not None:
+            messagebox.showwarning("提示", "已有导出任务正在进行")
+            return None
+        
+        return {
+            'paths': paths,
+            'extensions': extensions,
+            'gitignore_path': self.gitignore_path_var.get() or None,
+            'root_dir': root_dir,
+            'font_name': font_name,
+            'lines_per_page': lines_per_page,
+            'app_name': app_name,
+            'version': version,
+            'app_name_font': app_name_font,
+            'version_font': version_font,
+            'generate_toc': self.generate_toc_var.get(),
+            'show_line_numbers': self.show_line_numbers_var.get()
+        }
+    
+    def estimate_document(self):
+        """只统计文件和行数，快速预估页数，不生成文档"""
+        options = self.get_export_options()
+        if options is None:
+            return
         
-        try:
-            # --- Stage 1: File Discovery & .gitignore Filtering ---
-            gitignore_path_str = self.gitignore_path_var.get()
-            files_to_process, ignored_files = self.file_processor.collect_files(
-                paths, extensions, gitignore_path_str if gitignore_path_str else None
-            )
-
-            # --- Stage 1.5: Setup Progress Bar ---
-            progress_window = ProgressWindow(self.root, len(files_to_process))
-
-            # --- Stage 2: Collect all lines from all files ---
-            def progress_callback(current, filename):
-                progress_window.update_progress(current, filename)
-            
-            all_styled_lines, lines_by_ext = self.file_processor.process_files(
-                files_to_process, paths, root_dir, progress_callback
-            )
-
-            file_count = len(files_to_process)
+        self.export_pipeline = ExportPipeline(self.file_processor, self.document_generator)
+        progress_window = ProgressWindow(self.root, 0, on_cancel=self.export_pipeline.cancel)
+        pipeline = self.export_pipeline
+        
+        def work(report):
+            return pipeline.dry_run(options['paths'], options['extensions'], options['gitignore_path'],
+                                    options['root_dir'], options['lines_per_page'], report)
+        
+        def on_estimated(result):
             progress_window.destroy()
-
-            # --- Stage 3: 使用所有代码行 ---
-            lines_to_print = all_styled_lines
-
-            # --- Stage 4: Generate the document from the prepared line list ---
-            doc = self.document_generator.create_document(
-                lines_to_print, font_name, font_size, app_name, version,
-                app_name_font, version_font, self.generate_toc_var.get(), 
-                self.show_line_numbers_var.get()
-            )
-
-            # --- Stage 5: Save and open ---
-            # 计算真实的总代码行数
-            total_code_lines = sum(lines_by_ext.values())
-            
-            # 准备文件名
-            filename = f"{app_name}_{version}_源代码_{total_code_lines}行.docx"
-            
-            save_path = ""
-            output_dir = self.output_path_var.get()
-            
-            if output_dir:
-                # 如果指定了输出目录，直接在该目录下保存文件
-                save_path = os.path.join(output_dir, filename)
-            else:
-                # 否则弹出保存对话框
-                save_path = filedialog.asksaveasfilename(
-                    defaultextension=".docx",
-                    filetypes=[("Word documents", "*.docx")],
-                    initialfile=filename
-                )
-            
-            if save_path:
-                doc.save(save_path)
-                
-                total_code_lines = sum(lines_by_ext.values())
-                
-                # 构建详细的成功信息
-                stats_details = "\n\n代码行数统计:\n"
-                for ext, count in lines_by_ext.items():
-                    stats_details += f"  - {ext} 文件: {count} 行\n"
-                stats_details += f"总代码行数: {total_code_lines} 行"
-
-                ignored_details = ""
-                if ignored_files:
-                    ignored_details = "\n\n根据 .gitignore 忽略了以下文件:\n"
-                    for f in ignored_files[:10]: # 最多显示10个
-                        ignored_details += f"  - {f}\n"
-                    if len(ignored_files) > 10:
-                        ignored_details += f"  ...等共 {len(ignored_files)} 个文件\n"
-
-                actual_pages = len(lines_to_print) / lines_per_page
-                success_message = f"文档已生成完成！\n共处理 {file_count} 个文件。\n共 {actual_pages:.1f} 页"
-                
-                success_message += stats_details
-                success_message += ignored_details
-
-                # 创建日志文件
-                log_filename = f"{app_name}_{version}_导出记录.txt"
-                log_path = os.path.join(os.path.dirname(save_path), log_filename)
-                
-                with open(log_path, 'w', encoding='utf-8') as log_file:
-                    log_file.write(f"文档名称: {os.path.basename(save_path)}\n")
-                    log_file.write(f"生成时间: {dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-                    log_file.write("处理的路径:\n")
-                    
-                    # 获取根目录
-                    root_dir = self.root_dir_var.get()
-                    root_path = pathlib.Path(root_dir) if root_dir else None
-                    
-                    for path in paths:
-                        path_obj = pathlib.Path(path)
-                        if root_path and path_obj.is_relative_to(root_path):
-                            rel_path = path_obj.relative_to(root_path)
-                            log_file.write(f"  - {rel_path} (相对路径)\n")
-                        else:
-                            log_file.write(f"  - {path}\n")
-                    
-                    log_file.write(f"\n总文件数: {file_count}\n")
-                    log_file.write(f"总代码行数: {total_code_lines}\n")
-                    log_file.write(f"总页数: {actual_pages:.1f}\n")
-                    
-                    # 写入文件类型统计
-                    log_file.write("\n文件类型统计:\n")
-                    for ext, count in lines_by_ext.items():
-                        log_file.write(f"  - {ext}: {count} 行\n")
-
-                messagebox.showinfo("成功", success_message + f"\n\n已在同目录下创建导出记录文件: {log_filename}")
+            self.export_pipeline = None
+            messagebox.showinfo("预估结果", pipeline.format_dry_run(result))
+        
+        self.run_export_job(work, progress_window, on_estimated)
+    
+    def generate_document(self):
+        options = self.get_export_options()
+        if options is None:
+            return
+        
+        # 文档生成在工作线程中进行，进度通过队列传回界面线程
+        self.export_pipeline = ExportPipeline(self.file_processor, self.document_generator)
+        progress_window = ProgressWindow(self.root, 0, on_cancel=self.export_pipeline.cancel)
+        
+        def work(report):
+            return self.export_pipeline.build(progress_callback=report, **options)
+        
+        def on_built(result):
+            progress_window.destroy()
+            self.save_generated_document(result)
+        
+        self.run_export_job(work, progress_window, on_built)
+    
+    def run_export_job(self, work, progress_window, on_done):
+        """在工作线程中执行导出任务，界面线程通过root.after轮询进度队列
+        
+        work(report)在工作线程中运行，report(阶段, 当前, 总数, 说明, 行数)经ProgressTracker限流后
+        把进度快照放入队列；任务完成后在界面线程中调用on_done(返回值)，出错或取消时关闭进度窗口并提示。
+        """
+        events = queue.Queue()
+        tracker = ProgressTracker()
+        
+        def report(stage, current, total, detail, lines=None):
+            snapshot = tracker.update(stage, current, total, detail, lines)
+            if snapshot is not None:
+                events.put(('progress', snapshot))
+        
+        def worker():
+            try:
+                events.put(('done', work(report)))
+            except ExportCancelled:
+                events.put(('cancelled',))
+            except Exception as e:
+                events.put(('error', e))
+        
+        threading.Thread(target=worker, daemon=True).start()
+        
+        def poll():
+            # 只显示最新的进度，避免逐条刷新拖慢界面
+            latest = None
+            while True:
                 try:
-                    os.startfile(save_path)
-                except Exception as e:
-                    messagebox.showwarning("提示", f"无法自动打开文件：{e}")
-            
+                    event = events.get_nowait()
+                except queue.Empty:
+                    break
+                if event[0] != 'progress':
+                    if latest is not None:
+                        self.show_export_progress(progress_window, latest)
+                    self.finish_export_job(event, progress_window, on_done)
+                    return
+                latest = event
+            if latest is not None:
+                self.show_export_progress(progress_window, latest)
+            self.root.after(100, poll)
+        
+        self.root.after(100, poll)
+    
+    def show_export_progress(self, progress_window, event):
+        """在进度窗口中显示导出阶段、当前文件、吞吐量和剩余时间"""
+        if progress_window.window is None:
+            return
+        progress_window.show_snapshot(event[1])
+    
+    def finish_export_job(self, event, progress_window, on_done):
+        """导出任务结束后在界面线程中处理结果"""
+        kind = event[0]
+        if kind == 'done':
+            on_done(event[1])
+            return
+        
+        progress_window.destroy()
+        self.export_pipeline = None
+        if kind == 'cancelled':
+            messagebox.showinfo("提示", "已取消文档生成")
+        else:
+            messagebox.showerror("错误", f"生成文档时发生错误：{str(event[1])}")
+    
+    def save_generated_document(self, result):
+        """选择保存位置后在工作线程中保存文档，完成后显示统计信息"""
+        save_path = ""
+        output_dir = self.output_path_var.get()
+        
+        if output_dir:
+            # 如果指定了输出目录，直接在该目录下保存文件
+            save_path = os.path.join(output_dir, result['filename'])
+        else:
+            # 否则弹出保存对话框
+            save_path = filedialog.asksaveasfilename(
+                defaultextension=".docx",
+                filetypes=[("Word documents", "*.docx")],
+                initialfile=result['filename']
+            )
+        
+        if not save_path:
+            self.export_pipeline = None
+            return
+        
+        progress_window = ProgressWindow(self.root, 1)
+        progress_window.set_status("正在保存文档...")
+        pipeline = self.export_pipeline
+        
+        def on_saved(log_path):
+            progress_window.destroy()
+            self.export_pipeline = None
+            self.show_export_summary(result, save_path, log_path)
+        
+        self.run_export_job(lambda report: pipeline.save(result, save_path, report), progress_window, on_saved)
+    
+    def show_export_summary(self, result, save_path, log_path):
+        """显示导出成功信息并打开文档"""
+        lines_by_ext = result['lines_by_ext']
+        ignored_files = result['ignored_files']
+        
+        # 构建详细的成功信息
+        stats_details = "\n\n代码行数统计:\n"
+        for ext, count in lines_by_ext.items():
+            stats_details += f"  - {ext} 文件: {count} 行\n"
+        stats_details += f"总代码行数: {result['total_code_lines']} 行"
+        
+        ignored_details = ""
+        if ignored_files:
+            ignored_details = "\n\n根据 .gitignore 忽略了以下文件:\n"
+            for f in ignored_files[:10]: # 最多显示10个
+                ignored_details += f"  - {f}\n"
+            if len(ignored_files) > 10:
+                ignored_details += f"  ...等共 {len(ignored_files)} 个文件\n"
+        
+        success_message = f"文档已生成完成！\n共处理 {result['file_count']} 个文件。\n共 {result['page_count']:.1f} 页"
+        
+        success_message += stats_details
+        success_message += ignored_details
+        
+        log_filename = os.path.basename(log_path)
+        messagebox.showinfo("成功", success_message + f"\n\n已在同目录下创建导出记录文件: {log_filename}")
+        try:
+            os.startfile(save_path)
         except Exception as e:
-            messagebox.showerror("错误", f"生成文档时发生错误：{str(e)}")
+            messagebox.showwarning("提示", f"无法自动打开文件：{e}")
 
 def main():
+    # 打包后的程序在Windows上使用进程池需要此调用
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = CodeToWordApp(root)
     root.mainloop()
@@ -0,0 +1,114 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+
+class SharedCorpus:
+    """把所有文档的行哈希数组和编码后的文本行放入共享内存，供工作进程按需读取
+
+    内存布局：先是所有文档的uint64行哈希（按文档顺序连续存放），
+    之后是所有文档以换行符连接的UTF-8文本。
+    """
+
+    def __init__(self, all_lines, all_hashes):
+        encoded_docs = [("\n".join(lines)).encode('utf-8') for lines in all_lines]
+        self.line_counts = [len(lines) for lines in all_lines]
+        self.hash_bytes = sum(self.line_counts) * 8
+        self.offsets = [self.hash_bytes]
+        for data in encoded_docs:
+            self.offsets.append(self.offsets[-1] + len(data))
+
+        # 共享内存大小不能为0
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, self.offsets[-1]))
+        if self.hash_bytes:
+            shared_hashes = np.ndarray(sum(self.line_counts), dtype=np.uint64, buffer=self.shm.buf)
+            shared_hashes[:] = np.concatenate(all_hashes)
+            del shared_hashes
+        for data, start in zip(encoded_docs, self.offsets):
+            self.shm.buf[start:start + len(data)] = data
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        """释放共享内存"""
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+# 工作进程内的状态，由_init_pair_worker初始化
+_worker_state = {}
+
+def _init_pair_worker(shm_name, offsets, line_counts):
+    """工作进程初始化：连接共享内存并创建分析器"""
+    from similarity_analyzer import SimilarityAnalyzer
+    _worker_state['shm'] = shared_memory.SharedMemory(name=shm_name)
+    _worker_state['offsets'] = offsets
+    _worker_state['line_counts'] = line_counts
+    _worker_state['docs'] = {}
+    _worker_state['analyzer'] = SimilarityAnalyzer(use_cache=False)
+    # 行哈希直接映射共享内存，不复制
+    _worker_state['hashes'] = np.ndarray(sum(line_counts), dtype=np.uint64, buffer=_worker_state['shm'].buf)
+    _worker_state['hash_starts'] = np.concatenate(([0], np.cumsum(line_counts))).tolist()
+
+def _get_worker_lines(index):
+    """从共享内存中解码指定文档的文本行，同一进程内只解码一次"""
+    docs = _worker_state['docs']
+    if index not in docs:
+        if _worker_state['line_counts'][index] == 0:
+            docs[index] = []
+        else:
+            start = _worker_state['offsets'][index]
+            end = _worker_state['offsets'][index + 1]
+            docs[index] = bytes(_worker_state['shm'].buf[start:end]).decode('utf-8').split("\n")
+    return docs[index]
+
+def _get_worker_hashes(index):
+    """获取指定文档的行哈希数组（共享内存视图）"""
+    starts = _worker_state['hash_starts']
+    return _worker_state['hashes'][starts[index]:starts[index + 1]]
+
+def _score_pair_task(pair):
+    """在工作进程中计算一个文件对的相似度"""
+    i, j = pair
+    return _worker_state['analyzer'].score_pair(_get_worker_lines(i), _get_worker_lines(j),
+                                                _get_worker_hashes(i), _get_worker_hashes(j))
+
+def _extract_document_task(file_path):
+    """在工作进程中提取并清理一个文档"""
+    from similarity_analyzer import SimilarityAnalyzer
+    return SimilarityAnalyzer(use_cache=False).build_document_entry(file_path)
+
+def default_worker_count(task_count):
+    """根据CPU核数和任务数确定工作进程数"""
+    return max(1, min(os.cpu_count() or 1, task_count))
+
+def extract_documents_parallel(file_paths, max_workers=None):
+    """并行提取多个文档，结果顺序与输入顺序一致"""
+    if not file_paths:
+        return []
+    workers = max_workers or default_worker_count(len(file_paths))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_extract_document_task, file_paths))
+
+def iter_pair_scores_parallel(all_lines, all_hashes, pairs, max_workers=None):
+    """并行计算文件对相似度并按pairs顺序逐个产出结果，文本行和行哈希通过共享内存传递"""
+    if not pairs:
+        return
+    workers = max_workers or default_worker_count(len(pairs))
+    corpus = SharedCorpus(all_lines, all_hashes)
+    try:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_pair_worker,
+                                 initargs=(corpus.name, corpus.offsets, corpus.line_counts)) as executor:
+            # 分块提交以降低进程间通信开销
+            chunksize = max(1, len(pairs) // (workers * 4))
+            yield from executor.map(_score_pair_task, pairs, chunksize=chunksize)
+    finally:
+        corpus.close()
+
+def score_pairs_parallel(all_lines, all_hashes, pairs, max_workers=None):
+    """并行计算文件对相似度，结果顺序与pairs一致"""
+    return list(iter_pair_scores_parallel(all_lines, all_hashes, pairs, max_workers))
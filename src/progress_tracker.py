@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import deque
+
+# 导出各阶段的名称，按流水线先后顺序排列
+STAGE_LABELS = {
+    'collect': "正在收集文件",
+    'read': "正在读取文件",
+    'build': "正在生成文档",
+    'save': "正在保存文档",
+}
+
+class ProgressTracker:
+    """汇总各阶段进度，按固定间隔限流，并用滑动窗口计算吞吐量和剩余时间
+
+    工作线程每处理一个文件调用一次update()，只有距上次输出超过min_interval、进入新阶段或
+    阶段完成（current达到total）时才返回进度快照，其余调用返回None，界面只需处理返回的快照，
+    每个阶段的最终进度都会输出。流水线模式下多个阶段同时进行，
+    快照显示已开始的最下游阶段，并附带所有阶段的完成数。
+    吞吐量按最近window_seconds秒内的样本计算，剩余时间随速度变化平滑更新。
+    """
+
+    def __init__(self, min_interval=0.2, window_seconds=5.0):
+        self.min_interval = min_interval
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._start = time.monotonic()
+        self._last_emit = None
+
+    def update(self, stage, current, total=None, detail="", lines=None, force=False):
+        """记录阶段进度，需要刷新界面时返回进度快照，否则返回None"""
+        now = time.monotonic()
+        with self._lock:
+            record = self._stages.get(stage)
+            new_stage = record is None
+            if new_stage:
+                record = self._stages[stage] = {'start': now, 'samples': deque()}
+            # 阶段首次完成时总是输出，避免进度停在最后一次限流前的位置
+            finished = bool(total) and current >= total and not (record.get('total') and
+                                                                  record['current'] >= record['total'])
+            record.update(current=current, total=total, detail=detail, lines=lines)
+            samples = record['samples']
+            samples.append((now, current, lines or 0))
+            # 只保留滑动窗口内的样本，至少保留一个作为起点
+            while len(samples) > 2 and now - samples[0][0] > self.window_seconds:
+                samples.popleft()
+
+            if not (force or new_stage or finished or self._last_emit is None or now - self._last_emit >= self.min_interval):
+                return None
+            self._last_emit = now
+            return self._snapshot(now)
+
+    def _snapshot(self, now):
+        order = list(STAGE_LABELS)
+        stage = max(self._stages, key=lambda name: order.index(name) if name in order else len(order))
+        record = self._stages[stage]
+        samples = record['samples']
+        elapsed = now - samples[0][0]
+        files_per_second = lines_per_second = None
+        if len(samples) > 1 and elapsed > 0:
+            files_per_second = (samples[-1][1] - samples[0][1]) / elapsed
+            lines_per_second = (samples[-1][2] - samples[0][2]) / elapsed
+
+        eta_seconds = None
+        total = record['total']
+        if total and files_per_second:
+            eta_seconds = max(0.0, (total - record['current']) / files_per_second)
+        return {
+            'stage': stage,
+            'label': STAGE_LABELS.get(stage, stage),
+            'current': record['current'],
+            'total': total,
+            'detail': record['detail'],
+            'lines': record['lines'],
+            'files_per_second': files_per_second,
+            'lines_per_second': lines_per_second if record['lines'] is not None else None,
+            'eta_seconds': eta_seconds,
+            'stage_seconds': now - record['start'],
+            'elapsed_seconds': now - self._start,
+            # 流水线模式下各阶段同时进行，附带所有阶段的完成数
+            'stages': {name: (item['current'], item['total']) for name, item in self._stages.items()},
+        }
+
+def format_duration(seconds):
+    """将秒数格式化为“1分05秒”形式"""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}秒"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}分{seconds:02d}秒"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}小时{minutes:02d}分"
+
+def format_rates(snapshot):
+    """将快照中的吞吐量和剩余时间格式化为一行文本"""
+    parts = []
+    if snapshot['files_per_second'] is not None:
+        parts.append(f"{snapshot['files_per_second']:.1f} 文件/秒")
+    if snapshot['lines_per_second'] is not None:
+        parts.append(f"{snapshot['lines_per_second']:.0f} 行/秒")
+    if snapshot['eta_seconds'] is not None:
+        parts.append(f"剩余约 {format_duration(snapshot['eta_seconds'])}")
+    else:
+        parts.append(f"已用时 {format_duration(snapshot['stage_seconds'])}")
+    return " · ".join(parts)
@@ -0,0 +1,116 @@
+import csv
+import json
+import os
+
+# 支持的输出格式，按文件扩展名识别
+REPORT_FORMATS = {'.txt': 'text', '.csv': 'csv', '.jsonl': 'jsonl'}
+
+# CSV输出的列
+CSV_FIELDS = [
+    'file1', 'file2', 'sequence_similarity', 'identical_lines', 'total_lines1', 'total_lines2',
+    'max_total_lines', 'difflib_similarity', 'weighted_similarity', 'comment_similarity', 'copied_block_count',
+    'longest_copied_block', 'matching_fragment_count'
+]
+
+def format_pair_text(result):
+    """将一个文件对的比较结果格式化为报告文本行"""
+    lines = [f"{result['file1']} 与 {result['file2']} 的序列相似度: {result['sequence_similarity']:.2f}%",
+             f"  - 完全相同的代码行: {result['identical_lines']} 行",
+             f"  - 文件1总行数: {result['total_lines1']} 行",
+             f"  - 文件2总行数: {result['total_lines2']} 行",
+             f"  - 较大文件总行数: {result['max_total_lines']} 行"]
+    if 'weighted_similarity' in result:
+        lines.append(f"  - IDF加权相似度 (已排除样板行): {result['weighted_similarity']:.2f}%")
+    if result.get('comment_similarity') is not None:
+        lines.append(f"  - 中文注释相似度: {result['comment_similarity']:.2f}%")
+
+    # 如果有相同行，显示部分示例
+    if result['identical_lines'] > 0:
+        lines.append("  - 相同行示例 (最多显示10行):")
+        for idx, (line1_idx, line2_idx, line_content) in enumerate(result['identical_lines_details'][:10]):
+            if len(line_content) > 50:
+                line_content = line_content[:50] + "..."
+            lines.append(f"    {idx+1}. 行 {line1_idx+1}↔{line2_idx+1}: {line_content}")
+
+        if result['identical_lines'] > 10:
+            lines.append(f"    ... 还有 {result['identical_lines'] - 10} 行相同 ...")
+
+    # 显示连续相同的代码块
+    if result.get('copied_blocks'):
+        lines.append("  - 连续相同代码块 (按长度排序，最多显示5个):")
+        for idx, (start1, start2, length) in enumerate(result['copied_blocks'][:5]):
+            lines.append(f"    {idx+1}. 文件1 行 {start1+1}-{start1+length} ↔ "
+                         f"文件2 行 {start2+1}-{start2+length} (共 {length} 行)")
+
+    # 显示疑似复制片段（可识别重新缩进、合并或拆分的代码）
+    if result.get('matching_fragments'):
+        lines.append(f"  - 疑似复制片段: {result['matching_fragment_count']} 处 (最多显示5处):")
+        for idx, fragment in enumerate(result['matching_fragments'][:5]):
+            lines.append(f"    {idx+1}. 文件1 行 {fragment['start1']+1}-{fragment['end1']+1} ↔ "
+                         f"文件2 行 {fragment['start2']+1}-{fragment['end2']+1}")
+    return lines
+
+class ReportWriter:
+    """逐个文件对流式写出比较结果，支持文本、CSV和JSON Lines格式
+
+    每个结果写出后即可丢弃，内存占用与文件对数量无关。
+    """
+
+    def __init__(self, path, output_format=None):
+        self.path = path
+        self.format = output_format or REPORT_FORMATS.get(os.path.splitext(path)[1].lower(), 'text')
+        if self.format not in REPORT_FORMATS.values():
+            raise ValueError(f"不支持的报告格式: {self.format}")
+        self.count = 0
+        # CSV使用带BOM的UTF-8，便于Excel直接打开中文内容
+        encoding = 'utf-8-sig' if self.format == 'csv' else 'utf-8'
+        self.file = open(path, 'w', encoding=encoding, newline='' if self.format == 'csv' else None)
+        self.csv_writer = None
+        if self.format == 'csv':
+            self.csv_writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDS, extrasaction='ignore')
+            self.csv_writer.writeheader()
+
+    def write_header(self, title):
+        """写出报告标题，仅文本格式有效"""
+        if self.format == 'text':
+            self.file.write(f"{title}\n\n")
+
+    def write_result(self, result):
+        """写出一个文件对的比较结果"""
+        if self.format == 'text':
+            self.file.write("\n".join(format_pair_text(result)) + "\n\n")
+        elif self.format == 'csv':
+            blocks = result.get('copied_blocks') or []
+            row = dict(result)
+            row['copied_block_count'] = len(blocks)
+            row['longest_copied_block'] = max((length for _, _, length in blocks), default=0)
+            for field in ('sequence_similarity', 'difflib_similarity', 'weighted_similarity', 'comment_similarity'):
+                if row.get(field) is not None:
+                    row[field] = f"{row[field]:.2f}"
+            self.csv_writer.writerow(row)
+        else:
+            self.file.write(json.dumps(result, ensure_ascii=False, default=self._json_default) + "\n")
+        self.count += 1
+
+    def write_footer(self, lines):
+        """写出报告末尾的汇总信息，仅文本格式有效"""
+        if self.format == 'text' and lines:
+            self.file.write("\n".join(lines) + "\n")
+
+    @staticmethod
+    def _json_default(value):
+        """将NumPy标量等转换为JSON可序列化的值"""
+        if hasattr(value, 'item'):
+            return value.item()
+        raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,277 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from analysis_cache import user_cache_dir
+
+# 文件对结果中单独建列、可直接筛选排序的字段
+PAIR_COLUMNS = (
+    'identical_lines', 'sequence_similarity', 'difflib_similarity', 'weighted_similarity',
+    'total_lines1', 'total_lines2', 'max_total_lines', 'matching_fragment_count'
+)
+
+# 允许排序的字段
+SORTABLE_COLUMNS = frozenset(PAIR_COLUMNS)
+
+def _json_default(value):
+    """将NumPy标量等转换为JSON可序列化的值"""
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+def normalize_pair(hash1, hash2):
+    """返回(较小哈希, 较大哈希)及是否交换了顺序，同一文件对无论输入顺序都保存为同一行"""
+    return ((hash2, hash1), True) if hash2 < hash1 else ((hash1, hash2), False)
+
+def swap_result(result):
+    """交换文件对结果中文档1和文档2的行号和行数"""
+    swapped = dict(result)
+    swapped['total_lines1'], swapped['total_lines2'] = result.get('total_lines2'), result.get('total_lines1')
+    if 'identical_lines_details' in result:
+        swapped['identical_lines_details'] = [(j, i, text) for i, j, text in result['identical_lines_details']]
+    if 'copied_blocks' in result:
+        swapped['copied_blocks'] = [(s2, s1, length) for s1, s2, length in result['copied_blocks']]
+    if 'matching_fragments' in result:
+        swapped['matching_fragments'] = [
+            dict(fragment, start1=fragment['start2'], end1=fragment['end2'],
+                 start2=fragment['start1'], end2=fragment['end1'])
+            for fragment in result['matching_fragments']]
+    return swapped
+
+class ResultsStore:
+    """基于SQLite的相似度分析结果库
+
+    文件对结果按(参数键, 较小内容哈希, 较大内容哈希)保存，行号按该顺序存储，读取时换回调用方的顺序，
+    文档内容和分析参数不变时，无论输入顺序如何，重复分析都直接复用已保存的结果。
+    每次分析另外记录一条运行记录（参与的文档、文件对和耗时），
+    可以在不重新计算的情况下按条件筛选和排序历史结果。
+    文件对最多保留max_pairs个、运行记录最多保留max_runs条，超出时淘汰最久未使用的文件对和最早的运行记录。
+    """
+
+    # 数据库结构版本
+    SCHEMA_VERSION = 2
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+        "CREATE TABLE IF NOT EXISTS pairs ("
+        " pair_id INTEGER PRIMARY KEY, params_key TEXT NOT NULL, hash1 TEXT NOT NULL, hash2 TEXT NOT NULL,"
+        " identical_lines INTEGER, sequence_similarity REAL, difflib_similarity REAL, weighted_similarity REAL,"
+        " total_lines1 INTEGER, total_lines2 INTEGER, max_total_lines INTEGER, matching_fragment_count INTEGER,"
+        " result_json TEXT NOT NULL, created_at REAL NOT NULL, last_used_at REAL NOT NULL,"
+        " UNIQUE (params_key, hash1, hash2))",
+        "CREATE INDEX IF NOT EXISTS idx_pairs_hash1 ON pairs (hash1)",
+        "CREATE INDEX IF NOT EXISTS idx_pairs_last_used ON pairs (last_used_at)",
+        "CREATE INDEX IF NOT EXISTS idx_pairs_hash2 ON pairs (hash2)",
+        "CREATE TABLE IF NOT EXISTS blocks ("
+        " pair_id INTEGER NOT NULL, start1 INTEGER NOT NULL, start2 INTEGER NOT NULL, length INTEGER NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS idx_blocks_pair ON blocks (pair_id)",
+        "CREATE TABLE IF NOT EXISTS runs ("
+        " run_id INTEGER PRIMARY KEY, mode TEXT, params_key TEXT, created_at REAL NOT NULL, seconds REAL,"
+        " doc_count INTEGER, pair_count INTEGER, reused_pairs INTEGER, stats_json TEXT)",
+        "CREATE TABLE IF NOT EXISTS run_documents ("
+        " run_id INTEGER NOT NULL, position INTEGER NOT NULL, content_hash TEXT, name TEXT, path TEXT,"
+        " PRIMARY KEY (run_id, position))",
+        "CREATE INDEX IF NOT EXISTS idx_run_documents_hash ON run_documents (content_hash)",
+        "CREATE TABLE IF NOT EXISTS run_pairs ("
+        " run_id INTEGER NOT NULL, pair_id INTEGER NOT NULL, file1 TEXT, file2 TEXT,"
+        " swapped INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (run_id, pair_id))",
+        "CREATE INDEX IF NOT EXISTS idx_run_pairs_pair ON run_pairs (pair_id)",
+    )
+
+    def __init__(self, path=None, max_pairs=200000, max_runs=200):
+        self.path = path or user_cache_dir("results.sqlite3")
+        self.max_pairs = max_pairs
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+    def _init_schema(self):
+        """创建数据表，结构版本不符时清空结果"""
+        with self._lock, self.conn:
+            self.conn.execute(self._SCHEMA[0])
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if row is not None and row[0] != str(self.SCHEMA_VERSION):
+                for table in ('pairs', 'blocks', 'runs', 'run_documents', 'run_pairs'):
+                    self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+            for statement in self._SCHEMA[1:]:
+                self.conn.execute(statement)
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                              (str(self.SCHEMA_VERSION),))
+
+    def close(self):
+        """关闭数据库连接"""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def load_pairs(self, params_key, hash_pairs):
+        """读取已保存的文件对结果，返回{(哈希1, 哈希2): (pair_id, 结果)}，结果中的行号按调用方的顺序"""
+        wanted = {}
+        for pair in hash_pairs:
+            wanted.setdefault(normalize_pair(*pair)[0], []).append(pair)
+        if not wanted:
+            return {}
+        hashes = sorted({h for pair in wanted for h in pair})
+        found = {}
+        with self._lock, self.conn:
+            # 分批查询，避免超过SQLite的参数个数上限
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT pair_id, hash1, hash2, result_json FROM pairs"
+                    f" WHERE params_key = ? AND hash1 IN ({placeholders})", [params_key] + batch)
+                for pair_id, hash1, hash2, result_json in rows:
+                    for pair in wanted.get((hash1, hash2), ()):
+                        result = json.loads(result_json)
+                        found[pair] = (pair_id, swap_result(result) if pair != (hash1, hash2) else result)
+            # 记录使用时间，淘汰时保留最近用到的文件对
+            self.conn.executemany("UPDATE pairs SET last_used_at = ? WHERE pair_id = ?",
+                                  ((time.time(), pair_id) for pair_id in {pair_id for pair_id, _ in found.values()}))
+        return found
+
+    def save_pairs(self, params_key, items):
+        """保存一批文件对结果[((哈希1, 哈希2), 结果)]，返回{(哈希1, 哈希2): pair_id}"""
+        pair_ids = {}
+        now = time.time()
+        with self._lock, self.conn:
+            for key, result in items:
+                (hash1, hash2), swapped = normalize_pair(*key)
+                if swapped:
+                    result = swap_result(result)
+                stored = {k: v for k, v in result.items() if k not in ('file1', 'file2')}
+                values = [result.get(column) for column in PAIR_COLUMNS]
+                # 使用upsert保持pair_id不变，历史运行记录仍指向同一文件对
+                self.conn.execute(
+                    f"INSERT INTO pairs (params_key, hash1, hash2, {', '.join(PAIR_COLUMNS)},"
+                    f" result_json, created_at, last_used_at)"
+                    f" VALUES (?, ?, ?, {', '.join('?' * len(PAIR_COLUMNS))}, ?, ?, ?)"
+                    f" ON CONFLICT (params_key, hash1, hash2) DO UPDATE SET"
+                    f" {', '.join(f'{c} = excluded.{c}' for c in PAIR_COLUMNS)},"
+                    f" result_json = excluded.result_json, created_at = excluded.created_at,"
+                    f" last_used_at = excluded.last_used_at",
+                    [params_key, hash1, hash2] + values
+                    + [json.dumps(stored, ensure_ascii=False, default=_json_default), now, now])
+                pair_id = self.conn.execute(
+                    "SELECT pair_id FROM pairs WHERE params_key = ? AND hash1 = ? AND hash2 = ?",
+                    (params_key, hash1, hash2)).fetchone()[0]
+                self.conn.execute("DELETE FROM blocks WHERE pair_id = ?", (pair_id,))
+                self.conn.executemany("INSERT INTO blocks (pair_id, start1, start2, length) VALUES (?, ?, ?, ?)",
+                                      ((pair_id, s1, s2, length)
+                                       for s1, s2, length in result.get('copied_blocks') or ()))
+                pair_ids[key] = pair_id
+            self._evict_pairs()
+        return pair_ids
+
+    def _evict_pairs(self):
+        """文件对超过max_pairs时删除最久未使用的文件对及其代码块和运行记录中的引用，需持有锁"""
+        excess = self.conn.execute("SELECT COUNT(*) FROM pairs").fetchone()[0] - self.max_pairs
+        if excess <= 0:
+            return
+        # 一次多淘汰10%，避免每批写入都触发淘汰
+        excess += self.max_pairs // 10
+        stale = "SELECT pair_id FROM pairs ORDER BY last_used_at, pair_id LIMIT ?"
+        self.conn.execute(f"DELETE FROM blocks WHERE pair_id IN ({stale})", (excess,))
+        self.conn.execute(f"DELETE FROM run_pairs WHERE pair_id IN ({stale})", (excess,))
+        self.conn.execute(f"DELETE FROM pairs WHERE pair_id IN ({stale})", (excess,))
+
+    def _evict_runs(self):
+        """只保留最近max_runs条运行记录，需持有锁"""
+        row = self.conn.execute("SELECT run_id FROM runs ORDER BY run_id DESC LIMIT 1 OFFSET ?",
+                                (self.max_runs,)).fetchone()
+        if row is None:
+            return
+        for table in ('run_pairs', 'run_documents', 'runs'):
+            self.conn.execute(f"DELETE FROM {table} WHERE run_id <= ?", (row[0],))
+
+    def record_run(self, mode, params_key, documents, run_pairs, seconds, reused_pairs, stats=None):
+        """记录一次分析运行
+
+        documents为[(内容哈希, 名称, 路径)]；run_pairs为[(pair_id, 文件1, 文件2, 文件1的内容哈希)]，
+        用于记住文件1对应保存的哪一侧。
+        """
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (mode, params_key, created_at, seconds, doc_count, pair_count, reused_pairs,"
+                " stats_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (mode, params_key, time.time(), seconds, len(documents), len(run_pairs), reused_pairs,
+                 json.dumps(stats or {}, ensure_ascii=False, default=str)))
+            run_id = cursor.lastrowid
+            self.conn.executemany(
+                "INSERT INTO run_documents (run_id, position, content_hash, name, path) VALUES (?, ?, ?, ?, ?)",
+                ((run_id, position, content_hash, name, path)
+                 for position, (content_hash, name, path) in enumerate(documents)))
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO run_pairs (run_id, pair_id, file1, file2, swapped)"
+                " SELECT ?, pair_id, ?, ?, hash1 != ? FROM pairs WHERE pair_id = ?",
+                ((run_id, file1, file2, hash1, pair_id) for pair_id, file1, file2, hash1 in run_pairs))
+            self._evict_runs()
+        return run_id
+
+    def list_runs(self, limit=20):
+        """列出最近的分析运行"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT run_id, mode, created_at, seconds, doc_count, pair_count, reused_pairs"
+                " FROM runs ORDER BY run_id DESC LIMIT ?", (limit,)).fetchall()
+        return [{'run_id': row[0], 'mode': row[1], 'created_at': row[2], 'seconds': row[3],
+                 'doc_count': row[4], 'pair_count': row[5], 'reused_pairs': row[6]} for row in rows]
+
+    def query_pairs(self, run_id=None, content_hash=None, min_similarity=None, order_by='sequence_similarity',
+                    descending=True, limit=100):
+        """按条件筛选和排序已保存的文件对结果，无需重新计算
+
+        run_id为None时查询最近一次运行；content_hash指定时只返回包含该文档的文件对。
+        """
+        if order_by not in SORTABLE_COLUMNS:
+            raise ValueError(f"不支持的排序字段: {order_by}")
+        with self._lock:
+            if run_id is None:
+                row = self.conn.execute("SELECT MAX(run_id) FROM runs").fetchone()
+                run_id = row[0]
+                if run_id is None:
+                    return []
+            conditions = ["r.run_id = ?"]
+            params = [run_id]
+            if content_hash is not None:
+                conditions.append("(p.hash1 = ? OR p.hash2 = ?)")
+                params += [content_hash, content_hash]
+            if min_similarity is not None:
+                conditions.append("p.sequence_similarity >= ?")
+                params.append(min_similarity)
+            params.append(limit)
+            rows = self.conn.execute(
+                f"SELECT p.pair_id, r.swapped, r.file1, r.file2, p.hash1, p.hash2,"
+                f" {', '.join('p.' + c for c in PAIR_COLUMNS)}"
+                f" FROM run_pairs r JOIN pairs p ON p.pair_id = r.pair_id"
+                f" WHERE {' AND '.join(conditions)}"
+                f" ORDER BY p.{order_by} {'DESC' if descending else 'ASC'}, p.pair_id LIMIT ?", params).fetchall()
+        results = []
+        for row in rows:
+            swapped = bool(row[1])
+            result = {'pair_id': row[0], 'swapped': swapped, 'file1': row[2], 'file2': row[3]}
+            result['hash1'], result['hash2'] = (row[5], row[4]) if swapped else (row[4], row[5])
+            result.update(zip(PAIR_COLUMNS, row[6:]))
+            if swapped:
+                result['total_lines1'], result['total_lines2'] = result['total_lines2'], result['total_lines1']
+            results.append(result)
+        return results
+
+    def get_blocks(self, pair_id, swapped=False):
+        """返回文件对的连续相同行块[(起始行1, 起始行2, 行数)]，swapped为True时按相反的文件顺序"""
+        with self._lock:
+            rows = self.conn.execute("SELECT start1, start2, length FROM blocks WHERE pair_id = ?"
+                                     " ORDER BY length DESC", (pair_id,)).fetchall()
+        return [(s2, s1, length) for s1, s2, length in rows] if swapped else rows
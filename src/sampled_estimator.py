@@ -0,0 +1,71 @@
+import math
+import numpy as np
+
+class SampledSimilarityEstimator:
+    """基于一致性哈希抽样的相同行数快速估计
+
+    只保留行哈希落在[0, sample_rate × 2^64)区间内的行。由于抽样只取决于行内容，
+    两个文档总是抽中相同的行，抽样中的相同行数除以抽样率即为全量相同行数的无偏估计。
+    每种行被抽中与否相互独立（由哈希决定），据此给出正态近似的置信区间。
+    """
+
+    def __init__(self, sample_rate=0.05, z=1.96, ignore_hash=None):
+        if not 0 < sample_rate <= 1:
+            raise ValueError("抽样率必须在(0, 1]之间")
+        self.sample_rate = sample_rate
+        # 置信区间的分位数，1.96对应95%置信度
+        self.z = z
+        # 不参与抽样的行哈希（如空行）
+        self.ignore_hash = ignore_hash
+        self.threshold = np.uint64(min(int(sample_rate * 2 ** 64), 2 ** 64 - 1))
+
+    def sample(self, hashes):
+        """对文档的行哈希抽样，返回(抽中的行哈希, 各自出现次数)"""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if self.sample_rate < 1:
+            hashes = hashes[hashes < self.threshold]
+        if self.ignore_hash is not None:
+            hashes = hashes[hashes != self.ignore_hash]
+        return np.unique(hashes, return_counts=True)
+
+    def estimate(self, profile1, profile2, total_lines1, total_lines2):
+        """估计两个文档的相同行数和序列相似度，返回估计值及置信区间
+
+        相同行按多重集计数：每种行贡献两边出现次数的较小值m。
+        估计量为 Σm / p，方差为 (1 - p) / p^2 × Σm^2（由抽样数据估计）。
+        抽样中没有相同行时，上界取泊松分布的“三法则” 3 / p。
+        """
+        p = self.sample_rate
+        unique1, counts1 = profile1
+        unique2, counts2 = profile2
+        _, idx1, idx2 = np.intersect1d(unique1, unique2, assume_unique=True, return_indices=True)
+        shared = np.minimum(counts1[idx1], counts2[idx2])
+        sampled = int(shared.sum())
+
+        estimate = sampled / p
+        std = math.sqrt((1 - p) / p ** 2 * float((shared.astype(np.float64) ** 2).sum()))
+        low = max(sampled, estimate - self.z * std)
+        high = estimate + self.z * std
+        if sampled == 0 and p < 1:
+            high = max(high, 3 / p)
+        max_lines = max(total_lines1, total_lines2)
+        # 相同行数不可能超过较短文档的行数
+        upper_bound = min(total_lines1, total_lines2)
+        estimate, low, high = (min(value, upper_bound) for value in (estimate, low, high))
+
+        def percent(value):
+            return value / max_lines * 100 if max_lines else 0
+
+        return {
+            'identical_lines_estimate': estimate,
+            'identical_lines_low': low,
+            'identical_lines_high': high,
+            'sampled_identical_lines': sampled,
+            'total_lines1': total_lines1,
+            'total_lines2': total_lines2,
+            'max_total_lines': max_lines,
+            'sequence_similarity': percent(estimate),
+            'similarity_low': percent(low),
+            'similarity_high': percent(high),
+            'sample_rate': p
+        }
@@ -1,19 +1,62 @@
 import os
 import re
-import jieba
 import hashlib
+import json
 import numpy as np
 import difflib
+import heapq
+import time
 from docx import Document
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from simhash import Simhash
 from collections import Counter
+from analysis_cache import AnalysisCache, user_cache_dir
+from winnowing import WinnowingEngine
+from code_tokenizer import CodeTokenizer, TOKENIZER_VERSION
+from block_matcher import CopiedBlockFinder, BLOCK_MATCHER_VERSION
+from line_frequency import LineFrequencyIndex
+from corpus_index import CorpusIndex
+from report_writer import ReportWriter, format_pair_text
+from sampled_estimator import SampledSimilarityEstimator
+from results_store import ResultsStore
+from chinese_segmenter import ChineseSegmenter, SEGMENTER_VERSION
+
+# 代码行分词：标识符、数字和单个符号
+CODE_TOKEN_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_]*|\d+|[^\sA-Za-z0-9_]')
+CHINESE_CHAR_PATTERN = re.compile(r'[\u4e00-\u9fff]')
+
+# 空行的哈希值，空行不参与相同行匹配
+EMPTY_LINE_HASH = np.uint64(int.from_bytes(hashlib.blake2b(b'', digest_size=8).digest(), 'little'))
 
 class SimilarityAnalyzer:
-    def __init__(self):
+    def __init__(self, cache=None, use_cache=True, use_store=True):
         """初始化相似度分析器"""
         self.vectorizer = None
+        # 提取结果的磁盘缓存，同一文档重复分析时无需重新提取
+        self.cache = cache if cache is not None else (AnalysisCache() if use_cache else None)
+        # 最近一次分析的运行统计（缓存命中等）
+        self.last_run_stats = {}
+        # 复制片段检测使用的winnowing指纹引擎
+        self.winnowing = WinnowingEngine()
+        # 结构相似度模式使用的代码规范化分词器
+        self.tokenizer = CodeTokenizer()
+        # 连续相同行块查找器
+        self.block_finder = CopiedBlockFinder(ignore_hash=EMPTY_LINE_HASH)
+        # 各分析模式的行文档频率表，用于过滤样板代码行，首次使用时加载
+        self.line_frequency = {}
+        # 参考语料索引，按比较模式分别存储
+        self.corpus_indexes = {}
+        # 分析结果库，首次使用时打开，需要同时启用磁盘缓存
+        self.use_store = use_store
+        self.results_store = None
+        # 中文分词器，词典缓存文件与分析缓存放在同一目录下，未启用缓存时使用结巴默认的临时目录
+        self.segmenter = ChineseSegmenter(self.cache_path("jieba") if self.cache is not None else None)
+    
+    def cache_path(self, name):
+        """返回与分析缓存同目录的文件路径，默认位于用户缓存目录"""
+        base_dir = os.path.dirname(self.cache.cache_dir) if self.cache is not None else user_cache_dir()
+        return os.path.join(base_dir, name)
     
     def extract_text_from_docx(self, file_path):
         """从Word文档中提取文本内容，按行分割"""
@@ -56,10 +99,8 @@ class SimilarityAnalyzer:
         return [self.clean_text(line) for line in lines if line.strip()]
     
     def segment_chinese_text(self, text):
-        """使用结巴分词对中文文本进行分词"""
-        # 分词
-        words = jieba.cut(text)
-        return " ".join(words)
+        """使用结巴分词对中文文本进行分词，重复文本直接使用记忆化结果"""
+        return " ".join(self.segmenter.segment_text(text))
     
     def calculate_md5(self, text):
         """计算文本的MD5哈希值，用于精确比较"""
@@ -69,109 +110,936 @@ class SimilarityAnalyzer:
         """计算文本的SimHash值，用于近似比较"""
         return Simhash(text.split()).value
     
-    def find_identical_lines(self, lines1, lines2):
-        """使用精确匹配找出两个文档中完全相同的行"""
-        # 创建行内容到行号的映射
-        lines1_dict = {}
-        for i, line in enumerate(lines1):
-            if line.strip():
-                lines1_dict[line] = i
+    def calculate_line_hash(self, text):
+        """计算文本行的64位哈希值，用于快速精确比较"""
+        return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+    
+    def build_document_entry(self, file_path):
+        """提取并清理文档，生成包含文本行、行哈希和指纹的条目"""
+        lines = self.extract_text_from_docx(file_path)
+        cleaned_lines = self.clean_lines(lines)
+        return {
+            'lines': cleaned_lines,
+            'line_hashes': [self.calculate_line_hash(line) for line in cleaned_lines],
+            'simhash': self.calculate_simhash(" ".join(cleaned_lines)) if cleaned_lines else 0
+        }
+    
+    def load_document(self, file_path, key=None):
+        """加载文档条目，优先从缓存读取，未命中时提取并写入缓存；key为已计算的内容哈希"""
+        if self.cache is None:
+            return self.build_document_entry(file_path)
+        
+        try:
+            key = key or self.cache.file_hash(file_path)
+        except OSError as e:
+            print(f"无法读取文件 {file_path}: {e}")
+            return self.build_document_entry(file_path)
+        
+        entry = self.cache.get(key)
+        if entry is None:
+            entry = self.build_document_entry(file_path)
+            self.cache.put(key, entry)
+        entry['content_hash'] = key
+        return entry
+    
+    def update_cache_entry(self, entry):
+        """将补充了新字段的文档条目写回缓存"""
+        if self.cache is not None and entry.get('content_hash'):
+            self.cache.put(entry['content_hash'], {k: v for k, v in entry.items() if k != 'content_hash'})
+    
+    def get_structural_lines(self, entry, file_path):
+        """获取规范化标识符、字面量和注释后的结构化文本行，与entry['lines']逐行对齐"""
+        if entry.get('tokenizer_version') != TOKENIZER_VERSION or 'structural_lines' not in entry:
+            # 规范化需要保留符号的原始文本，因此重新提取
+            raw_lines = self.extract_text_from_docx(file_path)
+            entry['structural_lines'] = self.tokenizer.normalize_lines(raw_lines)
+            entry['tokenizer_version'] = TOKENIZER_VERSION
+            
+            stats = self.last_run_stats.setdefault('tokenizer', {'lines': 0, 'seconds': 0.0})
+            stats['lines'] += self.tokenizer.last_stats['lines']
+            stats['seconds'] += self.tokenizer.last_stats['seconds']
+            
+            self.update_cache_entry(entry)
+        return entry['structural_lines']
+    
+    def get_document_lines(self, entry, file_path, mode='exact'):
+        """按分析模式获取用于比较的文本行"""
+        if mode == 'structural':
+            return self.get_structural_lines(entry, file_path)
+        return entry['lines']
+    
+    def get_fingerprints(self, entry, mode='exact'):
+        """获取文档的winnowing指纹，参数不变时复用缓存条目中已有的指纹"""
+        field = 'structural_fingerprints' if mode == 'structural' else 'fingerprints'
+        lines = entry['structural_lines'] if mode == 'structural' else entry['lines']
+        params = [self.winnowing.k, self.winnowing.window]
+        if entry.get(f'{field}_params') != params or field not in entry:
+            entry[field] = [list(fp) for fp in self.winnowing.fingerprint(lines)]
+            entry[f'{field}_params'] = params
+            # 回写缓存，下次分析时无需重新计算
+            self.update_cache_entry(entry)
+        return entry[field]
+    
+    def get_chinese_terms(self, entry):
+        """获取文档中文内容（主要是注释）的词频，分词规则不变时复用缓存条目中的结果"""
+        if entry.get('segmenter_version') != SEGMENTER_VERSION or 'chinese_terms' not in entry:
+            entry['chinese_terms'] = dict(self.segmenter.document_terms(entry['lines']))
+            entry['segmenter_version'] = SEGMENTER_VERSION
+            self.update_cache_entry(entry)
+        return Counter(entry['chinese_terms'])
+    
+    def load_chinese_terms(self, entries, parallel=False, max_workers=None):
+        """获取所有文档的中文词频，未缓存的文档先批量（可并行）分词"""
+        pending = [entry for entry in entries
+                   if entry.get('segmenter_version') != SEGMENTER_VERSION or 'chinese_terms' not in entry]
+        texts = [self.segmenter.chinese_text(line) for entry in pending for line in entry['lines']]
+        self.segmenter.prime([text for text in texts if text], parallel, max_workers)
+        return [self.get_chinese_terms(entry) for entry in entries]
+    
+    def get_line_frequency_index(self, mode='exact'):
+        """获取指定模式的行文档频率表，首次使用时从磁盘加载；未启用磁盘缓存时只统计本次分析的文档"""
+        if mode not in self.line_frequency:
+            path = self.cache_path(f"line_frequency_{mode}.npz") if self.cache is not None else None
+            self.line_frequency[mode] = LineFrequencyIndex.load(path)
+        return self.line_frequency[mode]
+    
+    def apply_boilerplate_filter(self, frequency, doc_keys, content_hashes, all_hashes):
+        """将文档计入频率表，并把停用行的哈希替换为空行哈希，使其不参与匹配
         
-        # 找出相同的行
-        identical_lines = []
-        for i, line in enumerate(lines2):
-            if line.strip() and line in lines1_dict:
-                identical_lines.append((lines1_dict[line], i, line))
+        文档按doc_keys（文档路径）计数，同一路径的新内容替换旧内容。
+        返回(过滤后的哈希数组列表, 停用行哈希数组)。
+        """
+        for doc_key, content_hash, hashes in zip(doc_keys, content_hashes, all_hashes):
+            frequency.add_document(doc_key, hashes, EMPTY_LINE_HASH, content_hash)
+        frequency.save()
         
-        return identical_lines
+        stop_hashes = frequency.stop_hashes()
+        if len(stop_hashes):
+            all_hashes = [np.where(np.isin(hashes, stop_hashes), EMPTY_LINE_HASH, hashes)
+                          for hashes in all_hashes]
+        return all_hashes, stop_hashes
     
-    def analyze_similarity(self, file_paths):
-        """分析多个文件之间的相似度，专注于序列相似度和相同行"""
+    def build_weight_profile(self, hashes, frequency):
+        """统计文档中每种行的出现次数及其IDF权重，空行不计"""
+        unique, counts = np.unique(hashes, return_counts=True)
+        keep = unique != EMPTY_LINE_HASH
+        unique, counts = unique[keep], counts[keep]
+        return unique, counts, frequency.idf_weights(unique)
+    
+    def weighted_similarity(self, profile1, profile2):
+        """IDF加权的相同行相似度：相同行的权重之和 / 较大文档的权重之和"""
+        unique1, counts1, weights1 = profile1
+        unique2, counts2, weights2 = profile2
+        _, pos1, pos2 = np.intersect1d(unique1, unique2, assume_unique=True, return_indices=True)
+        matched = float((np.minimum(counts1[pos1], counts2[pos2]) * weights1[pos1]).sum())
+        total = max(float((counts1 * weights1).sum()), float((counts2 * weights2).sum()))
+        return matched / total * 100 if total > 0 else 0
+    
+    def line_hash_array(self, lines):
+        """计算文本行的64位哈希数组"""
+        return np.fromiter((self.calculate_line_hash(line) for line in lines), dtype=np.uint64, count=len(lines))
+    
+    def match_identical_lines(self, hashes1, hashes2):
+        """基于哈希数组匹配两个文档中完全相同的行（按多重集计数）
+        
+        文档2中某行的第k次出现与文档1中同一行的第k次出现配对，
+        返回按文档2行号排序的对齐行号数组(idx1, idx2)。空行不参与匹配。
+        """
+        valid1 = np.flatnonzero(hashes1 != EMPTY_LINE_HASH)
+        valid2 = np.flatnonzero(hashes2 != EMPTY_LINE_HASH)
+        
+        # 稳定排序，使同一行的多次出现保持原始顺序
+        order1 = valid1[np.argsort(hashes1[valid1], kind='stable')]
+        order2 = valid2[np.argsort(hashes2[valid2], kind='stable')]
+        sorted1 = hashes1[order1]
+        sorted2 = hashes2[order2]
+        
+        # 每个元素在文档2中是该行的第几次出现
+        occurrence2 = np.arange(len(sorted2)) - np.searchsorted(sorted2, sorted2, 'left')
+        
+        # 在文档1中定位同一行的第occurrence2次出现
+        left1 = np.searchsorted(sorted1, sorted2, 'left')
+        right1 = np.searchsorted(sorted1, sorted2, 'right')
+        positions = left1 + occurrence2
+        matched = positions < right1
+        
+        idx1 = order1[positions[matched]]
+        idx2 = order2[matched]
+        order = np.argsort(idx2, kind='stable')
+        return idx1[order], idx2[order]
+    
+    def find_identical_lines(self, lines1, lines2, hashes1=None, hashes2=None, limit=None):
+        """使用精确匹配找出两个文档中完全相同的行，返回[(行号1, 行号2, 行内容)]"""
+        if hashes1 is None:
+            hashes1 = self.line_hash_array(lines1)
+        if hashes2 is None:
+            hashes2 = self.line_hash_array(lines2)
+        idx1, idx2 = self.match_identical_lines(hashes1, hashes2)
+        if limit is not None:
+            idx1, idx2 = idx1[:limit], idx2[:limit]
+        return [(int(i), int(j), lines2[j]) for i, j in zip(idx1, idx2)]
+    
+    def score_pair(self, lines1, lines2, hashes1=None, hashes2=None):
+        """计算两个文档的相同行和序列相似度"""
+        if hashes1 is None:
+            hashes1 = self.line_hash_array(lines1)
+        if hashes2 is None:
+            hashes2 = self.line_hash_array(lines2)
+        
+        # 找出完全相同的行，只为前100个生成详情
+        idx1, idx2 = self.match_identical_lines(hashes1, hashes2)
+        identical_count = len(idx1)
+        identical_details = [(int(i), int(j), lines2[j]) for i, j in zip(idx1[:100], idx2[:100])]
+        
+        # 计算序列相似度
+        total_lines = max(len(lines1), len(lines2))
+        seq_sim = (identical_count / total_lines * 100) if total_lines > 0 else 0
+        
+        # 查找连续相同的行块，按长度排序
+        copied_blocks = self.block_finder.find_blocks(hashes1, hashes2, limit=20) if identical_count else []
+        
+        # 使用difflib计算更精确的序列相似度
+        diff_ratio = difflib.SequenceMatcher(None, 
+                                            "\n".join(lines1), 
+                                            "\n".join(lines2)).ratio() * 100
+        
+        return {
+            'identical_lines': identical_count,
+            'identical_lines_details': identical_details,  # 最多显示100个相同行
+            'total_lines1': len(lines1),
+            'total_lines2': len(lines2),
+            'max_total_lines': total_lines,
+            'sequence_similarity': seq_sim,
+            'difflib_similarity': diff_ratio,
+            'copied_blocks': copied_blocks  # [(起始行1, 起始行2, 行数)]，最多20个
+        }
+    
+    def load_documents(self, file_paths, parallel=False, max_workers=None, content_hashes=None):
+        """加载多个文档条目，并行模式下未命中缓存的文档在进程池中提取"""
+        content_hashes = content_hashes or [None] * len(file_paths)
+        if not parallel:
+            return [self.load_document(path, key) for path, key in zip(file_paths, content_hashes)]
+        
+        from parallel_analysis import extract_documents_parallel
+        
+        entries = [None] * len(file_paths)
+        keys = [None] * len(file_paths)
+        pending = []
+        for idx, path in enumerate(file_paths):
+            if self.cache is not None:
+                try:
+                    keys[idx] = content_hashes[idx] or self.cache.file_hash(path)
+                    entries[idx] = self.cache.get(keys[idx])
+                except OSError as e:
+                    print(f"无法读取文件 {path}: {e}")
+            if entries[idx] is None:
+                pending.append(idx)
+        
+        extracted = extract_documents_parallel([file_paths[idx] for idx in pending], max_workers)
+        for idx, entry in zip(pending, extracted):
+            if keys[idx] is not None:
+                self.cache.put(keys[idx], entry)
+            entries[idx] = entry
+        
+        for idx, entry in enumerate(entries):
+            if keys[idx] is not None:
+                entry['content_hash'] = keys[idx]
+        return entries
+    
+    def get_results_store(self):
+        """获取分析结果库，未启用磁盘缓存时不保存结果"""
+        if self.results_store is None and self.use_store and self.cache is not None:
+            self.results_store = ResultsStore(self.cache_path("results.sqlite3"))
+        return self.results_store
+    
+    def get_content_hashes(self, file_paths):
+        """计算所有文件的内容哈希，任一文件无法读取时返回None"""
+        try:
+            return [self.cache.file_hash(path) for path in file_paths]
+        except OSError as e:
+            print(f"无法读取文件: {e}")
+            return None
+    
+    def results_params_key(self, mode, boilerplate_key=None):
+        """生成影响文件对结果的全部参数的键，参数变化时不复用已保存的结果"""
+        params = {
+            'mode': mode,
+            'winnowing': [self.winnowing.k, self.winnowing.window, self.winnowing.max_occurrences],
+            'block_min_length': self.block_finder.min_length,
+            'block_matcher': BLOCK_MATCHER_VERSION,
+            'tokenizer': TOKENIZER_VERSION if mode == 'structural' else None,
+            'segmenter': SEGMENTER_VERSION,
+            'boilerplate': boilerplate_key
+        }
+        return json.dumps(params, sort_keys=True)
+    
+    def analyze_similarity(self, file_paths, parallel=False, max_workers=None, mode='exact',
+                           filter_boilerplate=False, top_k=None, result_callback=None):
+        """分析多个文件之间的相似度，专注于序列相似度和相同行
+        
+        parallel为True时，文档提取和文件对评分在进程池中执行，
+        结果按文件对顺序合并，与串行模式完全一致。
+        mode为'structural'时，先将标识符、字面量和注释规范化为占位符再比较，
+        可识别仅重命名了变量的复制代码。
+        filter_boilerplate为True时，语料中文档频率过高的样板行不参与匹配，
+        并额外给出IDF加权的相似度。
+        top_k不为None时只用大小为top_k的堆保留相同行数最多的文件对，
+        其余结果在result_callback（如报告写出器）处理后即丢弃。
+        启用结果库时，文档内容和参数都未变化的文件对直接复用已保存的结果；
+        所有文件对都已保存时无需加载文档。
+        """
         if len(file_paths) < 2:
             return [], []
         
+        start_time = time.perf_counter()
         # 提取文件名（不带路径和扩展名）
         file_names = [os.path.splitext(os.path.basename(path))[0] for path in file_paths]
         
-        # 从文件中提取文本行
-        all_lines = []
-        for path in file_paths:
-            # 提取原始文本行
-            lines = self.extract_text_from_docx(path)
-            # 清理文本行
-            cleaned_lines = self.clean_lines(lines)
-            all_lines.append(cleaned_lines)
+        # 按固定顺序生成所有文件对
+        pairs = [(i, j) for i in range(len(file_paths)) for j in range(i+1, len(file_paths))]
+        
+        if self.cache is not None:
+            self.cache.reset_stats()
+        self.last_run_stats = {}
+        
+        # 查询结果库中已保存的文件对
+        store = self.get_results_store()
+        doc_hashes = self.get_content_hashes(file_paths) if store is not None else None
+        if doc_hashes is None:
+            store = None
+        stored = {}
+        params_key = None
+        if store is not None and not filter_boilerplate:
+            params_key = self.results_params_key(mode)
+            stored = store.load_pairs(params_key, [(doc_hashes[i], doc_hashes[j]) for i, j in pairs])
         
-        # 格式化结果
+        pending = [(i, j) for i, j in pairs if store is None or (doc_hashes[i], doc_hashes[j]) not in stored]
+        if pending:
+            # 从文件中提取文本行（命中缓存时直接读取）
+            entries = self.load_documents(file_paths, parallel, max_workers, doc_hashes)
+            all_lines = [self.get_document_lines(entry, path, mode) for entry, path in zip(entries, file_paths)]
+            
+            tokenizer_stats = self.last_run_stats.get('tokenizer')
+            if tokenizer_stats and tokenizer_stats['seconds'] > 0:
+                tokenizer_stats['lines_per_second'] = tokenizer_stats['lines'] / tokenizer_stats['seconds']
+            
+            # 每个文档只计算一次行哈希数组，精确模式直接使用缓存中的行哈希
+            if mode == 'structural':
+                all_hashes = [self.line_hash_array(lines) for lines in all_lines]
+            else:
+                all_hashes = [np.array(entry['line_hashes'], dtype=np.uint64) for entry in entries]
+            
+            # 过滤样板行，并为IDF加权计分准备每个文档的行权重
+            weight_profiles = None
+            if filter_boilerplate:
+                frequency = self.get_line_frequency_index(mode)
+                content_hashes = [entry.get('content_hash') or self.calculate_md5("\n".join(lines))
+                                  for entry, lines in zip(entries, all_lines)]
+                doc_keys = [os.path.abspath(path) for path in file_paths]
+                all_hashes, stop_hashes = self.apply_boilerplate_filter(frequency, doc_keys, content_hashes,
+                                                                        all_hashes)
+                weight_profiles = [self.build_weight_profile(hashes, frequency) for hashes in all_hashes]
+                self.last_run_stats['boilerplate'] = {
+                    'stop_lines': len(stop_hashes),
+                    'corpus_documents': frequency.doc_count
+                }
+                # 停用行集合和IDF权重都取决于语料状态，语料变化后不复用结果
+                boilerplate_key = f"{hashlib.sha1(stop_hashes.tobytes()).hexdigest()}:{frequency.doc_count}"
+                params_key = self.results_params_key(mode, boilerplate_key)
+                if store is not None:
+                    stored = store.load_pairs(params_key, [(doc_hashes[i], doc_hashes[j]) for i, j in pairs])
+                    pending = [(i, j) for i, j in pairs if (doc_hashes[i], doc_hashes[j]) not in stored]
+            
+            if parallel:
+                from parallel_analysis import iter_pair_scores_parallel
+                pair_scores = iter_pair_scores_parallel(all_lines, all_hashes, pending, max_workers)
+            else:
+                pair_scores = (self.score_pair(all_lines[i], all_lines[j], all_hashes[i], all_hashes[j])
+                               for i, j in pending)
+            
+            # 基于winnowing指纹检测复制片段，每个文档只建立一次索引
+            fingerprints = [self.get_fingerprints(entry, mode) for entry in entries]
+            fingerprint_indexes = [self.winnowing.build_index(fp) for fp in fingerprints]
+            # 中文注释的分词词频，用于计算注释相似度
+            chinese_terms = self.load_chinese_terms(entries, parallel, max_workers)
+            self.last_run_stats['cache'] = self.cache.get_stats() if self.cache is not None else None
+        else:
+            pair_scores = iter(())
+        
+        # 格式化结果，逐个交给回调处理；top_k模式下用最小堆保留最相似的文件对
         results = []
+        run_pairs = []
+        new_pairs = []
+        for order, (i, j) in enumerate(pairs):
+            key = (doc_hashes[i], doc_hashes[j]) if store is not None else None
+            if key in stored:
+                pair_id, scores = stored[key]
+                result = {'file1': file_names[i], 'file2': file_names[j]}
+                result.update(scores)
+                run_pairs.append((pair_id, file_names[i], file_names[j], doc_hashes[i]))
+            else:
+                result = {'file1': file_names[i], 'file2': file_names[j]}
+                result.update(next(pair_scores))
+                fragments = self.winnowing.find_matching_fragments(fingerprint_indexes[i], fingerprints[j])
+                result['matching_fragments'] = fragments[:20]  # 最多保留20个片段
+                result['matching_fragment_count'] = len(fragments)
+                if weight_profiles is not None:
+                    result['weighted_similarity'] = self.weighted_similarity(weight_profiles[i], weight_profiles[j])
+                result['comment_similarity'] = self.segmenter.terms_similarity(chinese_terms[i], chinese_terms[j])
+                if store is not None:
+                    new_pairs.append((key, result, file_names[i], file_names[j]))
+                    # 分批写入结果库，避免在内存中保留所有结果
+                    if len(new_pairs) >= 500:
+                        run_pairs.extend(self.save_pair_results(store, params_key, new_pairs))
+                        new_pairs = []
+            if result_callback is not None:
+                result_callback(result)
+            
+            if top_k is None:
+                results.append((order, result))
+            else:
+                # 相同行数相同时先出现的文件对优先，与完整排序的结果一致
+                item = (result['identical_lines'], -order, result)
+                if len(results) < top_k:
+                    heapq.heappush(results, item)
+                elif item[:2] > results[0][:2]:
+                    heapq.heapreplace(results, item)
+        
+        if top_k is not None:
+            results = [(-neg_order, result) for _, neg_order, result in results]
+        self.last_run_stats['pair_count'] = len(pairs)
+        
+        # 按相同行数降序排序，相同时按文件对顺序，保证结果可复现
+        results.sort(key=lambda item: (-item[1]['identical_lines'], item[0]))
+        results = [result for _, result in results]
+        
+        self.last_run_stats['seconds'] = time.perf_counter() - start_time
+        if store is not None:
+            run_pairs.extend(self.save_pair_results(store, params_key, new_pairs))
+            documents = list(zip(doc_hashes, file_names, file_paths))
+            run_id = store.record_run(mode, params_key, documents, run_pairs,
+                                      self.last_run_stats['seconds'], len(pairs) - len(pending),
+                                      self.last_run_stats)
+            self.last_run_stats['store'] = {
+                'run_id': run_id,
+                'reused': len(pairs) - len(pending),
+                'computed': len(pending)
+            }
+        
+        return results, None
+    
+    def save_pair_results(self, store, params_key, new_pairs):
+        """将新计算的文件对结果写入结果库，返回[(pair_id, 文件1, 文件2, 文件1的内容哈希)]"""
+        pair_ids = store.save_pairs(params_key, [(key, result) for key, result, _, _ in new_pairs])
+        return [(pair_ids[key], file1, file2, key[0]) for key, _, file1, file2 in new_pairs]
+    
+    def get_stored_report(self, run_id=None, min_similarity=None, order_by='sequence_similarity', limit=100):
+        """从结果库中筛选和排序已保存的文件对结果并生成报告，无需重新计算"""
+        store = self.get_results_store()
+        if store is None:
+            return "未启用分析结果库。"
+        runs = store.list_runs(limit=1) if run_id is None else None
+        if run_id is None:
+            if not runs:
+                return "结果库中还没有分析记录。"
+            run_id = runs[0]['run_id']
+        
+        results = store.query_pairs(run_id, min_similarity=min_similarity, order_by=order_by, limit=limit)
+        report = [f"历史分析结果 (运行编号 {run_id}, 按 {order_by} 排序):", ""]
+        if min_similarity is not None:
+            report.append(f"仅显示序列相似度不低于 {min_similarity:.0f}% 的文件对\n")
+        for result in results:
+            report.append(f"{result['file1']} 与 {result['file2']} 的序列相似度: {result['sequence_similarity']:.2f}%")
+            report.append(f"  - 完全相同的代码行: {result['identical_lines']} 行")
+            for start1, start2, length in store.get_blocks(result['pair_id'], result['swapped'])[:3]:
+                report.append(f"  - 连续相同代码块: 文件1 行 {start1+1}-{start1+length} ↔ "
+                              f"文件2 行 {start2+1}-{start2+length} (共 {length} 行)")
+            report.append("")
+        if not results:
+            report.append("没有符合条件的文件对")
+        return "\n".join(report)
+    
+    def estimate_similarity(self, file_paths, sample_rate=0.05, threshold=None, mode='exact', top_k=None):
+        """抽样快速估计文件对的相同行数和序列相似度，给出95%置信区间
+        
+        不计算difflib相似度和相同行详情，每个文档只抽样一次，每个文件对只比较抽样后的行。
+        指定threshold（序列相似度百分比）时，置信区间跨越该阈值的文件对自动改用精确计分，
+        结果中escalated为True并包含精确计分的全部字段。
+        """
+        if len(file_paths) < 2:
+            return []
+        
+        start = time.perf_counter()
+        file_names = [os.path.splitext(os.path.basename(path))[0] for path in file_paths]
+        if self.cache is not None:
+            self.cache.reset_stats()
+        entries = self.load_documents(file_paths)
+        self.last_run_stats = {'cache': self.cache.get_stats() if self.cache is not None else None}
+        all_lines = [self.get_document_lines(entry, path, mode) for entry, path in zip(entries, file_paths)]
+        if mode == 'structural':
+            all_hashes = [self.line_hash_array(lines) for lines in all_lines]
+        else:
+            all_hashes = [np.array(entry['line_hashes'], dtype=np.uint64) for entry in entries]
+        
+        estimator = SampledSimilarityEstimator(sample_rate, ignore_hash=EMPTY_LINE_HASH)
+        profiles = [estimator.sample(hashes) for hashes in all_hashes]
+        load_seconds = time.perf_counter() - start
+        
+        results = []
+        escalated = 0
         for i in range(len(file_paths)):
-            for j in range(i+1, len(file_paths)):
-                # 找出完全相同的行
-                identical_lines = self.find_identical_lines(all_lines[i], all_lines[j])
+            for j in range(i + 1, len(file_paths)):
+                result = {'file1': file_names[i], 'file2': file_names[j], 'escalated': False}
+                result.update(estimator.estimate(profiles[i], profiles[j], len(all_lines[i]), len(all_lines[j])))
+                result['identical_lines'] = round(result['identical_lines_estimate'])
+                if threshold is not None and result['similarity_low'] < threshold <= result['similarity_high']:
+                    result.update(self.score_pair(all_lines[i], all_lines[j], all_hashes[i], all_hashes[j]))
+                    result['escalated'] = True
+                    escalated += 1
+                results.append(result)
+        
+        results.sort(key=lambda x: x['sequence_similarity'], reverse=True)
+        self.last_run_stats['estimate'] = {
+            'pair_count': len(results),
+            'escalated': escalated,
+            'load_seconds': load_seconds,
+            'seconds': time.perf_counter() - start
+        }
+        return results[:top_k] if top_k is not None else results
+    
+    def get_estimate_report(self, file_paths, sample_rate=0.05, threshold=None, mode='exact', top_k=None):
+        """生成抽样估计的相似度报告"""
+        if len(file_paths) < 2:
+            return "需要至少两个文件才能进行相似度分析。"
+        
+        results = self.estimate_similarity(file_paths, sample_rate, threshold, mode, top_k)
+        stats = self.last_run_stats['estimate']
+        report = [f"文件相似度快速估计报告 (抽样率 {sample_rate:.0%}, 95%置信区间):", ""]
+        if threshold is not None:
+            report.append(f"置信区间跨越 {threshold:.0f}% 阈值的文件对已改用精确计分\n")
+        
+        for result in results:
+            if result['escalated']:
+                report.append(f"{result['file1']} 与 {result['file2']} 的序列相似度: "
+                              f"{result['sequence_similarity']:.2f}% (精确)")
+                report.append(f"  - 完全相同的代码行: {result['identical_lines']} 行")
+            else:
+                report.append(f"{result['file1']} 与 {result['file2']} 的序列相似度: "
+                              f"约 {result['sequence_similarity']:.2f}% "
+                              f"[{result['similarity_low']:.2f}%, {result['similarity_high']:.2f}%]")
+                report.append(f"  - 相同代码行估计: {result['identical_lines_estimate']:.0f} 行 "
+                              f"[{result['identical_lines_low']:.0f}, {result['identical_lines_high']:.0f}]")
+            report.append(f"  - 较大文件总行数: {result['max_total_lines']} 行")
+            report.append("")
+        
+        report.append(f"共 {stats['pair_count']} 个文件对, 精确计分 {stats['escalated']} 个, "
+                      f"耗时 {stats['seconds'] * 1000:.0f} 毫秒 (其中文档加载 {stats['load_seconds'] * 1000:.0f} 毫秒)")
+        cache_stats = self.last_run_stats.get('cache')
+        if cache_stats:
+            report.append(f"文本提取缓存: 命中 {cache_stats['hits']} 个, 未命中 {cache_stats['misses']} 个")
+        return "\n".join(report)
+    
+    def get_corpus_index(self, mode='exact'):
+        """获取指定模式的参考语料索引，首次使用时打开数据库"""
+        if mode not in self.corpus_indexes:
+            self.corpus_indexes[mode] = CorpusIndex(self.cache_path(f"corpus_{mode}.sqlite3"))
+        return self.corpus_indexes[mode]
+    
+    def prepare_corpus_document(self, file_path, mode='exact'):
+        """加载文档并返回(内容哈希, 行哈希数组, 指纹, 文本行)，用于归档和查询"""
+        entry = self.load_document(file_path)
+        lines = self.get_document_lines(entry, file_path, mode)
+        if mode == 'structural':
+            hashes = self.line_hash_array(lines)
+        else:
+            hashes = np.array(entry['line_hashes'], dtype=np.uint64)
+        content_hash = entry.get('content_hash') or self.calculate_md5("\n".join(entry['lines']))
+        return content_hash, hashes, self.get_fingerprints(entry, mode), lines
+    
+    def add_to_corpus(self, file_paths, mode='exact'):
+        """将文档加入参考语料索引，已归档的文档跳过，返回新加入的文档数"""
+        index = self.get_corpus_index(mode)
+        added = 0
+        for path in file_paths:
+            content_hash, hashes, fingerprints, _ = self.prepare_corpus_document(path, mode)
+            _, is_new = index.add_document(content_hash, os.path.basename(path), path,
+                                           hashes, fingerprints, EMPTY_LINE_HASH)
+            added += is_new
+        return added
+    
+    def query_corpus(self, file_path, top_k=10, mode='exact'):
+        """将单个文档与参考语料中的所有归档文档比较，返回最相似的top_k个归档文档
+        
+        查询只访问文档自身的行哈希和指纹对应的倒排项，与归档规模无关；
+        对前几名结果再根据共享指纹定位疑似复制片段。
+        """
+        index = self.get_corpus_index(mode)
+        content_hash, hashes, fingerprints, _ = self.prepare_corpus_document(file_path, mode)
+        results = index.query(hashes, fingerprints, top_k,
+                              exclude_hash=content_hash, ignore_hash=EMPTY_LINE_HASH)
+        for result in results[:5]:
+            archived = self.winnowing.build_index(index.get_fragments(result['doc_id'], fingerprints))
+            fragments = self.winnowing.find_matching_fragments(archived, fingerprints)
+            result['matching_fragments'] = fragments[:20]
+            result['matching_fragment_count'] = len(fragments)
+        return results
+    
+    def load_project_files(self, project_path, extensions, gitignore_path=None, file_processor=None):
+        """直接从项目目录读取源代码文件，返回{相对路径: 清理后的文本行}，无需生成Word文档"""
+        from file_processor import FileProcessor
+        processor = file_processor or FileProcessor()
+        
+        files, _ = processor.collect_files([project_path], extensions, gitignore_path)
+        styled_lines, _ = processor.process_files(files, [project_path])
+        
+        # process_files输出的'path'行标记新文件的开始
+        project_files = {}
+        current_lines = None
+        for text, style_type in styled_lines:
+            if style_type == 'path':
+                current_lines = []
+                project_files[text] = current_lines
+            elif style_type == 'code' and current_lines is not None:
+                current_lines.append(text)
+        
+        return {path: self.clean_lines(lines) for path, lines in project_files.items()}
+    
+    def build_line_index(self, project_files, stop_hashes=frozenset()):
+        """为项目建立行哈希倒排索引：行哈希 -> [(文件序号, 出现次数)]，停用行不建立索引"""
+        index = {}
+        file_counters = []
+        for file_idx, lines in enumerate(project_files.values()):
+            counter = Counter(self.calculate_line_hash(line) for line in lines if line.strip())
+            for line_hash in stop_hashes.intersection(counter):
+                del counter[line_hash]
+            file_counters.append(counter)
+            for line_hash, count in counter.items():
+                index.setdefault(line_hash, []).append((file_idx, count))
+        return index, file_counters
+    
+    def analyze_directories(self, project_paths, extensions, gitignore_path=None, top_file_pairs=50,
+                            filter_boilerplate=False):
+        """直接比较多个项目目录的源代码相似度，结果细化到文件对
+        
+        filter_boilerplate为True时，以单个源文件为文档统计行频率，
+        高频样板行不进入倒排索引。
+        """
+        if len(project_paths) < 2:
+            return [], None
+        
+        project_names = [os.path.basename(os.path.normpath(path)) for path in project_paths]
+        projects = [self.load_project_files(path, extensions, gitignore_path) for path in project_paths]
+        
+        stop_hashes = frozenset()
+        if filter_boilerplate:
+            frequency = self.get_line_frequency_index('source_file')
+            # 源文件按“项目名/相对路径”计数，同一项目的新版本替换旧版本
+            for project_name, files in zip(project_names, projects):
+                for relative_path, lines in files.items():
+                    frequency.add_document(f"{project_name}/{relative_path}", self.line_hash_array(lines),
+                                           EMPTY_LINE_HASH, self.calculate_md5("\n".join(lines)))
+            frequency.save()
+            stop_hashes = frozenset(frequency.stop_hashes().tolist())
+            self.last_run_stats = {'boilerplate': {'stop_lines': len(stop_hashes),
+                                                   'corpus_documents': frequency.doc_count}}
+        
+        indexes = [self.build_line_index(files, stop_hashes) for files in projects]
+        
+        results = []
+        for a in range(len(projects)):
+            for b in range(a + 1, len(projects)):
+                index_a, counters_a = indexes[a]
+                _, counters_b = indexes[b]
+                names_a = list(projects[a].keys())
+                names_b = list(projects[b].keys())
                 
-                # 计算序列相似度
-                total_lines = max(len(all_lines[i]), len(all_lines[j]))
-                identical_count = len(identical_lines)
-                seq_sim = (identical_count / total_lines * 100) if total_lines > 0 else 0
+                # 通过倒排索引统计每个文件对的相同行数（按多重集计数）
+                file_pairs = []
+                for fb, counter_b in enumerate(counters_b):
+                    overlap = Counter()
+                    for line_hash, count_b in counter_b.items():
+                        for fa, count_a in index_a.get(line_hash, ()):
+                            overlap[fa] += min(count_a, count_b)
+                    for fa, identical_count in overlap.items():
+                        total_lines = max(len(projects[a][names_a[fa]]), len(projects[b][names_b[fb]]))
+                        file_pairs.append({
+                            'file1': names_a[fa],
+                            'file2': names_b[fb],
+                            'identical_lines': identical_count,
+                            'total_lines1': len(projects[a][names_a[fa]]),
+                            'total_lines2': len(projects[b][names_b[fb]]),
+                            'sequence_similarity': identical_count / total_lines * 100 if total_lines > 0 else 0
+                        })
                 
-                # 使用difflib计算更精确的序列相似度
-                diff_ratio = difflib.SequenceMatcher(None, 
-                                                    "\n".join(all_lines[i]), 
-                                                    "\n".join(all_lines[j])).ratio() * 100
+                file_pairs.sort(key=lambda x: (-x['identical_lines'], x['file1'], x['file2']))
+                
+                # 项目级的相同行数
+                total_a = Counter()
+                for counter in counters_a:
+                    total_a.update(counter)
+                total_b = Counter()
+                for counter in counters_b:
+                    total_b.update(counter)
+                identical_count = sum((total_a & total_b).values())
+                lines_a = sum(len(lines) for lines in projects[a].values())
+                lines_b = sum(len(lines) for lines in projects[b].values())
+                total_lines = max(lines_a, lines_b)
                 
                 results.append({
-                    'file1': file_names[i],
-                    'file2': file_names[j],
+                    'file1': project_names[a],
+                    'file2': project_names[b],
                     'identical_lines': identical_count,
-                    'identical_lines_details': identical_lines[:100],  # 最多显示100个相同行
-                    'total_lines1': len(all_lines[i]),
-                    'total_lines2': len(all_lines[j]),
+                    'total_lines1': lines_a,
+                    'total_lines2': lines_b,
                     'max_total_lines': total_lines,
-                    'sequence_similarity': seq_sim,
-                    'difflib_similarity': diff_ratio
+                    'sequence_similarity': identical_count / total_lines * 100 if total_lines > 0 else 0,
+                    'file_count1': len(projects[a]),
+                    'file_count2': len(projects[b]),
+                    'file_pairs': file_pairs[:top_file_pairs],
+                    'file_pair_count': len(file_pairs)
                 })
         
-        # 按相同行数降序排序
         results.sort(key=lambda x: x['identical_lines'], reverse=True)
-        
         return results, None
     
-    def get_similarity_report(self, file_paths):
-        """生成相似度报告，仅包含序列相似度和相同行信息"""
+    def get_directory_similarity_report(self, project_paths, extensions, gitignore_path=None, top_file_pairs=20,
+                                        filter_boilerplate=False):
+        """生成项目目录相似度报告，列出重叠最多的文件对"""
+        if len(project_paths) < 2:
+            return "需要至少两个项目目录才能进行相似度分析。"
+        
+        self.last_run_stats = {}
+        results, _ = self.analyze_directories(project_paths, extensions, gitignore_path, top_file_pairs,
+                                              filter_boilerplate)
+        
+        report = ["项目目录相似度分析报告:\n"]
+        for result in results:
+            report.append(f"{result['file1']} 与 {result['file2']} 的序列相似度: {result['sequence_similarity']:.2f}%")
+            report.append(f"  - 完全相同的代码行: {result['identical_lines']} 行")
+            report.append(f"  - 项目1: {result['file_count1']} 个文件, {result['total_lines1']} 行")
+            report.append(f"  - 项目2: {result['file_count2']} 个文件, {result['total_lines2']} 行")
+            
+            if result['file_pairs']:
+                report.append(f"  - 重叠最多的文件对 (共 {result['file_pair_count']} 对存在相同行):")
+                for idx, pair in enumerate(result['file_pairs'], 1):
+                    report.append(f"    {idx}. {pair['file1']} ↔ {pair['file2']}: "
+                                  f"{pair['identical_lines']} 行相同 ({pair['sequence_similarity']:.2f}%)")
+            report.append("")
+        
+        boilerplate_stats = self.last_run_stats.get('boilerplate')
+        if boilerplate_stats:
+            report.append(f"样板行过滤: 排除 {boilerplate_stats['stop_lines']} 种高频行 "
+                          f"(语料共 {boilerplate_stats['corpus_documents']} 个源文件)")
+        
+        return "\n".join(report)
+    
+    def tokenize_line(self, line):
+        """将一行文本切分为词元，含中文的行使用结巴分词"""
+        if CHINESE_CHAR_PATTERN.search(line):
+            return self.segmenter.segment_text(line)
+        return CODE_TOKEN_PATTERN.findall(line)
+    
+    def extract_tfidf_terms(self, lines, ngram_size=3):
+        """生成文档的TF-IDF词项：每行内的1~ngram_size元词元组合，不跨行"""
+        terms = []
+        for line in lines:
+            tokens = self.tokenize_line(line)
+            for n in range(1, ngram_size + 1):
+                for k in range(len(tokens) - n + 1):
+                    terms.append(" ".join(tokens[k:k + n]))
+        return terms
+    
+    def analyze_semantic_similarity(self, file_paths, top_k=20, block_size=None, ngram_size=3, parallel=False):
+        """基于TF-IDF余弦相似度的批量语义相似度分析
+        
+        对整个语料拟合一个稀疏TF-IDF模型，一次向量化计算N×N余弦矩阵；
+        指定block_size时按行分块计算以限制内存，仅保留前top_k个最相似的文件对。
+        返回(结果列表, 相似度矩阵)，分块模式下不保留完整矩阵，第二项为None。
+        """
+        if len(file_paths) < 2:
+            return [], None
+        
+        file_names = [os.path.splitext(os.path.basename(path))[0] for path in file_paths]
+        
+        if self.cache is not None:
+            self.cache.reset_stats()
+        entries = self.load_documents(file_paths, parallel)
+        self.last_run_stats = {'cache': self.cache.get_stats() if self.cache is not None else None}
+        
+        # 含中文的行预先（可并行）分词，向量化时直接使用记忆化结果
+        self.segmenter.prime([line for entry in entries for line in entry['lines']
+                              if CHINESE_CHAR_PATTERN.search(line)], parallel)
+        
+        self.vectorizer = TfidfVectorizer(
+            analyzer=lambda lines: self.extract_tfidf_terms(lines, ngram_size),
+            sublinear_tf=True,
+            dtype=np.float32
+        )
+        try:
+            matrix = self.vectorizer.fit_transform([entry['lines'] for entry in entries])
+        except ValueError:
+            # 所有文档都没有可用的词项
+            return [], None
+        
+        doc_count = matrix.shape[0]
+        rows = block_size if block_size else doc_count
+        full_matrix = None
+        heap = []
+        
+        for start in range(0, doc_count, rows):
+            end = min(start + rows, doc_count)
+            block = cosine_similarity(matrix[start:end], matrix)
+            if block_size is None:
+                full_matrix = block
+            
+            # 只保留上三角（j > i）的文件对
+            row_idx, col_idx = np.triu_indices(end - start, k=1, m=doc_count - start)
+            col_idx = col_idx + start
+            scores = block[row_idx, col_idx]
+            
+            # 块内先用argpartition选出候选，再合并到全局堆
+            if top_k and len(scores) > top_k:
+                candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+            else:
+                candidates = np.arange(len(scores))
+            for c in candidates:
+                item = (float(scores[c]), -(row_idx[c] + start), -col_idx[c])
+                if not top_k or len(heap) < top_k:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+        
+        results = []
+        for score, neg_i, neg_j in sorted(heap, reverse=True):
+            i, j = -neg_i, -neg_j
+            results.append({
+                'file1': file_names[i],
+                'file2': file_names[j],
+                'cosine_similarity': score * 100
+            })
+        
+        return results, full_matrix
+    
+    def get_semantic_similarity_report(self, file_paths, top_k=20, block_size=None, parallel=False):
+        """生成TF-IDF语义相似度报告"""
         if len(file_paths) < 2:
             return "需要至少两个文件才能进行相似度分析。"
         
-        # 分析相似度
-        results, _ = self.analyze_similarity(file_paths)
+        results, _ = self.analyze_semantic_similarity(file_paths, top_k, block_size, parallel=parallel)
+        
+        report = [f"文件语义相似度分析报告 (TF-IDF余弦相似度, 前{top_k}对):\n"]
+        for idx, result in enumerate(results, 1):
+            report.append(f"{idx}. {result['file1']} 与 {result['file2']}: {result['cosine_similarity']:.2f}%")
+        
+        if not results:
+            report.append("文档中没有可用于比较的内容。")
+        
+        cache_stats = self.last_run_stats.get('cache')
+        if cache_stats:
+            report.append(f"\n文本提取缓存: 命中 {cache_stats['hits']} 个, 未命中 {cache_stats['misses']} 个")
+        
+        return "\n".join(report)
+    
+    def get_similarity_report(self, file_paths, parallel=False, max_workers=None, mode='exact',
+                              filter_boilerplate=False, top_k=None, output_path=None, output_format=None):
+        """生成相似度报告，仅包含序列相似度和相同行信息
+        
+        指定output_path时，所有文件对的结果在分析过程中流式写入文件（文本、CSV或JSON Lines），
+        返回的报告只包含相同行数最多的top_k个文件对。
+        """
+        if len(file_paths) < 2:
+            return "需要至少两个文件才能进行相似度分析。"
+        
+        if mode == 'structural':
+            title = "文件结构相似度分析报告 (标识符、字面量和注释已规范化):"
+        else:
+            title = "文件序列相似度分析报告:"
+        
+        # 分析相似度，同时把每个文件对的结果写入报告文件
+        writer = ReportWriter(output_path, output_format) if output_path else None
+        try:
+            if writer is not None:
+                writer.write_header(title)
+            results, _ = self.analyze_similarity(file_paths, parallel, max_workers, mode, filter_boilerplate,
+                                                 top_k, writer.write_result if writer is not None else None)
+            summary = self.format_run_summary(results)
+            if writer is not None:
+                writer.write_footer(summary)
+        finally:
+            if writer is not None:
+                writer.close()
         
         # 生成报告
-        report = "文件序列相似度分析报告:\n\n"
+        report = [title, ""]
+        pair_count = self.last_run_stats.get('pair_count', len(results))
+        if len(results) < pair_count:
+            report.append(f"共 {pair_count} 个文件对，仅显示相同行最多的 {len(results)} 个\n")
+        if writer is not None:
+            report.append(f"完整结果已导出到: {output_path}\n")
         
         # 添加详细的相似度结果
         for result in results:
-            report += f"{result['file1']} 与 {result['file2']} 的序列相似度: {result['sequence_similarity']:.2f}%\n"
-            report += f"  - 完全相同的代码行: {result['identical_lines']} 行\n"
-            report += f"  - 文件1总行数: {result['total_lines1']} 行\n"
-            report += f"  - 文件2总行数: {result['total_lines2']} 行\n"
-            report += f"  - 较大文件总行数: {result['max_total_lines']} 行\n"
-            
-            # 如果有相同行，显示部分示例
-            if result['identical_lines'] > 0:
-                report += "  - 相同行示例 (最多显示10行):\n"
-                for idx, (line1_idx, line2_idx, line_content) in enumerate(result['identical_lines_details'][:10]):
-                    if len(line_content) > 50:
-                        line_content = line_content[:50] + "..."
-                    report += f"    {idx+1}. 行 {line1_idx+1}↔{line2_idx+1}: {line_content}\n"
-                
-                if result['identical_lines'] > 10:
-                    report += f"    ... 还有 {result['identical_lines'] - 10} 行相同 ...\n"
-            
-            report += "\n"
+            report.extend(format_pair_text(result))
+            report.append("")
+        report.extend(summary)
         
+        return "\n".join(report)
+    
+    def format_run_summary(self, results):
+        """生成报告末尾的汇总信息：最相似的文件对以及缓存、样板行和分词统计"""
+        summary = []
         # 找出最相似的文件对
         if results:
             most_similar = results[0]
-            report += f"\n最相似的文件对: {most_similar['file1']} 和 {most_similar['file2']}\n"
-            report += f"完全相同的代码行: {most_similar['identical_lines']} 行 (占较大文件的 {most_similar['sequence_similarity']:.2f}%)"
+            summary.append(f"\n最相似的文件对: {most_similar['file1']} 和 {most_similar['file2']}")
+            summary.append(f"完全相同的代码行: {most_similar['identical_lines']} 行 "
+                           f"(占较大文件的 {most_similar['sequence_similarity']:.2f}%)")
+        
+        # 缓存命中统计
+        cache_stats = self.last_run_stats.get('cache')
+        if cache_stats:
+            summary.append(f"\n文本提取缓存: 命中 {cache_stats['hits']} 个, 未命中 {cache_stats['misses']} 个")
+        
+        store_stats = self.last_run_stats.get('store')
+        if store_stats:
+            summary.append(f"分析结果库: 复用 {store_stats['reused']} 个文件对, 新计算 {store_stats['computed']} 个 "
+                           f"(运行编号 {store_stats['run_id']}, 耗时 {self.last_run_stats['seconds']:.2f} 秒)")
+        
+        boilerplate_stats = self.last_run_stats.get('boilerplate')
+        if boilerplate_stats:
+            summary.append(f"样板行过滤: 排除 {boilerplate_stats['stop_lines']} 种高频行 "
+                           f"(语料共 {boilerplate_stats['corpus_documents']} 个文档)")
+        
+        tokenizer_stats = self.last_run_stats.get('tokenizer')
+        if tokenizer_stats and tokenizer_stats.get('lines_per_second'):
+            summary.append(f"结构化分词: {tokenizer_stats['lines']} 行, "
+                           f"{tokenizer_stats['lines_per_second']:.0f} 行/秒")
+        return summary
+    
+    def get_corpus_report(self, file_paths, top_k=10, mode='exact'):
+        """生成新文档与参考语料比较的报告"""
+        index = self.get_corpus_index(mode)
+        if index.document_count() == 0:
+            return "参考语料库为空，请先将历史文档加入归档库。"
+        
+        if self.cache is not None:
+            self.cache.reset_stats()
+        report = [f"参考语料比较报告 (归档文档 {index.document_count()} 个):", ""]
+        for path in file_paths:
+            report.append(f"{os.path.basename(path)}:")
+            results = self.query_corpus(path, top_k, mode)
+            if not results:
+                report.append("  未找到相似的归档文档")
+            for rank, result in enumerate(results, 1):
+                report.append(f"  {rank}. {result['name']} 序列相似度: {result['sequence_similarity']:.2f}% "
+                              f"(相同行 {result['identical_lines']} 行, 共享指纹 {result['shared_fingerprints']} 个)")
+                for fragment in result.get('matching_fragments', [])[:3]:
+                    report.append(f"     疑似复制片段: 归档文档 行 {fragment['start1']+1}-{fragment['end1']+1} ↔ "
+                                  f"本文档 行 {fragment['start2']+1}-{fragment['end2']+1}")
+            report.append("")
+        
+        cache_stats = self.cache.get_stats() if self.cache is not None else None
+        if cache_stats:
+            report.append(f"文本提取缓存: 命中 {cache_stats['hits']} 个, 未命中 {cache_stats['misses']} 个")
         
-        return report 
\ No newline at end of file
+        return "\n".join(report)
\ No newline at end of file
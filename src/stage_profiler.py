@@ -0,0 +1,215 @@
+import heapq
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+def _windows_memory_counters():
+    """返回当前进程的PROCESS_MEMORY_COUNTERS，失败时返回None"""
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    get_memory_info = ctypes.windll.psapi.GetProcessMemoryInfo
+    get_memory_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(ProcessMemoryCounters), wintypes.DWORD]
+    handle = ctypes.windll.kernel32.GetCurrentProcess()
+    if get_memory_info(handle, ctypes.byref(counters), counters.cb):
+        return counters
+    return None
+
+def _linux_status_bytes(field):
+    """读取/proc/self/status中以kB为单位的字段，返回字节数"""
+    with open('/proc/self/status', 'r', encoding='ascii') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) * 1024
+    return None
+
+def peak_rss_bytes():
+    """返回进程的峰值常驻内存（字节），无法获取时返回None
+
+    该值是自进程启动（或上次reset_peak_rss()）以来的最高值，不会随内存释放而下降。
+    """
+    try:
+        if sys.platform == 'win32':
+            counters = _windows_memory_counters()
+            return counters.PeakWorkingSetSize if counters else None
+        if sys.platform.startswith('linux'):
+            # VmHWM在exec后重新计数；ru_maxrss会保留父进程fork时的峰值
+            return _linux_status_bytes('VmHWM')
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux以KB为单位，macOS以字节为单位
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, AttributeError, OSError):
+        return None
+
+def current_rss_bytes():
+    """返回进程当前的常驻内存（字节），无法获取时返回None"""
+    try:
+        if sys.platform == 'win32':
+            counters = _windows_memory_counters()
+            return counters.WorkingSetSize if counters else None
+        if sys.platform.startswith('linux'):
+            return _linux_status_bytes('VmRSS')
+    except (ImportError, AttributeError, OSError):
+        pass
+    return None
+
+def reset_peak_rss():
+    """将峰值常驻内存重置为当前值，成功时返回True
+
+    只有Linux支持（向/proc/self/clear_refs写入5），其他平台返回False。
+    """
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        with open('/proc/self/clear_refs', 'w', encoding='ascii') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+class StageProfiler:
+    """记录导出各阶段的耗时、CPU时间和内存峰值，以及读取最慢的文件
+
+    每个阶段在自己的线程中运行时（流水线模式），CPU时间按线程统计，与其他阶段互不干扰。
+    峰值常驻内存覆盖python-docx底层lxml分配的内存，始终记录，其含义由peak_rss_scope说明：
+    - 'stage'：阶段开始时已重置峰值（仅Linux），为该阶段自身的峰值；
+    - 'concurrent'：阶段与其他阶段同时运行（流水线模式），为这些阶段共同的峰值；
+    - 'process'：无法重置峰值，为进程启动以来的累计峰值。
+    另外记录阶段结束与开始时常驻内存之差rss_delta_bytes。
+    trace_memory为True时另外用tracemalloc记录Python对象的内存峰值，会使导出变慢。
+    """
+
+    # 性能记录格式版本，字段变化时递增，便于跨版本比较
+    PROFILE_VERSION = 2
+
+    def __init__(self, trace_memory=False, slowest_n=10):
+        self.trace_memory = trace_memory
+        self.slowest_n = slowest_n
+        self.stages = {}
+        self.timings = {}
+        self._slowest_files = []
+        self._order = 0
+        self._lock = threading.Lock()
+        self._started_tracing = False
+        self._active_stages = 0
+        self._peak_scope = 'process'
+        self._start = time.perf_counter()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    @contextmanager
+    def stage(self, name):
+        """记录一个阶段的墙钟时间、本线程CPU时间、内存峰值和内存变化"""
+        with self._lock:
+            self._active_stages += 1
+            if self._active_stages == 1:
+                # 没有其他阶段在运行时才重置峰值，避免影响同时运行的阶段
+                self._peak_scope = 'stage' if reset_peak_rss() else 'process'
+                scope = self._peak_scope
+            else:
+                scope = 'concurrent' if self._peak_scope == 'stage' else 'process'
+        rss_start = current_rss_bytes()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            rss_end = current_rss_bytes()
+            record = {
+                'wall_seconds': time.perf_counter() - wall_start,
+                'cpu_seconds': time.thread_time() - cpu_start,
+                'peak_rss_bytes': peak_rss_bytes(),
+                'peak_rss_scope': scope,
+                'rss_delta_bytes': None if rss_start is None or rss_end is None else rss_end - rss_start,
+            }
+            if self.trace_memory and tracemalloc.is_tracing():
+                record['traced_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+            with self._lock:
+                self.stages[name] = record
+                self._active_stages -= 1
+
+    def add_time(self, name, seconds):
+        """累计阶段内部某一步骤的耗时（如编码检测）"""
+        with self._lock:
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def record_file(self, path, seconds, line_count):
+        """记录单个文件的读取耗时，只保留最慢的slowest_n个"""
+        with self._lock:
+            self._order += 1
+            item = (seconds, -self._order, path, line_count)
+            if len(self._slowest_files) < self.slowest_n:
+                heapq.heappush(self._slowest_files, item)
+            elif item > self._slowest_files[0]:
+                heapq.heapreplace(self._slowest_files, item)
+
+    def stop(self):
+        """停止由本对象启动的内存跟踪"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def summary(self, **extra):
+        """返回可序列化为JSON的性能记录，extra中的字段（如文件数、行数）一并写入"""
+        with self._lock:
+            slowest = sorted(self._slowest_files, reverse=True)
+            return {
+                'profile_version': self.PROFILE_VERSION,
+                'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'total_seconds': time.perf_counter() - self._start,
+                'stages': {name: dict(record) for name, record in self.stages.items()},
+                'timings': dict(self.timings),
+                'slowest_files': [{'path': path, 'seconds': seconds, 'lines': line_count}
+                                  for seconds, _, path, line_count in slowest],
+                **extra
+            }
+
+    @staticmethod
+    def format_summary(summary):
+        """将性能记录格式化为导出记录中的文本行"""
+        def megabytes(value):
+            return "未知" if value is None else f"{value / 1024 / 1024:.1f} MB"
+
+        peak_labels = {'stage': "阶段峰值内存", 'concurrent': "并行阶段共同峰值内存", 'process': "进程累计峰值内存"}
+        lines = [f"总耗时: {summary['total_seconds']:.2f} 秒"]
+        for name, record in summary['stages'].items():
+            line = (f"  - {name}: 耗时 {record['wall_seconds']:.2f} 秒, CPU {record['cpu_seconds']:.2f} 秒, "
+                    f"{peak_labels[record['peak_rss_scope']]} {megabytes(record['peak_rss_bytes'])}")
+            if record['rss_delta_bytes'] is not None:
+                line += f", 内存变化 {record['rss_delta_bytes'] / 1024 / 1024:+.1f} MB"
+            if 'traced_peak_bytes' in record:
+                line += f", Python对象峰值 {megabytes(record['traced_peak_bytes'])}"
+            lines.append(line)
+        for name, seconds in summary['timings'].items():
+            lines.append(f"  - 其中 {name}: {seconds:.2f} 秒")
+        if summary['slowest_files']:
+            lines.append(f"读取最慢的 {len(summary['slowest_files'])} 个文件:")
+            for item in summary['slowest_files']:
+                lines.append(f"  - {item['path']}: {item['seconds'] * 1000:.1f} 毫秒, {item['lines']} 行")
+        return lines
+
+    @staticmethod
+    def write_json(summary, path):
+        """将性能记录写入JSON文件"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        return os.path.abspath(path)
@@ -1,6 +1,15 @@
 import tkinter as tk
 from tkinter import ttk, font, Toplevel, messagebox, filedialog
 import os
+import threading
+from progress_tracker import format_rates
+
+# 界面中最多显示的文件对数量，完整结果通过导出查看
+REPORT_TOP_K = 100
+# 结果区每页显示的行数
+REPORT_PAGE_LINES = 300
+# 快速估计模式下需要精确确认的相似度阈值（百分比）
+ESTIMATE_THRESHOLD = 30
 
 class FontSelector:
     @staticmethod
@@ -90,30 +99,85 @@ class CustomModeDialog:
         return on_save  # 返回回调函数以便设置扩展名
 
 class ProgressWindow:
-    def __init__(self, parent, total_files):
+    def __init__(self, parent, total_files, on_cancel=None):
         self.window = Toplevel(parent)
         self.window.title("正在生成")
-        self.window.geometry("400x120")
+        self.window.geometry("400x185" if on_cancel else "400x145")
         self.window.resizable(False, False)
         self.window.transient(parent)  # 保持在主窗口之上
         
-        ttk.Label(self.window, text="正在处理文件...", font=('微软雅黑', 12)).pack(pady=10)
+        self.status_label = ttk.Label(self.window, text="正在处理文件...", font=('微软雅黑', 12))
+        self.status_label.pack(pady=10)
         
         self.progress_bar = ttk.Progressbar(self.window, orient="horizontal", length=350, mode="determinate")
         self.progress_bar.pack(pady=5)
-        self.progress_bar["maximum"] = total_files
+        self.progress_bar["maximum"] = max(1, total_files)
         
         self.progress_label = ttk.Label(self.window, text="", font=('微软雅黑', 9))
-        self.progress_label.pack(pady=5)
+        self.progress_label.pack(pady=(5, 0))
+        
+        # 吞吐量和剩余时间
+        self.rate_label = ttk.Label(self.window, text="", font=('微软雅黑', 9))
+        self.rate_label.pack(pady=(0, 5))
+        self.indeterminate = False
+        
+        # 可取消的任务显示取消按钮，关闭窗口等同于取消
+        self.cancel_button = None
+        if on_cancel:
+            self.on_cancel = on_cancel
+            self.cancel_button = ttk.Button(self.window, text="取消", command=self.request_cancel)
+            self.cancel_button.pack(pady=5)
+            self.window.protocol("WM_DELETE_WINDOW", self.request_cancel)
         
         parent.update_idletasks()
     
-    def update_progress(self, current, filename):
+    def update_progress(self, current, filename, total=None):
         """更新进度"""
+        if total is not None:
+            self.progress_bar['maximum'] = max(1, total)
         self.progress_bar['value'] = current
         self.progress_label['text'] = f"正在处理: {filename}"
         self.window.update_idletasks()
     
+    def show_snapshot(self, snapshot):
+        """显示ProgressTracker的进度快照，调用频率已由ProgressTracker限制，这里不强制重绘"""
+        total = snapshot['total']
+        if total:
+            if self.indeterminate:
+                self.progress_bar.stop()
+                self.progress_bar.config(mode="determinate")
+                self.indeterminate = False
+            self.progress_bar['maximum'] = max(1, total)
+            self.progress_bar['value'] = snapshot['current']
+        elif not self.indeterminate:
+            # 总数未知（如保存文档）时显示滚动进度条
+            self.progress_bar.config(mode="indeterminate")
+            self.progress_bar.start(20)
+            self.indeterminate = True
+        
+        status = snapshot['label']
+        if total:
+            status += f" ({snapshot['current']}/{total})"
+        # 流水线模式下同时显示上游阶段的完成数
+        read = snapshot['stages'].get('read')
+        if snapshot['stage'] == 'build' and read:
+            status += f"，已读取 {read[0]} 个文件"
+        self.status_label['text'] = status
+        self.progress_label['text'] = f"正在处理: {snapshot['detail']}" if snapshot['detail'] else ""
+        self.rate_label['text'] = format_rates(snapshot)
+    
+    def set_status(self, text):
+        """更新当前阶段的说明"""
+        self.status_label['text'] = text
+        self.window.update_idletasks()
+    
+    def request_cancel(self):
+        """请求取消任务，任务在下一个文件边界处停止"""
+        if self.cancel_button is not None and str(self.cancel_button['state']) != tk.DISABLED:
+            self.cancel_button.config(state=tk.DISABLED)
+            self.set_status("正在取消...")
+            self.on_cancel()
+    
     def destroy(self):
         """销毁窗口"""
         if self.window:
@@ -121,10 +185,19 @@ class ProgressWindow:
             self.window = None
 
 class SimilarityAnalysisFrame(ttk.Frame):
-    def __init__(self, parent, analyzer):
+    def __init__(self, parent, analyzer_factory, extensions_provider=None):
         super().__init__(parent, padding=20)
-        self.analyzer = analyzer
+        # 分析器按需创建，避免启动时导入分析模块
+        self.analyzer_factory = analyzer_factory
+        # 比较项目目录时使用的文件类型，默认取导出页当前设置
+        self.extensions_provider = extensions_provider
         self.file_paths = []
+        # 各分析任务共用同一个分析器，同一时间只允许一个后台任务
+        self._task_running = False
+        self.action_buttons = []
+        # 分页显示的报告
+        self.report_pages = []
+        self.current_page = 0
         
         # 创建文件列表框架
         self.create_file_list_frame()
@@ -158,6 +231,10 @@ class SimilarityAnalysisFrame(ttk.Frame):
         add_btn = ttk.Button(button_frame, text="添加文件", command=self.add_file)
         add_btn.pack(side=tk.LEFT, padx=5)
         
+        # 添加项目目录按钮
+        add_dir_btn = ttk.Button(button_frame, text="添加目录", command=self.add_directory)
+        add_dir_btn.pack(side=tk.LEFT, padx=5)
+        
         # 删除选中文件按钮
         remove_btn = ttk.Button(button_frame, text="删除选中", command=self.remove_selected_file)
         remove_btn.pack(side=tk.LEFT, padx=5)
@@ -166,9 +243,49 @@ class SimilarityAnalysisFrame(ttk.Frame):
         clear_btn = ttk.Button(button_frame, text="清空列表", command=self.clear_files)
         clear_btn.pack(side=tk.LEFT, padx=5)
         
+        # 并行分析选项
+        self.parallel_var = tk.BooleanVar(value=False)
+        parallel_check = ttk.Checkbutton(button_frame, text="并行分析", variable=self.parallel_var)
+        parallel_check.pack(side=tk.LEFT, padx=15)
+        
+        # 过滤样板代码选项
+        self.boilerplate_var = tk.BooleanVar(value=False)
+        boilerplate_check = ttk.Checkbutton(button_frame, text="过滤样板代码", variable=self.boilerplate_var)
+        boilerplate_check.pack(side=tk.LEFT, padx=5)
+        
+        # 分析模式选择
+        self.analysis_mode_var = tk.StringVar(value="序列相似度")
+        mode_selector = ttk.Combobox(
+            button_frame,
+            textvariable=self.analysis_mode_var,
+            values=["序列相似度", "结构相似度(抗重命名)", "语义相似度(TF-IDF)", "快速估计(抽样)"],
+            state="readonly",
+            width=18
+        )
+        mode_selector.pack(side=tk.LEFT, padx=5)
+        
         # 分析按钮
         analyze_btn = ttk.Button(button_frame, text="开始分析", command=self.analyze_files, style='Generate.TButton')
         analyze_btn.pack(side=tk.RIGHT, padx=5)
+        
+        # 查看历史结果按钮
+        history_btn = ttk.Button(button_frame, text="历史结果", command=self.show_stored_results)
+        history_btn.pack(side=tk.RIGHT, padx=5)
+        
+        # 导出完整结果按钮
+        export_btn = ttk.Button(button_frame, text="导出完整结果", command=self.export_results)
+        export_btn.pack(side=tk.RIGHT, padx=5)
+        
+        # 与参考语料库比较按钮
+        query_corpus_btn = ttk.Button(button_frame, text="与归档库比较", command=self.compare_with_corpus)
+        query_corpus_btn.pack(side=tk.RIGHT, padx=5)
+        
+        # 加入参考语料库按钮
+        add_corpus_btn = ttk.Button(button_frame, text="加入归档库", command=self.add_files_to_corpus)
+        add_corpus_btn.pack(side=tk.RIGHT, padx=5)
+        
+        # 后台任务运行期间禁用的按钮
+        self.action_buttons = [analyze_btn, history_btn, export_btn, query_corpus_btn, add_corpus_btn]
     
     def create_result_frame(self):
         """创建结果框架"""
@@ -184,6 +301,42 @@ class SimilarityAnalysisFrame(ttk.Frame):
         scrollbar = ttk.Scrollbar(result_frame, orient="vertical", command=self.result_text.yview)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.result_text.config(yscrollcommand=scrollbar.set)
+        
+        # 分页控件
+        pager_frame = ttk.Frame(self)
+        pager_frame.pack(fill=tk.X, pady=(5, 0))
+        self.next_page_btn = ttk.Button(pager_frame, text="下一页", command=lambda: self.show_page(self.current_page + 1))
+        self.next_page_btn.pack(side=tk.RIGHT, padx=5)
+        self.page_label = ttk.Label(pager_frame, text="")
+        self.page_label.pack(side=tk.RIGHT, padx=5)
+        self.prev_page_btn = ttk.Button(pager_frame, text="上一页", command=lambda: self.show_page(self.current_page - 1))
+        self.prev_page_btn.pack(side=tk.RIGHT, padx=5)
+        self.update_pager()
+    
+    def show_report(self, report):
+        """按页拆分报告，结果区每次只渲染一页"""
+        lines = report.split("\n")
+        self.report_pages = ["\n".join(lines[i:i + REPORT_PAGE_LINES])
+                             for i in range(0, len(lines), REPORT_PAGE_LINES)]
+        self.show_page(0)
+    
+    def show_page(self, page):
+        """显示指定页的报告内容"""
+        if not self.report_pages or not 0 <= page < len(self.report_pages):
+            return
+        self.current_page = page
+        self.result_text.config(state=tk.NORMAL)
+        self.result_text.delete(1.0, tk.END)
+        self.result_text.insert(tk.END, self.report_pages[page])
+        self.result_text.config(state=tk.DISABLED)
+        self.update_pager()
+    
+    def update_pager(self):
+        """更新页码和翻页按钮状态"""
+        total = len(self.report_pages)
+        self.page_label.config(text=f"第 {self.current_page + 1} / {total} 页" if total > 1 else "")
+        self.prev_page_btn.config(state=tk.NORMAL if self.current_page > 0 else tk.DISABLED)
+        self.next_page_btn.config(state=tk.NORMAL if self.current_page < total - 1 else tk.DISABLED)
     
     def add_file(self):
         """添加文件"""
@@ -198,6 +351,13 @@ class SimilarityAnalysisFrame(ttk.Frame):
                     self.file_paths.append(path)
                     self.file_listbox.insert(tk.END, os.path.basename(path))
     
+    def add_directory(self):
+        """添加项目目录，直接比较源代码而无需先生成Word文档"""
+        directory = filedialog.askdirectory(title="选择项目目录")
+        if directory and directory not in self.file_paths:
+            self.file_paths.append(directory)
+            self.file_listbox.insert(tk.END, f"[目录] {os.path.basename(os.path.normpath(directory))}")
+    
     def remove_selected_file(self):
         """删除选中的文件"""
         selection = self.file_listbox.curselection()
@@ -211,30 +371,154 @@ class SimilarityAnalysisFrame(ttk.Frame):
         self.file_listbox.delete(0, tk.END)
         self.file_paths.clear()
     
-    def analyze_files(self):
-        """分析文件相似度"""
+    def show_stored_results(self):
+        """从分析结果库中读取最近一次分析的结果，按相似度排序显示，无需重新计算"""
+        self.run_background_task(lambda analyzer: analyzer.get_stored_report(limit=REPORT_TOP_K), 1)
+    
+    def export_results(self):
+        """分析并把所有文件对的结果导出为文本、CSV或JSON Lines文件"""
+        if self.analysis_mode_var.get() not in ("序列相似度", "结构相似度(抗重命名)"):
+            messagebox.showwarning("警告", "仅序列相似度和结构相似度模式支持导出完整结果")
+            return
+        if any(os.path.isdir(path) for path in self.file_paths):
+            messagebox.showwarning("警告", "比较项目目录时不支持导出完整结果")
+            return
+        
+        output_path = filedialog.asksaveasfilename(
+            title="导出完整结果",
+            defaultextension=".csv",
+            filetypes=[("CSV文件", "*.csv"), ("JSON Lines", "*.jsonl"), ("文本文件", "*.txt")],
+            initialfile="相似度分析结果.csv"
+        )
+        if output_path:
+            self.analyze_files(output_path)
+    
+    def analyze_files(self, output_path=None):
+        """分析文件相似度，在后台线程中执行以免阻塞界面
+        
+        界面只显示相同行最多的REPORT_TOP_K个文件对；指定output_path时完整结果流式写入该文件。
+        """
         if len(self.file_paths) < 2:
             messagebox.showwarning("警告", "请至少添加两个文件进行比较")
             return
         
-        try:
-            # 显示进度窗口
-            progress_window = ProgressWindow(self, len(self.file_paths))
-            self.update_idletasks()
-            
+        file_paths = list(self.file_paths)
+        directory_count = sum(1 for path in file_paths if os.path.isdir(path))
+        if 0 < directory_count < len(file_paths):
+            messagebox.showwarning("警告", "请不要混合添加目录和Word文档")
+            return
+        extensions = None
+        if directory_count:
+            # 目录比较只有基于行索引的序列相似度一种方式
+            if self.analysis_mode_var.get() != "序列相似度" or self.parallel_var.get():
+                messagebox.showwarning("警告", "比较项目目录时只支持序列相似度，且不支持并行分析")
+                return
+            extensions = self.extensions_provider() if self.extensions_provider else None
+            if not extensions:
+                messagebox.showwarning("警告", "请先在源代码导出页选择文件类型")
+                return
+        
+        parallel = self.parallel_var.get()
+        analysis_mode = self.analysis_mode_var.get()
+        filter_boilerplate = self.boilerplate_var.get()
+        
+        def task(analyzer):
             # 获取相似度报告
-            report = self.analyzer.get_similarity_report(self.file_paths)
+            if extensions:
+                return analyzer.get_directory_similarity_report(
+                    file_paths, extensions, filter_boilerplate=filter_boilerplate)
+            elif analysis_mode == "语义相似度(TF-IDF)":
+                return analyzer.get_semantic_similarity_report(file_paths, parallel=parallel)
+            elif analysis_mode == "快速估计(抽样)":
+                return analyzer.get_estimate_report(file_paths, threshold=ESTIMATE_THRESHOLD, top_k=REPORT_TOP_K)
+            else:
+                mode = 'structural' if analysis_mode == "结构相似度(抗重命名)" else 'exact'
+                return analyzer.get_similarity_report(
+                    file_paths, parallel=parallel, mode=mode, filter_boilerplate=filter_boilerplate,
+                    top_k=REPORT_TOP_K, output_path=output_path)
+        
+        self.run_background_task(task, len(file_paths))
+    
+    def get_corpus_mode(self):
+        """参考语料库按比较模式分别建立索引"""
+        return 'structural' if self.analysis_mode_var.get() == "结构相似度(抗重命名)" else 'exact'
+    
+    def get_document_paths(self):
+        """返回列表中的Word文档路径，列表中包含目录时给出提示"""
+        if not self.file_paths:
+            messagebox.showwarning("警告", "请至少添加一个Word文档")
+            return None
+        if any(os.path.isdir(path) for path in self.file_paths):
+            messagebox.showwarning("警告", "归档库仅支持Word文档，请移除列表中的目录")
+            return None
+        return list(self.file_paths)
+    
+    def add_files_to_corpus(self):
+        """将列表中的文档加入参考语料库"""
+        file_paths = self.get_document_paths()
+        if not file_paths:
+            return
+        mode = self.get_corpus_mode()
+        
+        def task(analyzer):
+            added = analyzer.add_to_corpus(file_paths, mode)
+            total = analyzer.get_corpus_index(mode).document_count()
+            return f"已加入归档库: 新增 {added} 个文档，跳过 {len(file_paths) - added} 个已归档文档\n归档库共 {total} 个文档"
+        
+        self.run_background_task(task, len(file_paths))
+    
+    def compare_with_corpus(self):
+        """将列表中的文档与参考语料库中的所有归档文档比较"""
+        file_paths = self.get_document_paths()
+        if not file_paths:
+            return
+        mode = self.get_corpus_mode()
+        self.run_background_task(lambda analyzer: analyzer.get_corpus_report(file_paths, mode=mode),
+                                 len(file_paths))
+    
+    def set_task_running(self, running):
+        """标记后台任务状态，运行期间禁用分析相关按钮"""
+        self._task_running = running
+        for button in self.action_buttons:
+            button.config(state=tk.DISABLED if running else tk.NORMAL)
+    
+    def run_background_task(self, task, file_count):
+        """在后台线程中执行分析任务以免阻塞界面，完成后显示task返回的报告
+        
+        已有任务运行时直接返回：各任务共用同一个分析器及其统计信息和缓存。
+        """
+        if self._task_running:
+            return
+        self.set_task_running(True)
+        outcome = {}
+        
+        # 显示进度窗口
+        progress_window = ProgressWindow(self, file_count)
+        self.update_idletasks()
+        
+        def worker():
+            try:
+                outcome['report'] = task(self.analyzer_factory())
+            except Exception as e:
+                outcome['error'] = e
+        
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        
+        def poll():
+            if thread.is_alive():
+                self.after(100, poll)
+                return
             
             # 关闭进度窗口
             progress_window.destroy()
+            self.set_task_running(False)
             
-            # 显示结果
-            self.result_text.config(state=tk.NORMAL)
-            self.result_text.delete(1.0, tk.END)
-            self.result_text.insert(tk.END, report)
-            self.result_text.config(state=tk.DISABLED)
+            if 'error' in outcome:
+                messagebox.showerror("错误", f"分析过程中发生错误: {str(outcome['error'])}")
+                return
             
-        except Exception as e:
-            messagebox.showerror("错误", f"分析过程中发生错误: {str(e)}")
-            if 'progress_window' in locals():
-                progress_window.destroy() 
\ No newline at end of file
+            # 分页显示结果
+            self.show_report(outcome['report'])
+        
+        self.after(100, poll)
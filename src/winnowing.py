@@ -0,0 +1,128 @@
+import re
+import zlib
+from collections import deque
+
+# 词元：标识符、数字、单个汉字或单个符号
+TOKEN_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_]*|\d+|[\u4e00-\u9fff]|[^\sA-Za-z0-9_\u4e00-\u9fff]')
+
+# 滚动哈希参数
+HASH_BASE = 1000003
+HASH_MOD = (1 << 61) - 1
+
+class WinnowingEngine:
+    """MOSS风格的winnowing指纹引擎，用于检测经过重新缩进、合并或拆分行的复制代码片段
+
+    文档被规范化为词元流（与换行无关），对长度为k的词元序列计算滚动哈希，
+    再在大小为window的滑动窗口中选取最小哈希作为指纹。
+    任何长度不少于 k + window - 1 个词元的公共片段都保证至少有一个公共指纹。
+    """
+
+    def __init__(self, k=8, window=6, max_occurrences=20):
+        self.k = k
+        self.window = window
+        # 在同一文档中出现次数过多的指纹视为样板代码，不参与匹配
+        self.max_occurrences = max_occurrences
+
+    def tokenize(self, lines):
+        """将文本行规范化为词元序列，同时记录每个词元所在的行号"""
+        tokens = []
+        token_lines = []
+        for line_idx, line in enumerate(lines):
+            for token in TOKEN_PATTERN.findall(line.lower()):
+                tokens.append(token)
+                token_lines.append(line_idx)
+        return tokens, token_lines
+
+    def kgram_hashes(self, tokens):
+        """使用滚动哈希计算所有k元词元序列的哈希值，线性时间"""
+        k = self.k
+        if len(tokens) < k:
+            return []
+
+        token_hashes = [zlib.crc32(token.encode('utf-8')) for token in tokens]
+        high_power = pow(HASH_BASE, k - 1, HASH_MOD)
+
+        current = 0
+        for value in token_hashes[:k]:
+            current = (current * HASH_BASE + value) % HASH_MOD
+        hashes = [current]
+        for i in range(k, len(token_hashes)):
+            current = (current - token_hashes[i - k] * high_power) % HASH_MOD
+            current = (current * HASH_BASE + token_hashes[i]) % HASH_MOD
+            hashes.append(current)
+        return hashes
+
+    def winnow(self, hashes):
+        """在滑动窗口中选取最小哈希（相同时取最右），返回[(哈希, 位置)]，线性时间"""
+        window = self.window
+        if not hashes:
+            return []
+        if len(hashes) <= window:
+            pos = min(range(len(hashes)), key=lambda i: (hashes[i], -i))
+            return [(hashes[pos], pos)]
+
+        selected = []
+        candidates = deque()  # 单调队列，保存窗口内可能成为最小值的位置
+        last_pos = -1
+        for i, value in enumerate(hashes):
+            while candidates and hashes[candidates[-1]] >= value:
+                candidates.pop()
+            candidates.append(i)
+            if candidates[0] <= i - window:
+                candidates.popleft()
+            if i >= window - 1 and candidates[0] != last_pos:
+                last_pos = candidates[0]
+                selected.append((hashes[last_pos], last_pos))
+        return selected
+
+    def fingerprint(self, lines):
+        """计算文档指纹，返回[(哈希, 起始行, 结束行)]"""
+        tokens, token_lines = self.tokenize(lines)
+        selected = self.winnow(self.kgram_hashes(tokens))
+        return [(value, token_lines[pos], token_lines[pos + self.k - 1]) for value, pos in selected]
+
+    def build_index(self, fingerprints):
+        """建立指纹索引：哈希 -> [(起始行, 结束行)]，过滤出现次数过多的指纹"""
+        index = {}
+        for value, start, end in fingerprints:
+            index.setdefault(value, []).append((start, end))
+        return {value: spans for value, spans in index.items() if len(spans) <= self.max_occurrences}
+
+    def find_matching_fragments(self, index1, fingerprints2, max_gap=2, min_fingerprints=2):
+        """根据指纹匹配找出两个文档中的复制片段
+
+        返回[{'start1', 'end1', 'start2', 'end2', 'fingerprints'}]（行号从0开始），
+        按片段在文档2中的行数降序排列。
+        """
+        matches = []
+        for value, start2, end2 in fingerprints2:
+            for start1, end1 in index1.get(value, ()):
+                matches.append((start2, start1, end1, end2))
+        if not matches:
+            return []
+
+        # 按文档2中的位置排序后，合并两侧行号都相邻的匹配
+        matches.sort()
+        fragments = []
+        open_fragments = []
+        for start2, start1, end1, end2 in matches:
+            merged = False
+            for fragment in open_fragments:
+                if (start2 <= fragment['end2'] + max_gap
+                        and fragment['start1'] - max_gap <= start1 <= fragment['end1'] + max_gap):
+                    fragment['start1'] = min(fragment['start1'], start1)
+                    fragment['end1'] = max(fragment['end1'], end1)
+                    fragment['end2'] = max(fragment['end2'], end2)
+                    fragment['fingerprints'] += 1
+                    merged = True
+                    break
+            if not merged:
+                fragment = {'start1': start1, 'end1': end1, 'start2': start2, 'end2': end2, 'fingerprints': 1}
+                fragments.append(fragment)
+                open_fragments.append(fragment)
+            # 已经无法再延伸的片段不再参与合并，保证每个匹配只与少量片段比较
+            open_fragments = [f for f in open_fragments if f['end2'] + max_gap >= start2]
+
+        fragments = [f for f in fragments if f['fingerprints'] >= min_fingerprints]
+        fragments.sort(key=lambda f: (-(f['end2'] - f['start2']), f['start2'], f['start1']))
+        return fragments
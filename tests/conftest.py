@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 源代码模块使用平铺导入，测试时将src目录加入搜索路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,51 @@
+import os
+
+from analysis_cache import AnalysisCache, user_cache_dir
+from similarity_analyzer import SimilarityAnalyzer
+
+def test_caches_default_to_user_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path))
+    assert AnalysisCache().cache_dir.startswith(str(tmp_path))
+    assert user_cache_dir("results.sqlite3").startswith(str(tmp_path))
+
+def test_disabled_cache_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path))
+    analyzer = SimilarityAnalyzer(use_cache=False)
+    frequency = analyzer.get_line_frequency_index()
+    frequency.add_document("a", [1, 2], content_hash="a")
+    frequency.save()
+    assert analyzer.segmenter.cache_dir is None
+    assert analyzer.get_results_store() is None
+    assert os.listdir(tmp_path) == []
+
+def test_put_evicts_least_recently_used_without_rescanning(tmp_path, monkeypatch):
+    cache = AnalysisCache(str(tmp_path / "analysis"), max_entries=2)
+    cache.put("a", {'lines': ["a"]})
+    cache.put("b", {'lines': ["b"]})
+    assert cache.get("a") is not None
+
+    def fail_listdir(path):
+        raise AssertionError("put() should not rescan the cache directory")
+    monkeypatch.setattr(os, 'listdir', fail_listdir)
+    cache.put("c", {'lines': ["c"]})
+    monkeypatch.undo()
+    assert sorted(os.listdir(tmp_path / "analysis")) == ["a.json", "c.json"]
+
+def test_index_skips_entries_deleted_during_scan(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "analysis"
+    cache_dir.mkdir()
+    for key in ("a", "b", "c"):
+        (cache_dir / f"{key}.json").write_text("{}", encoding='utf-8')
+    real_stat = os.stat
+
+    def flaky_stat(path, *args, **kwargs):
+        if str(path).endswith("b.json"):
+            raise FileNotFoundError(path)
+        return real_stat(path, *args, **kwargs)
+    monkeypatch.setattr(os, 'stat', flaky_stat)
+    cache = AnalysisCache(str(cache_dir), max_entries=1)
+    cache.put("d", {'lines': []})
+    monkeypatch.undo()
+    assert sorted(os.listdir(cache_dir)) == ["b.json", "d.json"]
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from batch_runner import BatchRunner
+
+def write_manifest(tmp_path, jobs):
+    for name in ("product-a", "product-b", "common"):
+        project = tmp_path / name
+        project.mkdir(exist_ok=True)
+        (project / f"{name.title().replace('-', '')}.java").write_text(f"class {name} {{\n}}\n", encoding='utf-8')
+    path = tmp_path / "jobs.json"
+    path.write_text(json.dumps({'output_dir': "out", 'defaults': {'extensions': ['java']}, 'jobs': jobs}),
+                    encoding='utf-8')
+    return str(path)
+
+def test_duplicate_app_name_and_version_are_rejected(tmp_path):
+    manifest = write_manifest(tmp_path, [{'paths': ["product-a"], 'app_name': "产品", 'version': "V1.0"},
+                                         {'paths': ["product-b"], 'app_name': "产品", 'version': "V1.0"}])
+    with pytest.raises(ValueError, match="输出文档相同"):
+        BatchRunner().load_manifest(manifest)
+
+def test_duplicate_output_paths_are_rejected(tmp_path):
+    manifest = write_manifest(tmp_path, [
+        {'paths': ["product-a"], 'app_name': "A", 'output': "out/产品.docx"},
+        {'paths': ["product-b"], 'app_name': "B", 'output': "out/../out/产品.docx"}])
+    with pytest.raises(ValueError, match="输出文档相同"):
+        BatchRunner().load_manifest(manifest)
+
+def test_jobs_share_file_content_cache(tmp_path):
+    manifest = write_manifest(tmp_path, [
+        {'paths': ["product-a", "common"], 'app_name': "A", 'version': "V1.0"},
+        {'paths': ["product-b", "common"], 'app_name': "B", 'version': "V1.0"}])
+    runner = BatchRunner(max_workers=1)
+    output_dir, jobs = runner.load_manifest(manifest)
+    summary = runner.run(jobs, output_dir)
+    assert (summary['succeeded'], summary['failed'], summary['total_files']) == (2, 0, 4)
+    assert summary['cache']['misses'] == 3 and summary['cache']['path_hits'] == 1
+    assert len({job['output'] for job in summary['jobs']}) == 2
@@ -0,0 +1,18 @@
+import numpy as np
+
+from block_matcher import CopiedBlockFinder
+
+EMPTY = 99
+
+def test_finds_shared_block():
+    finder = CopiedBlockFinder(ignore_hash=EMPTY)
+    assert finder.find_blocks([1, 5, 6, 7, 8, 2], [3, 5, 6, 7, 8, 4]) == [(1, 1, 4)]
+
+def test_ignored_lines_never_form_a_block():
+    finder = CopiedBlockFinder(ignore_hash=EMPTY)
+    assert finder.find_blocks([1, EMPTY, EMPTY, EMPTY, EMPTY, 2], [3, EMPTY, EMPTY, EMPTY, EMPTY, 4]) == []
+
+def test_ignored_line_splits_a_block():
+    finder = CopiedBlockFinder(ignore_hash=EMPTY)
+    hashes = np.array([5, 6, 7, EMPTY, 8, 9], dtype=np.uint64)
+    assert finder.find_blocks(hashes, hashes.copy()) == [(0, 0, 3)]
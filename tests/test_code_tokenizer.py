@@ -0,0 +1,16 @@
+from code_tokenizer import CodeTokenizer
+
+def normalize(lines):
+    return CodeTokenizer().normalize_lines(lines, 'java')
+
+def test_inline_block_comment_does_not_hide_following_lines():
+    result = normalize(['int a = 1; /* c */ int b = 2;', 'x = 3;', 'y = 4;'])
+    assert result == ['int ID = NUM ; int ID = NUM ;', 'ID = NUM ;', 'ID = NUM ;']
+
+def test_single_line_javadoc_is_removed():
+    result = normalize(['/** doc */', 'public int foo() {', 'return 1;', '}'])
+    assert result == ['', 'public int ID ( ) {', 'return NUM ;', '}']
+
+def test_multi_line_block_comment_spans_lines():
+    result = normalize(['int a = 1; /* start', 'still comment', 'end */ int b = 2;', 'z = 5;'])
+    assert result == ['int ID = NUM ;', '', 'int ID = NUM ;', 'ID = NUM ;']
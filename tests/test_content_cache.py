@@ -0,0 +1,24 @@
+from content_cache import FileContentCache
+
+def decode(raw):
+    return 'utf-8', raw.decode('utf-8').splitlines()
+
+def test_path_map_keeps_only_latest_version(tmp_path):
+    cache = FileContentCache()
+    path = tmp_path / "Main.java"
+    for version in range(5):
+        path.write_text("x" * (version + 1), encoding='utf-8')
+        assert cache.get_lines(str(path), decode) == ('utf-8', ["x" * (version + 1)])
+    assert len(cache._stat_hashes) == 1
+    assert len(cache._contents) == 5
+
+def test_evicted_content_drops_path_map(tmp_path):
+    cache = FileContentCache(max_size_mb=20 / 1024 / 1024)
+    for index in range(5):
+        path = tmp_path / f"File{index}.java"
+        path.write_text(f"class File{index} {{}}", encoding='utf-8')
+        cache.get_lines(str(path), decode)
+    assert len(cache._contents) == 1
+    assert len(cache._stat_hashes) == 1
+    cache.discard(str(tmp_path / "File4.java"))
+    assert not cache._contents and not cache._stat_hashes
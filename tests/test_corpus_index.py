@@ -0,0 +1,8 @@
+from corpus_index import CorpusIndex
+
+def test_query_excludes_document_before_top_k_cut(tmp_path):
+    with CorpusIndex(str(tmp_path / "corpus.sqlite3")) as index:
+        index.add_document("self", "self", "self.docx", [1, 2, 3, 4, 5])
+        index.add_document("other", "other", "other.docx", [1, 2, 3, 9, 10])
+        results = index.query([1, 2, 3, 4, 5], top_k=1, exclude_hash="self")
+    assert [result['content_hash'] for result in results] == ["other"]
@@ -0,0 +1,43 @@
+import pytest
+
+from export_pipeline import ExportCancelled, ExportPipeline
+
+def write_project(root, files=3):
+    root.mkdir(exist_ok=True)
+    for index in range(files):
+        (root / f"Main{index}.java").write_text(f"class Main{index} {{\n}}\n", encoding='utf-8')
+    return root
+
+@pytest.mark.parametrize('pipelined', [True, False])
+def test_cancel_before_build_is_not_lost(tmp_path, pipelined):
+    project = write_project(tmp_path / "project")
+    pipeline = ExportPipeline(pipelined=pipelined)
+    pipeline.cancel()
+    with pytest.raises(ExportCancelled):
+        pipeline.build([str(project)], ['java'])
+    pipeline.reset()
+    result = pipeline.build([str(project)], ['java'])
+    assert result['file_count'] == 3
+
+def test_pipelined_and_sequential_builds_agree(tmp_path):
+    project = write_project(tmp_path / "project", files=20)
+    results = [ExportPipeline(pipelined=pipelined).build([str(project)], ['java'], app_name="示例", version="V1.0")
+               for pipelined in (True, False)]
+    pipelined, sequential = [(r['file_count'], r['total_code_lines'], r['filename']) for r in results]
+    assert pipelined == sequential
+    assert results[0]['file_count'] == 20
+
+@pytest.mark.parametrize('pipelined', [True, False])
+def test_cancel_during_read_stops_at_file_boundary(tmp_path, pipelined):
+    project = write_project(tmp_path / "project", files=50)
+    pipeline = ExportPipeline(pipelined=pipelined)
+    read = []
+
+    def report(stage, current, total, detail, lines=None):
+        if stage == 'read':
+            read.append(current)
+            if current == 5:
+                pipeline.cancel()
+    with pytest.raises(ExportCancelled):
+        pipeline.build([str(project)], ['java'], progress_callback=report)
+    assert max(read) < 50
@@ -0,0 +1,39 @@
+import os
+
+from export_watcher import ExportWatcher
+
+def make_watcher(tmp_path, files=4):
+    project = tmp_path / "project"
+    project.mkdir()
+    for index in range(files):
+        (project / f"Main{index}.java").write_text(f"class Main{index} {{\n}}\n", encoding='utf-8')
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    events = []
+    watcher = ExportWatcher([str(project)], ['java'], build_options={'app_name': "示例", 'version': "V1.0"},
+                            output_path=lambda filename: str(output_dir / filename),
+                            event_callback=lambda event, data: events.append((event, data)))
+    return watcher, project, output_dir, events
+
+def test_diff_reports_added_modified_and_removed():
+    old = {'a': (1, 10), 'b': (1, 10), 'c': (1, 10)}
+    new = {'a': (1, 10), 'b': (2, 12), 'd': (1, 5)}
+    assert ExportWatcher.diff(old, new) == {'added': ['d'], 'modified': ['b'], 'removed': ['c']}
+
+def test_regenerate_rereads_only_changed_files(tmp_path):
+    watcher, project, output_dir, events = make_watcher(tmp_path)
+    first = watcher.scan()
+    assert watcher.regenerate(watcher.diff({}, first))
+    assert watcher.last_export['reread_files'] == 4
+
+    (project / "Main0.java").write_text("class Main0 {\n    int value;\n}\n", encoding='utf-8')
+    (project / "Main3.java").unlink()
+    changes = watcher.diff(first, watcher.scan())
+    assert changes == {'added': [], 'modified': [str(project / "Main0.java")], 'removed': [str(project / "Main3.java")]}
+    assert watcher.regenerate(changes)
+    assert watcher.last_export['reread_files'] == 1
+    assert watcher.last_export['file_count'] == 3
+    # 行数变化后文件名改变，旧文档被删除
+    documents = [name for name in os.listdir(output_dir) if name.endswith('.docx')]
+    assert documents == [os.path.basename(watcher.last_export['output'])]
+    assert [event for event, _ in events] == ['export', 'export']
@@ -0,0 +1,71 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from job_server import JobService, create_server
+
+@pytest.fixture
+def base_url(tmp_path):
+    service = JobService(str(tmp_path / "jobs"), max_workers=1)
+    server = create_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    service.shutdown()
+
+def post(url, body, headers):
+    request = urllib.request.Request(url + "/jobs", body.encode('utf-8'), headers, method='POST')
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def test_rejects_cross_site_simple_request(base_url, tmp_path):
+    body = json.dumps({'paths': [str(tmp_path)], 'extensions': ['java']})
+    assert post(base_url, body, {'Content-Type': 'text/plain'}) == 415
+
+def test_rejects_foreign_origin(base_url, tmp_path):
+    body = json.dumps({'paths': [str(tmp_path)], 'extensions': ['java']})
+    headers = {'Content-Type': 'application/json', 'Origin': 'https://example.com'}
+    assert post(base_url, body, headers) == 403
+
+def test_accepts_json_request(base_url, tmp_path):
+    body = json.dumps({'paths': [str(tmp_path)], 'extensions': ['java']})
+    assert post(base_url, body, {'Content-Type': 'application/json'}) == 202
+
+def test_similarity_jobs_do_not_block_exports(tmp_path, monkeypatch):
+    service = JobService(str(tmp_path / "jobs"), max_workers=1)
+    release = threading.Event()
+    monkeypatch.setattr(service, 'run_similarity', lambda params, job_dir: release.wait(30) and {})
+    documents = []
+    for name in ("a.docx", "b.docx"):
+        (tmp_path / name).write_bytes(b"")
+        documents.append(str(tmp_path / name))
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "Main.java").write_text("class Main {}\n", encoding='utf-8')
+    try:
+        for _ in range(2):
+            service.submit({'type': 'similarity', 'files': documents})
+        export = service.submit({'paths': [str(tmp_path / "src")], 'extensions': ['java']})
+        # 两个相似度任务一直等待时，导出任务仍应在自己的工作线程中完成
+        service._jobs[export['id']]['future'].result(timeout=10)
+        assert service.describe(export['id'])['status'] == 'succeeded'
+    finally:
+        release.set()
+        service.shutdown()
+
+def test_rejects_directory_similarity_with_other_analysis(tmp_path):
+    service = JobService(str(tmp_path / "jobs"), max_workers=1)
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    try:
+        with pytest.raises(ValueError):
+            service.submit({'type': 'similarity', 'files': [str(tmp_path / "a"), str(tmp_path / "b")],
+                            'analysis': 'structural', 'extensions': ['java']})
+    finally:
+        service.shutdown()
@@ -0,0 +1,27 @@
+from line_frequency import LineFrequencyIndex
+
+def test_new_version_of_same_document_replaces_old_counts(tmp_path):
+    index = LineFrequencyIndex(str(tmp_path / "df.npz"), min_documents=1)
+    for version in range(5):
+        index.add_document("project/Main.java", [1, 2, 100 + version], content_hash=f"v{version}")
+    index.add_document("other/Util.java", [1, 3], content_hash="u")
+    assert index.doc_count == 2
+    assert index.document_frequencies([1, 2, 100, 104]).tolist() == [2, 1, 0, 1]
+    assert index.stop_hashes().tolist() == [1]
+
+def test_oldest_documents_are_evicted(tmp_path):
+    index = LineFrequencyIndex(str(tmp_path / "df.npz"), max_documents=2)
+    for name in ("a", "b", "c"):
+        index.add_document(name, [1, ord(name)], content_hash=name)
+    assert list(index.documents) == ["b", "c"]
+    assert index.document_frequencies([1, ord("a")]).tolist() == [2, 0]
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "df.npz")
+    index = LineFrequencyIndex(path)
+    index.add_document("a", [1, 2], content_hash="a")
+    index.add_document("b", [2, 3], content_hash="b")
+    index.save()
+    loaded = LineFrequencyIndex.load(path)
+    assert list(loaded.documents) == ["a", "b"]
+    assert loaded.df == index.df
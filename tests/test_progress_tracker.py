@@ -0,0 +1,10 @@
+from progress_tracker import ProgressTracker
+
+def test_final_update_of_each_stage_is_emitted():
+    tracker = ProgressTracker(min_interval=60)
+    assert tracker.update('read', 1, 3) is not None
+    assert tracker.update('read', 2, 3) is None
+    snapshot = tracker.update('read', 3, 3)
+    assert (snapshot['stage'], snapshot['current']) == ('read', 3)
+    assert tracker.update('read', 3, 3) is None
+    assert tracker.update('build', 1, 3)['stage'] == 'build'
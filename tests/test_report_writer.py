@@ -0,0 +1,43 @@
+import csv
+import json
+
+import numpy as np
+
+from report_writer import ReportWriter
+
+RESULTS = [
+    {'file1': "订单服务.docx", 'file2': "b.docx", 'sequence_similarity': np.float64(62.5), 'identical_lines': np.int64(5),
+     'total_lines1': 8, 'total_lines2': 6, 'max_total_lines': 8, 'difflib_similarity': 70.123,
+     'comment_similarity': None, 'identical_lines_details': [(0, 1, "return null;")],
+     'copied_blocks': [(0, 1, 3), (5, 4, 2)], 'matching_fragment_count': 1},
+    {'file1': "a.docx", 'file2': "c,\"d\".docx", 'sequence_similarity': 0.0, 'identical_lines': 0,
+     'total_lines1': 8, 'total_lines2': 3, 'max_total_lines': 8, 'difflib_similarity': 1.0,
+     'identical_lines_details': [], 'copied_blocks': [], 'matching_fragment_count': 0},
+]
+
+def write(path):
+    with ReportWriter(str(path)) as writer:
+        for result in RESULTS:
+            writer.write_result(result)
+    return writer.count
+
+def test_csv_round_trip(tmp_path):
+    path = tmp_path / "pairs.csv"
+    assert write(path) == 2
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [(row['file1'], row['file2']) for row in rows] == [("订单服务.docx", "b.docx"), ("a.docx", "c,\"d\".docx")]
+    assert rows[0]['sequence_similarity'] == "62.50"
+    assert (rows[0]['identical_lines'], rows[0]['copied_block_count'], rows[0]['longest_copied_block']) == ("5", "2", "3")
+    assert rows[0]['comment_similarity'] == "" and rows[1]['longest_copied_block'] == "0"
+
+def test_jsonl_round_trip(tmp_path):
+    path = tmp_path / "pairs.jsonl"
+    write(path)
+    with open(path, encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f]
+    assert len(rows) == 2
+    assert rows[0]['file1'] == "订单服务.docx"
+    assert rows[0]['sequence_similarity'] == 62.5 and rows[0]['identical_lines'] == 5
+    assert rows[0]['copied_blocks'] == [[0, 1, 3], [5, 4, 2]]
+    assert rows[1]['file2'] == "c,\"d\".docx"
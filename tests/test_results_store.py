@@ -0,0 +1,28 @@
+from results_store import ResultsStore
+
+def pair_result(total1, total2, blocks):
+    return {'identical_lines': 3, 'sequence_similarity': 30.0, 'total_lines1': total1, 'total_lines2': total2,
+            'max_total_lines': max(total1, total2), 'copied_blocks': blocks}
+
+def test_reversed_pair_reuses_stored_result(tmp_path):
+    with ResultsStore(str(tmp_path / "results.sqlite3")) as store:
+        pair_ids = store.save_pairs("k", [(("b", "a"), pair_result(10, 20, [(1, 5, 3)]))])
+        found = store.load_pairs("k", [("a", "b"), ("b", "a")])
+        assert [tuple(block) for block in found[("b", "a")][1]['copied_blocks']] == [(1, 5, 3)]
+        assert [tuple(block) for block in found[("a", "b")][1]['copied_blocks']] == [(5, 1, 3)]
+        assert (found[("a", "b")][1]['total_lines1'], found[("a", "b")][1]['total_lines2']) == (20, 10)
+
+        run_id = store.record_run('exact', "k", [], [(pair_ids[("b", "a")], "B", "A", "b")], 0.1, 0)
+        result, = store.query_pairs(run_id)
+        assert (result['file1'], result['hash1'], result['total_lines1']) == ("B", "b", 10)
+        assert store.get_blocks(result['pair_id'], result['swapped']) == [(1, 5, 3)]
+
+def test_least_recently_used_pairs_are_evicted(tmp_path):
+    with ResultsStore(str(tmp_path / "results.sqlite3"), max_pairs=3, max_runs=1) as store:
+        store.save_pairs("k", [((f"a{index}", "z"), pair_result(1, 1, [])) for index in range(3)])
+        store.load_pairs("k", [("a0", "z")])
+        store.save_pairs("k", [(("a3", "z"), pair_result(1, 1, []))])
+        assert set(store.load_pairs("k", [(f"a{index}", "z") for index in range(4)])) == {("a0", "z"), ("a2", "z"), ("a3", "z")}
+        for _ in range(3):
+            store.record_run('exact', "k", [], [], 0.1, 0)
+        assert len(store.list_runs()) == 1
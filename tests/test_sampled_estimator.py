@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from sampled_estimator import SampledSimilarityEstimator
+
+def random_documents(rng, shared, only1, only2):
+    common = rng.integers(0, 2 ** 64, shared, dtype=np.uint64)
+    doc1 = np.concatenate([common, rng.integers(0, 2 ** 64, only1, dtype=np.uint64)])
+    doc2 = np.concatenate([common, rng.integers(0, 2 ** 64, only2, dtype=np.uint64)])
+    return doc1, doc2
+
+def test_full_sample_is_exact():
+    estimator = SampledSimilarityEstimator(sample_rate=1)
+    doc1, doc2 = random_documents(np.random.default_rng(0), 300, 100, 700)
+    result = estimator.estimate(estimator.sample(doc1), estimator.sample(doc2), len(doc1), len(doc2))
+    assert result['identical_lines_low'] == result['identical_lines_estimate'] == result['identical_lines_high'] == 300
+    assert result['sequence_similarity'] == pytest.approx(30.0)
+
+def test_confidence_interval_covers_true_count():
+    estimator = SampledSimilarityEstimator(sample_rate=0.1)
+    covered = 0
+    for seed in range(100):
+        doc1, doc2 = random_documents(np.random.default_rng(seed), 2000, 3000, 1000)
+        result = estimator.estimate(estimator.sample(doc1), estimator.sample(doc2), len(doc1), len(doc2))
+        assert result['identical_lines_low'] <= result['identical_lines_estimate'] <= result['identical_lines_high']
+        assert result['identical_lines_high'] <= len(doc2)
+        covered += result['identical_lines_low'] <= 2000 <= result['identical_lines_high']
+    # 95%置信区间，允许少量未覆盖
+    assert covered >= 88
+
+def test_no_sampled_match_uses_rule_of_three_upper_bound():
+    estimator = SampledSimilarityEstimator(sample_rate=0.01)
+    doc1, doc2 = random_documents(np.random.default_rng(1), 0, 1000, 1000)
+    result = estimator.estimate(estimator.sample(doc1), estimator.sample(doc2), len(doc1), len(doc2))
+    assert result['identical_lines_estimate'] == result['identical_lines_low'] == 0
+    assert result['identical_lines_high'] == pytest.approx(300)
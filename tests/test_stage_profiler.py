@@ -0,0 +1,26 @@
+import pytest
+
+from stage_profiler import StageProfiler, reset_peak_rss
+
+def test_peak_memory_is_measured_per_stage():
+    if not reset_peak_rss():
+        pytest.skip("平台不支持重置峰值内存")
+    profiler = StageProfiler()
+    with profiler.stage('read'):
+        data = b'x' * (200 * 1024 * 1024)
+        del data
+    with profiler.stage('save'):
+        pass
+    read, save = profiler.stages['read'], profiler.stages['save']
+    assert read['peak_rss_scope'] == save['peak_rss_scope'] == 'stage'
+    assert read['peak_rss_bytes'] - save['peak_rss_bytes'] > 150 * 1024 * 1024
+
+def test_overlapping_stages_report_shared_peak():
+    profiler = StageProfiler()
+    with profiler.stage('read'):
+        with profiler.stage('build'):
+            pass
+    expected = 'concurrent' if profiler.stages['read']['peak_rss_scope'] == 'stage' else 'process'
+    assert profiler.stages['build']['peak_rss_scope'] == expected
+    assert any("并行阶段共同峰值内存" in line or "进程累计峰值内存" in line
+               for line in StageProfiler.format_summary(profiler.summary()))
@@ -0,0 +1,37 @@
+from winnowing import WinnowingEngine
+
+FUNCTION = [
+    "public int total(List<Order> orders) {",
+    "    int sum = 0;",
+    "    for (Order order : orders) {",
+    "        if (order.isPaid()) { sum += order.getAmount(); }",
+    "    }",
+    "    return sum;",
+    "}",
+]
+
+def fragments(lines1, lines2, engine=None):
+    engine = engine or WinnowingEngine()
+    return engine.find_matching_fragments(engine.build_index(engine.fingerprint(lines1)), engine.fingerprint(lines2))
+
+def test_reformatted_copy_is_merged_into_one_fragment():
+    original = ["package a;", "import java.util.List;", ""] + FUNCTION
+    # 重新缩进并合并成两行后粘贴到另一个文件中间
+    copied = ["class Report {", "  String title;"] + [" ".join(line.strip() for line in FUNCTION[:4]),
+                                                      " ".join(line.strip() for line in FUNCTION[4:])] + ["}"]
+    found = fragments(original, copied)
+    assert len(found) == 1
+    fragment = found[0]
+    assert fragment['start1'] <= 3 and fragment['end1'] >= 8
+    assert (fragment['start2'], fragment['end2']) == (2, 3)
+    assert fragment['fingerprints'] >= 2
+
+def test_unrelated_documents_have_no_fragments():
+    other = ["def render(template, context):", "    return template.format(**context)"] * 3
+    assert fragments(FUNCTION, other) == []
+
+def test_fragments_far_apart_are_not_merged():
+    filler = [f"int unrelated{index} = compute{index}(value{index} * {index});" for index in range(10)]
+    found = fragments(FUNCTION + filler + FUNCTION, FUNCTION)
+    assert len(found) == 2
+    assert sorted(fragment['start1'] for fragment in found) == [0, len(FUNCTION) + len(filler)]